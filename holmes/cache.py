@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import time
+import math
+from hashlib import sha1
+from collections import deque, defaultdict, OrderedDict
 from gzip import GzipFile
 from cStringIO import StringIO
 from datetime import datetime, timedelta
@@ -11,13 +14,126 @@ import msgpack
 from tornado.concurrent import return_future
 from ujson import loads, dumps
 from octopus.model import Response
+import sqlalchemy as sa
 from sqlalchemy import or_
 from retools.lock import Lock, LockTimeout
-from redis import WatchError
 
 from holmes.models import (
     Domain, Page, Limiter, Violation, DomainsViolationsPrefs
 )
+from holmes.streaming import StreamedBody
+from holmes.transport import get_host_stats
+
+
+def get_indexing_queue_status(size, oldest):
+    # oldest is the [page_id, queued_at] pair at the head of the queue
+    lag = 0.0
+    if oldest:
+        lag = max(time.time() - float(oldest[1]), 0.0)
+
+    return {
+        'queueSize': int(size or 0),
+        'lagInSeconds': lag
+    }
+
+
+def get_request_cache_stats(counters, info):
+    '''Request cache stats from the counters the workers flush and the
+    redis INFO output.'''
+
+    counters = dict((key, int(value)) for key, value in (counters or {}).items())
+
+    hits = counters.get('lru_hits', 0) + counters.get('redis_hits', 0)
+    lookups = hits + counters.get('misses', 0)
+    stored = counters.get('bodies_stored', 0) + counters.get('bodies_deduplicated', 0)
+
+    used_memory = None
+    for line in (info or '').splitlines():
+        if line.startswith('used_memory:'):
+            used_memory = int(line.split(':', 1)[1])
+
+    return {
+        'lruHits': counters.get('lru_hits', 0),
+        'redisHits': counters.get('redis_hits', 0),
+        'misses': counters.get('misses', 0),
+        'hitRate': float(hits) / lookups if lookups else 0.0,
+        'bodiesStored': counters.get('bodies_stored', 0),
+        'bodiesDeduplicated': counters.get('bodies_deduplicated', 0),
+        'dedupRate': float(counters.get('bodies_deduplicated', 0)) / stored if stored else 0.0,
+        'redisUsedMemoryInBytes': used_memory,
+    }
+
+
+# minutes the counters of the fetches workers made are kept for
+FETCH_STATS_MINUTES = 60
+
+
+def get_fetch_stats(minutes):
+    '''Fetches per minute, newest first, from (timestamp, counters) pairs.'''
+
+    result = []
+
+    for timestamp, counters in minutes:
+        counters = dict((key, int(value)) for key, value in (counters or {}).items())
+
+        result.append({
+            'minute': timestamp,
+            'originFetches': counters.get('origin_fetches', 0),
+            'duplicateFetches': counters.get('duplicate_fetches', 0),
+            'coalescedInProcess': counters.get('coalesced_in_process', 0),
+            'coalescedAcrossWorkers': counters.get('coalesced_across_workers', 0),
+        })
+
+    return result
+
+
+def get_validators(headers):
+    '''Conditional request headers revalidating a response with the
+    given headers.'''
+
+    headers = dict((name.lower(), value) for name, value in (headers or {}).items())
+    validators = {}
+
+    if headers.get('etag'):
+        validators['If-None-Match'] = headers['etag']
+
+    if headers.get('last-modified'):
+        validators['If-Modified-Since'] = headers['last-modified']
+
+    return validators
+
+
+class LRUCache(object):
+    '''In-process cache of strings bounded by their total size, dropping
+    the least recently used ones first.'''
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.items = OrderedDict()
+
+    def get(self, key):
+        value = self.items.pop(key, None)
+
+        if value is not None:
+            self.items[key] = value
+
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_size:
+            return
+
+        previous = self.items.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+
+        self.items[key] = value
+        self.size += len(value)
+
+        while self.size > self.max_size:
+            key, value = self.items.popitem(last=False)
+            self.size -= len(value)
 
 
 class Cache(object):
@@ -225,6 +341,66 @@ class Cache(object):
     def delete_domain_violations_prefs(self, domain_name, callback=None):
         self.redis.delete('violations-prefs-%s' % domain_name, callback=callback)
 
+    @return_future
+    def get_indexing_queue_status(self, callback=None):
+        self.redis.zcard('indexing-queue', callback=self.handle_get_indexing_queue_size(callback))
+
+    def handle_get_indexing_queue_size(self, callback):
+        def handle(size):
+            self.redis.zrange(
+                'indexing-queue', 0, 0, withscores=True,
+                callback=lambda oldest: callback(get_indexing_queue_status(size, oldest))
+            )
+
+        return handle
+
+    @return_future
+    def get_request_cache_stats(self, callback=None):
+        self.redis.hgetall('request-cache-stats', callback=self.handle_get_request_cache_counters(callback))
+
+    def handle_get_request_cache_counters(self, callback):
+        def handle(counters):
+            # toredis returns hashes as flat lists of fields and values
+            if isinstance(counters, list):
+                counters = dict(zip(counters[::2], counters[1::2]))
+
+            self.redis.info(callback=lambda info: callback(get_request_cache_stats(counters, info)))
+
+        return handle
+
+    @return_future
+    def get_transport_stats(self, callback=None):
+        def handle(counters):
+            # toredis returns hashes as flat lists of fields and values
+            if isinstance(counters, list):
+                counters = dict(zip(counters[::2], counters[1::2]))
+
+            callback(get_host_stats(counters))
+
+        self.redis.hgetall('transport-stats', callback=handle)
+
+    @return_future
+    def get_fetch_stats(self, minutes=FETCH_STATS_MINUTES, callback=None):
+        now = int(time.time()) // 60 * 60
+        timestamps = [now - index * 60 for index in range(minutes)]
+        stats = {}
+
+        def handle(timestamp):
+            def handle(counters):
+                # toredis returns hashes as flat lists of fields and values
+                if isinstance(counters, list):
+                    counters = dict(zip(counters[::2], counters[1::2]))
+
+                stats[timestamp] = counters
+
+                if len(stats) == len(timestamps):
+                    callback(get_fetch_stats([(item, stats[item]) for item in timestamps]))
+
+            return handle
+
+        for timestamp in timestamps:
+            self.redis.hgetall('fetch-stats-%d' % timestamp, callback=handle(timestamp))
+
     @return_future
     def add_next_job_bucket(self, uuid, url, callback):
         data = {dumps({'page': str(uuid), 'url': url}): time.clock()}
@@ -240,12 +416,186 @@ class Cache(object):
         )
 
 
+class LimiterBuckets(object):
+    '''Available capacity of each limiter, indexed by url prefix.
+
+    Limiter urls are grouped by length, so matching an url costs one dict
+    lookup per distinct limiter url length instead of a scan of every limiter.
+    '''
+
+    def __init__(self, buckets):
+        self.available = {}
+        for limiter, available in buckets:
+            self.available[limiter.url] = available
+        self.lengths = sorted(set(len(url) for url in self.available))
+
+    def matching(self, url):
+        for length in self.lengths:
+            if length > len(url):
+                break
+
+            prefix = url[:length]
+            if prefix in self.available:
+                yield prefix
+
+    def consume(self, url):
+        prefixes = list(self.matching(url))
+
+        for prefix in prefixes:
+            if self.available[prefix] <= 0:
+                return False
+
+        for prefix in prefixes:
+            self.available[prefix] -= 1
+
+        return True
+
+    def __repr__(self):
+        return repr(self.available)
+
+
 class SyncCache(object):
+    # Moves expired leases back to the bucket and then atomically pops up to
+    # ARGV[1] jobs, leasing them until ARGV[2] + ARGV[3] when ARGV[3] > 0.
+    # Jobs still leased by another worker are dropped instead of claimed.
+    # Expired leases count as failed attempts in KEYS[3], and jobs failing
+    # ARGV[4] times in a row (when ARGV[4] > 0) are dropped from the bucket.
+    # Dropped jobs are kept in KEYS[4] until ARGV[2] + ARGV[5] (when
+    # ARGV[5] > 0) so that refills don't bring them back meanwhile.
+    CLAIM_NEXT_JOBS_SCRIPT = """
+        local now = tonumber(ARGV[2])
+        local lease_expiration = tonumber(ARGV[3])
+        local max_attempts = tonumber(ARGV[4])
+        local exhausted_expiration = tonumber(ARGV[5])
+
+        redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', now)
+
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+        local dropped = {}
+        for _, item in ipairs(expired) do
+            redis.call('ZREM', KEYS[2], item)
+            local attempts = redis.call('HINCRBY', KEYS[3], item, 1)
+            if max_attempts > 0 and attempts >= max_attempts then
+                redis.call('HDEL', KEYS[3], item)
+                if exhausted_expiration > 0 then
+                    redis.call('ZADD', KEYS[4], now + exhausted_expiration, item)
+                end
+                table.insert(dropped, item)
+            else
+                redis.call('ZADD', KEYS[1], now, item)
+            end
+        end
+
+        local items = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+        local claimed = {}
+        for _, item in ipairs(items) do
+            redis.call('ZREM', KEYS[1], item)
+            if not redis.call('ZSCORE', KEYS[2], item) and not redis.call('ZSCORE', KEYS[4], item) then
+                if lease_expiration > 0 then
+                    redis.call('ZADD', KEYS[2], now + lease_expiration, item)
+                end
+                table.insert(claimed, item)
+            end
+        end
+
+        return {redis.call('ZCARD', KEYS[1]), claimed, dropped}
+    """
+
+    RENEW_JOB_LEASE_SCRIPT = """
+        if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+            redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+            return 1
+        end
+        return 0
+    """
+
+    # Queues the document ARGV[2] of page ARGV[1] for indexing. A document
+    # still waiting for the same page is replaced, keeping its place (and
+    # its queued time ARGV[3]) in the queue. Each document bumps the version
+    # of its page in KEYS[3] and starts its retries in KEYS[4] over.
+    PUSH_REVIEW_TO_INDEX_SCRIPT = """
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+        redis.call('HINCRBY', KEYS[3], ARGV[1], 1)
+        redis.call('HDEL', KEYS[4], ARGV[1])
+        if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+            redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+        end
+        return redis.call('ZCARD', KEYS[1])
+    """
+
+    # Requeues the documents of expired leases that are still the latest
+    # version of their page (a newer one is either queued or indexed), and
+    # then atomically pops up to ARGV[1] documents, leasing them until
+    # ARGV[2] + ARGV[3]. Documents requeued ARGV[4] times (when ARGV[4] > 0)
+    # are dropped instead. Leases are "page_id:queued_at:version:document"
+    # strings. Returns the leases and the dropped page ids.
+    CLAIM_REVIEWS_TO_INDEX_SCRIPT = """
+        local now = tonumber(ARGV[2])
+        local max_attempts = tonumber(ARGV[4])
+
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+        local dropped = {}
+        for _, lease in ipairs(expired) do
+            redis.call('ZREM', KEYS[3], lease)
+            local page_id, queued_at, version, doc = string.match(lease, '^([^:]*):([^:]*):([^:]*):(.*)$')
+            if redis.call('HGET', KEYS[4], page_id) == version then
+                local attempts = redis.call('HINCRBY', KEYS[5], page_id, 1)
+                if max_attempts > 0 and attempts >= max_attempts then
+                    redis.call('HDEL', KEYS[5], page_id)
+                    table.insert(dropped, page_id)
+                else
+                    redis.call('HSET', KEYS[2], page_id, doc)
+                    redis.call('ZADD', KEYS[1], queued_at, page_id)
+                end
+            end
+        end
+
+        local items = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+        local claimed = {}
+        for index = 1, #items, 2 do
+            local page_id = items[index]
+            local doc = redis.call('HGET', KEYS[2], page_id)
+            redis.call('ZREM', KEYS[1], page_id)
+            redis.call('HDEL', KEYS[2], page_id)
+            if doc then
+                local version = redis.call('HGET', KEYS[4], page_id) or '0'
+                local lease = page_id .. ':' .. items[index + 1] .. ':' .. version .. ':' .. doc
+                redis.call('ZADD', KEYS[3], now + tonumber(ARGV[3]), lease)
+                table.insert(claimed, lease)
+            end
+        end
+
+        return {claimed, dropped}
+    """
+
+    # Keeps the stored body KEYS[1] for at least ARGV[1] seconds, never
+    # shortening it, as other url records may point to it for longer.
+    # Returns 0 when the body is not stored.
+    EXTEND_BODY_EXPIRATION_SCRIPT = """
+        local ttl = redis.call('TTL', KEYS[1])
+        if ttl == -2 then
+            return 0
+        end
+        if ttl >= 0 and ttl < tonumber(ARGV[1]) then
+            redis.call('EXPIRE', KEYS[1], ARGV[1])
+        end
+        return 1
+    """
+
     def __init__(self, db, redis, config):
         self.db = db
         self.redis = redis
         self.config = config
 
+        self.claim_next_jobs_script = self.redis.register_script(self.CLAIM_NEXT_JOBS_SCRIPT)
+        self.renew_job_lease_script = self.redis.register_script(self.RENEW_JOB_LEASE_SCRIPT)
+        self.push_review_to_index_script = self.redis.register_script(self.PUSH_REVIEW_TO_INDEX_SCRIPT)
+        self.claim_reviews_to_index_script = self.redis.register_script(self.CLAIM_REVIEWS_TO_INDEX_SCRIPT)
+        self.extend_body_expiration_script = self.redis.register_script(self.EXTEND_BODY_EXPIRATION_SCRIPT)
+
+        self.bodies = LRUCache(self.config.REQUEST_CACHE_LRU_SIZE_IN_BYTES)
+        self.request_cache_counters = defaultdict(int)
+
     def has_key(self, key):
         return self.redis.exists(key)
 
@@ -317,61 +667,244 @@ class SyncCache(object):
 
         return int(count)
 
-    def get_request(self, url):
-        cache_key = "urls-%s" % url
-
+    def _get_request_item(self, cache_key, streamed):
         contents = self.redis.get(cache_key)
 
         if not contents:
-            return url, None
+            return None
 
         item = msgpack.unpackb(contents)
 
-        text = GzipFile(mode='r', fileobj=StringIO(item['body'])).read()
+        # streamed responses only cached the start of their body
+        if item.get('truncated', False) and not streamed:
+            return None
+
+        return item
+
+    def _get_body(self, item):
+        # bodies were stored inline before the body store
+        if 'body' in item:
+            return GzipFile(mode='r', fileobj=StringIO(item['body'])).read()
+
+        body_hash = item['body_hash']
+
+        text = self.bodies.get(body_hash)
+        if text is not None:
+            self.request_cache_counters['lru_hits'] += 1
+            return text
+
+        contents = self.redis.get('bodies-%s' % body_hash)
+        if contents is None:
+            self.request_cache_counters['misses'] += 1
+            return None
+
+        self.request_cache_counters['redis_hits'] += 1
+        text = GzipFile(mode='r', fileobj=StringIO(contents)).read()
+        self.bodies.put(body_hash, text)
+
+        return text
+
+    def _store_body(self, text, expiration):
+        '''Stores text once per content, returning its hash.'''
+
+        body_hash = sha1(text).hexdigest()
+        body_key = 'bodies-%s' % body_hash
+
+        # an identical body is already stored, just keep it long enough
+        if self.extend_body_expiration_script(keys=[body_key], args=[expiration]):
+            self.request_cache_counters['bodies_deduplicated'] += 1
+            return body_hash
+
+        out = StringIO()
+        with GzipFile(fileobj=out, mode="w", mtime=0) as f:
+            f.write(text)
+
+        # another worker may have stored it meanwhile
+        if not self.redis.set(body_key, out.getvalue(), ex=expiration, nx=True):
+            self.extend_body_expiration_script(keys=[body_key], args=[expiration])
+            self.request_cache_counters['bodies_deduplicated'] += 1
+            return body_hash
+
+        self.request_cache_counters['bodies_stored'] += 1
+
+        return body_hash
+
+    def _response_from_item(self, url, item):
+        text = self._get_body(item)
+
+        if text is None:
+            return None
 
         response = Response(
             url=url,
             status_code=item['status_code'],
             headers=item['headers'],
-            cookies=item['cookies'],
+            cookies=item.get('cookies'),
             text=text,
             effective_url=item['effective_url'],
-            error=item['error'],
-            request_time=float(item['request_time'])
+            error=item.get('error'),
+            request_time=float(item.get('request_time', 0))
         )
 
-        response.from_cache = True
+        if 'body_size' in item:
+            response.streamed_body = StreamedBody.from_sizes(text, item['body_size'], item['gzipped_body_size'])
+
+        return response
+
+    def get_request(self, url, streamed=False, head=False):
+        # heads- keeps the responses fetched without their bodies
+        item = self._get_request_item("%s-%s" % ('heads' if head else 'urls', url), streamed or head)
+
+        if item is None:
+            return url, None
+
+        response = self._response_from_item(url, item)
+
+        if response is not None:
+            response.from_cache = True
 
         return url, response
 
-    def set_request(self, url, status_code, headers, cookies, text, effective_url, error, request_time, expiration):
+    def get_validated_request(self, url, streamed=False):
+        '''Returns the last response of url that had validators (ETag or
+        Last-Modified) and the headers of a conditional request for it,
+        or None for both.'''
+
+        item = self._get_request_item("validated-urls-%s" % url, streamed)
+
+        if item is None:
+            return None, None
+
+        validators = item.get('validators') or get_validators(item['headers'])
+
+        if not validators:
+            return None, None
+
+        # a body gone from the body store can't back a 304, so url is
+        # fetched unconditionally
+        response = self._response_from_item(url, item)
+
+        if response is None:
+            return None, None
+
+        return response, validators
+
+    def set_request(self, url, status_code, headers, cookies, text, effective_url, error, request_time, expiration,
+                    body=None, validated_expiration=None, validated_max_size=None, head=False):
         if status_code > 399 or status_code < 100:
             return
 
-        cache_key = "urls-%s" % url
+        cache_key = "%s-%s" % ('heads' if head else 'urls', url)
+        text = text or ''
 
-        out = StringIO()
-        with GzipFile(fileobj=out, mode="w", mtime=0) as f:
-            f.write(text)
-        text = out.getvalue()
+        # kept for longer so the next review can revalidate it, unless its
+        # body is too large to keep around for that
+        validators = None
+        if validated_expiration and not head and status_code < 300:
+            if validated_max_size is None or len(text) <= validated_max_size:
+                validators = get_validators(headers)
+
+        # bodies are shared by every url record pointing to them, so they
+        # live as long as the longest lived of those records
+        body_hash = self._store_body(text, max(expiration, validated_expiration) if validators else expiration)
 
-        value = msgpack.packb({
+        item = {
             'url': url,
-            'body': text,
+            'body_hash': body_hash,
             'status_code': status_code,
             'headers': headers,
             'cookies': cookies,
             'effective_url': effective_url,
             'error': error,
             'request_time': request_time
-        })
+        }
+
+        if body is not None:
+            item['truncated'] = body.truncated
+            item['body_size'] = body.size
+            item['gzipped_body_size'] = body.gzipped_size
 
         self.redis.setex(
             cache_key,
             expiration,
-            value,
+            msgpack.packb(item),
         )
 
+        if validators:
+            # only what a 304 needs, the body is looked up by its hash
+            validated = dict((key, item[key]) for key in (
+                'body_hash', 'status_code', 'headers', 'effective_url', 'truncated', 'body_size', 'gzipped_body_size'
+            ) if key in item)
+            validated['validators'] = validators
+
+            self.redis.setex(
+                "validated-urls-%s" % url,
+                validated_expiration,
+                msgpack.packb(validated),
+            )
+
+    def flush_request_cache_stats(self):
+        counters, self.request_cache_counters = self.request_cache_counters, defaultdict(int)
+
+        if not counters:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for name, value in counters.items():
+            pipe.hincrby('request-cache-stats', name, value)
+        pipe.execute()
+
+    def acquire_fetch(self, url, expiration, duplicate_window):
+        '''Takes the lock of the fetch of url. Returns whether it was taken
+        and whether url was already fetched in the last duplicate_window
+        seconds.'''
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set('fetching-%s' % url, 1, ex=expiration, nx=True)
+        pipe.set('fetched-%s' % url, 1, ex=duplicate_window, nx=True)
+        acquired, first = pipe.execute()
+
+        return bool(acquired), not first
+
+    def extend_fetch(self, url, expiration):
+        return bool(self.redis.expire('fetching-%s' % url, expiration))
+
+    def release_fetch(self, url):
+        self.redis.delete('fetching-%s' % url)
+
+    def is_fetching(self, url):
+        return self.redis.exists('fetching-%s' % url)
+
+    def set_failed_fetch(self, url, expiration):
+        self.redis.setex('failed-fetch-%s' % url, expiration, 1)
+
+    def has_failed_fetch(self, url):
+        return self.redis.exists('failed-fetch-%s' % url)
+
+    def flush_fetch_stats(self, counters):
+        counters = dict((name, value) for name, value in (counters or {}).items() if value)
+
+        if not counters:
+            return
+
+        key = 'fetch-stats-%d' % (int(time.time()) // 60 * 60)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for name, value in counters.items():
+            pipe.hincrby(key, name, value)
+        pipe.expire(key, FETCH_STATS_MINUTES * 60)
+        pipe.execute()
+
+    def flush_transport_stats(self, hosts):
+        if not hosts:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for host, stats in hosts.items():
+            for field, value in stats.items():
+                pipe.hincrbyfloat('transport-stats', '%s:%s' % (host, field), value)
+        pipe.execute()
+
     def lock_next_job(self, url, expiration):
         return self.redis.lock('%s-next-job-lock' % url, expiration)
 
@@ -415,19 +948,63 @@ class SyncCache(object):
         self.redis.zincrby('page-scores', page_id, increment)
 
     def get_limiter_buckets(self, active_domains, avg_links_per_page=10.0):
-        available = []
-        all_limiters = reversed(sorted(Limiter.get_limiters_for_domains(self.db, active_domains), key=lambda item: item.url))
+        all_limiters = list(reversed(sorted(Limiter.get_limiters_for_domains(self.db, active_domains), key=lambda item: item.url)))
 
+        if not all_limiters:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
         for limiter in all_limiters:
-            capacity = float(limiter.value - self.get_limit_usage(limiter.url))
+            pipe.zcard('limit-for-%s' % limiter.url)
+        usages = pipe.execute()
+
+        available = []
+        for limiter, usage in zip(all_limiters, usages):
+            capacity = float(limiter.value - usage)
             available.append((limiter, capacity))
 
         return available
 
-    def fill_job_bucket(self, expiration, look_ahead_pages=1000, avg_links_per_page=10.0):
+    def get_pages_in_need_of_review(self, domain_ids, expired_time, last_page_ids, limit):
+        if not domain_ids:
+            return {}
+
+        selects = []
+        for domain_id in domain_ids:
+            query = sa.select([Page.id, Page.uuid, Page.url, Page.domain_id]) \
+                .where(Page.domain_id == domain_id) \
+                .where(Page.id > last_page_ids.get(domain_id, 0)) \
+                .where(or_(
+                    Page.last_review_date == None,
+                    Page.last_review_date <= expired_time
+                )) \
+                .order_by(Page.id) \
+                .limit(limit) \
+                .alias()
+            selects.append(sa.select([query]))
+
+        if len(selects) == 1:
+            statement = selects[0]
+        else:
+            statement = sa.union_all(*selects)
+
+        pages = {}
+        for page in self.db.execute(statement):
+            pages.setdefault(page.domain_id, []).append(page)
+
+        return pages
+
+    def fill_job_bucket(self, expiration, look_ahead_pages=1000, avg_links_per_page=10.0, domains_per_query=100):
         try:
             with Lock('next-job-fill-bucket-lock', redis=self.redis):
                 logging.info('Refilling job bucket. Lock acquired...')
+
+                item_count = int(self.redis.zcard('next-job-bucket'))
+                missing = look_ahead_pages - item_count
+
+                if missing <= 0:
+                    return
+
                 expired_time = datetime.utcnow() - timedelta(seconds=expiration)
 
                 active_domains = Domain.get_active_domains(self.db)
@@ -435,59 +1012,61 @@ class SyncCache(object):
                 if not active_domains:
                     return
 
-                active_domains_ids = [item.id for item in active_domains]
+                limiter_buckets = LimiterBuckets(
+                    self.get_limiter_buckets(active_domains, avg_links_per_page)
+                )
+                logging.debug('Available Limit Buckets: %s' % limiter_buckets)
 
-                limiter_buckets = self.get_limiter_buckets(active_domains, avg_links_per_page)
+                # each domain is asked for just enough pages to fill the bucket
+                # in a single round and is queried again only when it runs dry
+                batch_size = int(math.ceil(float(missing) / len(active_domains)))
 
-                all_domains_pages_in_need_of_review = []
+                pending = dict((domain.id, deque()) for domain in active_domains)
+                last_page_ids = {}
+                fetched_count = dict.fromkeys(pending, 0)
+                exhausted = set()
 
-                for domain_id in active_domains_ids:
-                    pages = self.db \
-                        .query(
-                            Page.uuid,
-                            Page.url,
-                            Page.score,
-                            Page.last_review_date
-                        ) \
-                        .filter(Page.domain_id == domain_id) \
-                        .filter(or_(
-                            Page.last_review_date == None,
-                            Page.last_review_date <= expired_time
-                        ))[:look_ahead_pages]
+                to_fetch = [domain.id for domain in active_domains]
+                jobs = []
 
-                    if pages:
-                        all_domains_pages_in_need_of_review.append(pages)
+                while to_fetch and len(jobs) < missing:
+                    for index in range(0, len(to_fetch), domains_per_query):
+                        domain_ids = to_fetch[index:index + domains_per_query]
+                        pages = self.get_pages_in_need_of_review(
+                            domain_ids, expired_time, last_page_ids, batch_size
+                        )
 
-                logging.debug('Total of %d pages found to add to redis.' % (sum([len(item) for item in all_domains_pages_in_need_of_review])))
+                        for domain_id in domain_ids:
+                            domain_pages = pages.get(domain_id, [])
+                            pending[domain_id].extend(domain_pages)
+                            fetched_count[domain_id] += len(domain_pages)
 
-                item_count = int(self.redis.zcard('next-job-bucket'))
-                current_domain = 0
-                while item_count < look_ahead_pages and len(all_domains_pages_in_need_of_review) > 0:
-                    if current_domain >= len(all_domains_pages_in_need_of_review):
-                        current_domain = 0
+                            if domain_pages:
+                                last_page_ids[domain_id] = domain_pages[-1].id
+
+                            if len(domain_pages) < batch_size or fetched_count[domain_id] >= look_ahead_pages:
+                                exhausted.add(domain_id)
 
-                    item = all_domains_pages_in_need_of_review[current_domain].pop(0)
+                    rotation = deque(domain_id for domain_id in to_fetch if pending[domain_id])
+                    to_fetch = []
 
-                    has_limit = True
-                    logging.debug('Available Limit Buckets: %s' % limiter_buckets)
-                    for index, (limit, available) in enumerate(limiter_buckets):
-                        if limit.matches(item.url):
-                            if available <= 0:
-                                has_limit = False
-                                break
-                            limiter_buckets[index] = (limit, available - 1)
+                    while rotation and len(jobs) < missing:
+                        domain_id = rotation.popleft()
+                        page = pending[domain_id].popleft()
 
-                    if has_limit:
-                        self.add_next_job_bucket(item.uuid, item.url)
-                        item_count += 1
+                        if limiter_buckets.consume(page.url):
+                            jobs.append(page)
 
-                    # if there are not any more pages in this domain remove it from dictionary
-                    if not all_domains_pages_in_need_of_review[current_domain]:
-                        del all_domains_pages_in_need_of_review[current_domain]
+                        if pending[domain_id]:
+                            rotation.append(domain_id)
+                        elif domain_id not in exhausted:
+                            to_fetch.append(domain_id)
 
-                    current_domain += 1
+                logging.debug('Total of %d pages fetched to add to redis.' % sum(fetched_count.values()))
 
-                logging.debug('ADDED A TOTAL of %d ITEMS TO REDIS...' % item_count)
+                self.add_next_jobs_to_bucket([(page.uuid, page.url) for page in jobs])
+
+                logging.debug('ADDED A TOTAL of %d ITEMS TO REDIS...' % len(jobs))
 
         except LockTimeout:
             logging.info("Can't acquire lock. Moving on...")
@@ -499,39 +1078,132 @@ class SyncCache(object):
             dumps({'page': str(uuid), 'url': url})
         )
 
-    def get_next_job_bucket(self):
+    def add_next_jobs_to_bucket(self, jobs, chunk_size=1000):
+        if not jobs:
+            return
+
+        now = time.time()
+
+        # jobs dropped after failing too many times stay out for a while
+        exhausted = set(self.redis.zrangebyscore('next-job-exhausted', now, '+inf'))
+        items = [dumps({'page': str(uuid), 'url': url}) for uuid, url in jobs]
+        items = [item for item in items if item not in exhausted]
+
         pipe = self.redis.pipeline(transaction=False)
 
-        try:
-            pipe.watch('next-job-bucket')
-            item = self.redis.zrange('next-job-bucket', 0, 0)
-            item = item[0]
-            pipe.multi()
-            self.redis.zrem('next-job-bucket', item)
-            pipe.execute()
-        except (WatchError, IndexError):
+        for index in range(0, len(items), chunk_size):
+            args = []
+            for offset, item in enumerate(items[index:index + chunk_size]):
+                # keeps the round-robin order inside a single ZADD
+                args.append(now + (index + offset) / 1000000.0)
+                args.append(item)
+            pipe.zadd('next-job-bucket', *args)
+
+        pipe.execute()
+
+    def claim_next_jobs(self, count=1, lease_expiration=0, max_attempts=0, exhausted_expiration=0):
+        remaining, items, dropped = self.claim_next_jobs_script(
+            keys=['next-job-bucket', 'next-job-leases', 'next-job-attempts', 'next-job-exhausted'],
+            args=[count, time.time(), lease_expiration, max_attempts, exhausted_expiration]
+        )
+
+        for item in dropped:
+            logging.warning('Dropping job %s after %d failed attempts.' % (item, max_attempts))
+
+        return int(remaining), items
+
+    def get_next_job_bucket(self):
+        remaining, items = self.claim_next_jobs(1)
+
+        if not items:
             return None
-        finally:
-            pipe.reset()
 
-        return item
+        return items[0]
 
-    def get_next_job(self, expiration, look_ahead_pages=1000):
-        logging.info('Getting next job from the bucket...')
-        item = self.get_next_job_bucket()
+    def get_next_jobs(self, expiration, look_ahead_pages=1000, count=1, lease_expiration=0, max_attempts=0):
+        logging.info('Claiming the next %d jobs from the bucket...' % count)
+        # a dropped job is left out until its page is due for review again
+        job_bucket_count, items = self.claim_next_jobs(count, lease_expiration, max_attempts, expiration)
 
-        job_bucket_count = self.redis.zcard('next-job-bucket')
         if job_bucket_count < look_ahead_pages * 0.1:
             logging.info('Bucket near empty (%d items). Must refill...' % job_bucket_count)
             self.fill_job_bucket(expiration, look_ahead_pages)
 
-        if item is None:
+        jobs = []
+        for item in items:
+            job = loads(item)
+            job['lease'] = item
+            logging.debug('Next job found: %s' % job['url'])
+            jobs.append(job)
+
+        return jobs
+
+    def get_next_job(self, expiration, look_ahead_pages=1000):
+        jobs = self.get_next_jobs(expiration, look_ahead_pages)
+
+        if not jobs:
             return None
 
-        item = loads(item)
-        logging.debug('Next job found: %s' % item['url'])
+        job = jobs[0]
+        del job['lease']
 
-        return item
+        return job
+
+    def renew_job_lease(self, lease, lease_expiration):
+        renewed = self.renew_job_lease_script(
+            keys=['next-job-leases'],
+            args=[lease, time.time() + lease_expiration]
+        )
+
+        return bool(renewed)
+
+    def release_job_lease(self, lease):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem('next-job-leases', lease)
+        pipe.hdel('next-job-attempts', lease)
+        pipe.execute()
+
+    def push_review_to_index(self, page_id, doc):
+        return self.push_review_to_index_script(
+            keys=['indexing-queue', 'indexing-queue-docs', 'indexing-versions', 'indexing-attempts'],
+            args=[page_id, dumps(doc), time.time()]
+        )
+
+    def claim_reviews_to_index(self, count, lease_expiration, max_attempts=0):
+        leases, dropped = self.claim_reviews_to_index_script(
+            keys=['indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'],
+            args=[count, time.time(), lease_expiration, max_attempts]
+        )
+
+        for page_id in dropped:
+            logging.warning('Dropping the review of page %s after %d failed indexing attempts.' % (page_id, max_attempts))
+
+        reviews = []
+        for lease in leases:
+            page_id, queued_at, version, doc = lease.split(':', 3)
+            reviews.append({
+                'page_id': int(page_id),
+                'queued_at': float(queued_at),
+                'doc': loads(doc),
+                'lease': lease
+            })
+
+        return reviews
+
+    def release_reviews_to_index(self, reviews):
+        if reviews:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem('indexing-leases', *[review['lease'] for review in reviews])
+            pipe.hdel('indexing-attempts', *[review['page_id'] for review in reviews])
+            pipe.execute()
+
+    def get_indexing_queue_status(self):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard('indexing-queue')
+        pipe.zrange('indexing-queue', 0, 0, withscores=True)
+        size, oldest = pipe.execute()
+
+        return get_indexing_queue_status(size, [item for pair in oldest for item in pair])
 
     def get_data(self, key, expiration, get_data_method):
         data = self.redis.get(key)
@@ -11,6 +11,7 @@ from materialgirl import Materializer
 from materialgirl.storage.redis import RedisStorage
 
 from holmes.cache import SyncCache
+from holmes.models.codec import ColumnCodec
 from holmes.utils import load_classes
 from holmes.config import Config
 
@@ -71,6 +72,8 @@ class BaseCLI(Shepherd):
 
         self.info("Connecting to \"%s\" using SQLAlchemy" % connstr)
 
+        ColumnCodec.configure(self.config)
+
         self.sqlalchemy_db_maker = sessionmaker(bind=engine, autoflush=autoflush)
         self.db = scoped_session(self.sqlalchemy_db_maker)
 
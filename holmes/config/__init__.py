@@ -14,10 +14,19 @@ Config.define('ZOMBIE_WORKER_TIME', 200,
               _('Time to remove a Worker from API List (must be greater than WORKER_SLEEP_TIME + Validation time)'), 'API')
 
 Config.define('WORKERS_LOOK_AHEAD_PAGES', 10000, _('Number of pages that will be retrieved when looking for the next job'), 'Worker')
+Config.define('WORKERS_JOB_BATCH_SIZE', 5, _('Number of jobs a worker claims from the job bucket at once'), 'Worker')
+Config.define('WORKERS_JOB_LEASE_EXPIRATION_IN_SECONDS', 5 * MINUTE,
+              _('Number of seconds a claimed job stays leased to a worker before going back to the job bucket'), 'Worker')
+Config.define('WORKERS_JOB_MAX_ATTEMPTS', 3,
+              _('Number of times in a row a job can go back to the job bucket with an expired lease before being dropped'),
+              'Worker')
 
 Config.define('CONNECT_TIMEOUT_IN_SECONDS', 10, _('Number of seconds a connection can take.'), 'Worker')
 Config.define('REQUEST_TIMEOUT_IN_SECONDS', 10, _('Number of seconds a request can take.'), 'Worker')
 
+Config.define('STREAMED_BODY_HEAD_SIZE_IN_BYTES', 4096,
+              _('Number of bytes kept from streamed asset responses (images, css and js) besides their sizes'), 'Worker')
+
 Config.define('HOLMES_API_URL', 'http://localhost:2368', ('URL that Worker will communicate with API'), 'Worker')
 Config.define('HOLMES_WEB_URL', 'http://local.holmes.com:9000', _('URL of the client side application of Holmes'), 'Web')
 
@@ -70,6 +79,9 @@ Config.define('MAX_IMAGE_ALT_SIZE', 70,
               _('Image alt attributes longer than 70 characters may be truncated in the results'),
               'Image Alt Attribute Validator')
 
+Config.define('MAX_SITEMAP_DEPTH', 2,
+              _('How many levels of nested sitemap indexes are followed from the root sitemaps'), 'Sitemap Facter')
+
 Config.define('HTTP_PROXY_HOST', None, _('HTTP Proxy Host to use'), 'Web')
 Config.define('HTTP_PROXY_PORT', None, _('HTTP Proxy Port to use'), 'Web')
 
@@ -102,6 +114,33 @@ Config.define('ELASTIC_SEARCH_INDEX', 'holmes', _('ElasticSearch index name'), '
 
 Config.define('ELASTIC_SEARCH_MAX_RETRIES', 3, _('ElasticSearch max number of retries'), 'ElasticSearchProvider')
 
+Config.define('ELASTIC_SEARCH_INDEX_SETTINGS', {'index': {'number_of_shards': 4}},
+              _('Settings of new ElasticSearch indexes'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_INDEX_MAPPING', None,
+              _('Mapping of new ElasticSearch indexes (defaults to the built-in review mapping)'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_REBUILD_INDEX_SETTINGS', {'number_of_replicas': 0, 'refresh_interval': '-1'},
+              _('Index settings used while an ElasticSearch index is rebuilt'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_WRITE_INDEXES_EXPIRATION_IN_SECONDS', 60,
+              _('How often the indexes receiving live writes are looked up (to start and stop writing to rebuilt indexes)'),
+              'ElasticSearchProvider')
+
+Config.define('ELASTIC_SEARCH_USE_INDEXING_QUEUE', True,
+              _('Whether workers push reviews to the indexing queue (consumed by holmes-indexer) instead of indexing them right away'),
+              'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_BULK_SIZE', 500, _('Max number of reviews sent in each bulk request by holmes-indexer'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_BULK_FLUSH_INTERVAL_IN_SECONDS', 5,
+              _('Max time holmes-indexer waits for a bulk request to fill before sending it'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_INDEXING_LEASE_IN_SECONDS', 300,
+              _('Time after which reviews claimed by a holmes-indexer that did not index them go back to the queue'),
+              'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_INDEXING_MAX_ATTEMPTS', 5,
+              _('Number of times the review of a page can go back to the indexing queue before being dropped'),
+              'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_RETRY_BACKOFF_IN_SECONDS', 1,
+              _('Wait before retrying a failed bulk request, doubled after each attempt'), 'ElasticSearchProvider')
+Config.define('ELASTIC_SEARCH_MAX_RETRY_BACKOFF_IN_SECONDS', 30,
+              _('Max wait before retrying a failed bulk request'), 'ElasticSearchProvider')
+
 # SENTRY ERROR HANDLER
 Config.define('USE_SENTRY', False, _('If set to true errors will be sent to sentry.'), 'Sentry')
 Config.define('SENTRY_DSN_URL', '', _('URL to use as sentry DSN.'), 'Sentry')
@@ -124,6 +163,8 @@ materials_expiration_in_seconds = {
     'blacklist_domain_count': 10 * MINUTE + 1,
     'most_common_violations': HOUR + 7,
     'failed_responses_count': HOUR + 13,
+    'domain_stats_reconciliation': HOUR + 3,
+    'violation_count_reconciliation': DAY + 19,
 }
 Config.define('MATERIALS_EXPIRATION_IN_SECONDS', materials_expiration_in_seconds, 'Expire times for materials', 'material')
 
@@ -135,6 +176,8 @@ materials_grace_period_in_seconds = {
     'blacklist_domain_count': 2 * materials_expiration_in_seconds['blacklist_domain_count'],
     'most_common_violations': 2 * materials_expiration_in_seconds['most_common_violations'],
     'failed_responses_count': 2 * materials_expiration_in_seconds['failed_responses_count'],
+    'domain_stats_reconciliation': 2 * materials_expiration_in_seconds['domain_stats_reconciliation'],
+    'violation_count_reconciliation': 2 * materials_expiration_in_seconds['violation_count_reconciliation'],
 }
 Config.define('MATERIALS_GRACE_PERIOD_IN_SECONDS', materials_grace_period_in_seconds, _('Grace period times for materials'), 'material')
 
@@ -146,13 +189,30 @@ materials_lock_timeout_in_seconds = {
     'blacklist_domain_count': 3 * materials_grace_period_in_seconds['blacklist_domain_count'] / 4,
     'most_common_violations': 3 * materials_grace_period_in_seconds['most_common_violations'] / 4,
     'failed_responses_count': 3 * materials_grace_period_in_seconds['failed_responses_count'] / 4,
+    'domain_stats_reconciliation': 3 * materials_grace_period_in_seconds['domain_stats_reconciliation'] / 4,
+    'violation_count_reconciliation': 3 * materials_grace_period_in_seconds['violation_count_reconciliation'] / 4,
 }
 Config.define('MATERIALS_LOCK_TIMEOUT_IN_SECONDS', materials_lock_timeout_in_seconds, _('Lock timeouts for materials'), 'material')
+Config.define('VIOLATION_COUNT_RECONCILIATION_ENABLED', False, _('Whether the material worker corrects the drift of the violation counts (once a day, domain by domain)'), 'material')
+Config.define('MATERIALS_CONCURRENCY', 4, _('Number of materials the material worker refreshes at the same time (each uses a database connection)'), 'material')
+Config.define('MATERIALS_CACHE_CHECK_INTERVAL_IN_SECONDS', 1, _('Seconds the API serves a material from its in process cache before checking whether it was refreshed'), 'material')
 
 Config.define('DEFAULT_PAGE_SCORE', 1, _('Page Score for pages that the user includes through the UI'), 'General')
 Config.define('PAGE_SCORE_TAX_RATE', 0.1, _('Default tax rate for scoring pages.'), 'General')
 
 Config.define('REQUEST_CACHE_EXPIRATION_IN_SECONDS', HOUR, _('Expiration in seconds for cache storage of responses.'), 'Cache')
+Config.define('FETCH_COALESCING_ACROSS_WORKERS', True,
+              _('Whether workers wait for the response of an url another worker is fetching instead of fetching it too.'), 'Cache')
+Config.define('FETCH_COALESCING_POLL_INTERVAL_IN_SECONDS', 0.2,
+              _('Interval in seconds between checks for the response of an url another worker is fetching.'), 'Cache')
+Config.define('DUPLICATE_FETCH_WINDOW_IN_SECONDS', 60,
+              _('Fetches of an url fetched less than this number of seconds before are counted as duplicates.'), 'Cache')
+Config.define('REQUEST_CACHE_LRU_SIZE_IN_BYTES', 32 * 1024 * 1024,
+              _('Size in bytes of the in-process cache of response bodies each worker keeps in front of redis.'), 'Cache')
+Config.define('VALIDATED_REQUEST_CACHE_MARGIN_IN_SECONDS', HOUR,
+              _('Seconds past the review expiration that responses with ETag or Last-Modified are kept, to revalidate them on the next review.'), 'Cache')
+Config.define('VALIDATED_REQUEST_MAX_BODY_SIZE_IN_BYTES', 512 * 1024,
+              _('Size in bytes of the largest body kept to revalidate its response on the next review (0 disables revalidation).'), 'Cache')
 
 Config.define('MAX_URL_LEVELS', 20, _('Maximum levels of URL'))
 
@@ -163,7 +223,6 @@ Config.define('LIMITER_VALUES_CACHE_EXPIRATION', 600, _('The expiration for valu
 Config.define('DEFAULT_NUMBER_OF_CONCURRENT_CONNECTIONS', 5, _('Default number of concurrent connections'), 'Limiter')
 
 Config.define('MOST_COMMON_VIOLATIONS_CACHE_EXPIRATION', 3 * HOUR, _('Expiration for the cache key for the most common violations'), 'Cache')
-Config.define('MOST_COMMON_VIOLATIONS_SAMPLE_LIMIT', 50000, _('Limit for the size of the Violation sample used in the aggregation'), 'Violation Handler')
 Config.define('TOP_CATEGORY_VIOLATIONS_SAMPLE_LIMIT', 50000, _('Size of the sample used in the top violations of a key category for domains'), 'Domain Handler')
 
 throttling_message_type = {
@@ -175,6 +234,13 @@ Config.define('EVENT_BUS_THROTTLING_MESSAGE_TYPE', throttling_message_type, _('T
 
 Config.define('SQLALCHEMY_AUTO_FLUSH', True, _('Defines whether auto-flush should be used in sqlalchemy'))
 
+Config.define('COLUMN_CODEC_SERIALIZER', 'json',
+              _('Serializer for stored fact and violation values (json or msgpack)'), 'Database')
+Config.define('COLUMN_CODEC_COMPRESSION_THRESHOLD', 512,
+              _('Stored fact and violation values bigger than this number of bytes are compressed with zlib'), 'Database')
+Config.define('DB_EXECUTOR_MAX_WORKERS', 10,
+              _('Threads running the database work of API requests (keep it below SQLALCHEMY_POOL_SIZE)'), 'Database')
+
 Config.define('DOMAINS_VIOLATIONS_PREFS_EXPIRATION_IN_SECONDS', HOUR, _('Expiration in seconds for domains violations prefs.'), 'Cache')
 
 Config.define('SECRET_KEY', 'set-a-secret-key', _('Secret key to use in JSON Web Token generation'), 'Sessions')
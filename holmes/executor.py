@@ -0,0 +1,49 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sys
+from multiprocessing.pool import ThreadPool
+
+from tornado.concurrent import TracebackFuture
+from tornado.ioloop import IOLoop
+
+
+def resolved_future(result):
+    '''A future already resolved with result, for code paths that don't
+    need to wait on the executor.'''
+
+    future = TracebackFuture()
+    future.set_result(result)
+    return future
+
+
+class ThreadPoolExecutor(object):
+    '''Runs blocking calls on a bounded pool of threads.
+
+    submit returns a tornado future resolved on the io loop, so it can be
+    yielded from coroutines or used with tornado.concurrent.run_on_executor.
+    '''
+
+    def __init__(self, max_workers, io_loop=None):
+        self.max_workers = max_workers
+        self.io_loop = io_loop or IOLoop.current()
+        self.pool = ThreadPool(max_workers)
+
+    def submit(self, fn, *args, **kwargs):
+        future = TracebackFuture()
+
+        def run():
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                self.io_loop.add_callback(future.set_exc_info, sys.exc_info())
+            else:
+                self.io_loop.add_callback(future.set_result, result)
+
+        self.pool.apply_async(run)
+
+        return future
+
+    def shutdown(self):
+        self.pool.close()
+        self.pool.join()
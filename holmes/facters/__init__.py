@@ -52,16 +52,37 @@ class Baser(object):
         self.reviewer.add_fact(key, value)
 
     def async_get(self, url, handler, method='GET', **kw):
-        self.reviewer._async_get(url, handler, method, **kw)
+        self.reviewer._async_get(url, handler, method, owner=self, **kw)
 
 
 class Facter(Baser):
 
     unit = 'value'
 
+    # review.data keys this facter fills. Facters that do not declare them
+    # hold back every validator until all of their requests are done.
+    provides = None
+
+    # keys (also in provides) that are only complete once the requests
+    # started by this facter are done
+    async_provides = ()
+
+    # facters that only read the status and headers (and with needs_size
+    # the body size) of the responses they request set needs_body to False,
+    # so the worker gets them without downloading their bodies
+    needs_body = True
+    needs_size = False
+
     @classmethod
     def get_fact_definitions(cls):
         raise NotImplementedError
 
+    def async_get(self, url, handler, method='GET', **kw):
+        if not self.needs_body:
+            kw.setdefault('skip_body', True)
+            kw.setdefault('need_size', self.needs_size)
+
+        super(Facter, self).async_get(url, handler, method, **kw)
+
     def add_violation(self, key, value):
         self.reviewer.add_violation(key, value)
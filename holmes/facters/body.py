@@ -5,13 +5,15 @@ from holmes.facters import Facter
 
 
 class BodyFacter(Facter):
+    provides = ('page.body',)
+
     @classmethod
     def get_fact_definitions(cls):
         return {}
 
     def get_facts(self):
 
-        body = self.reviewer.current_html.cssselect('body')
+        body = self.reviewer.current_html_index.find('body')
 
         if not body:
             return
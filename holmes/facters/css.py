@@ -4,10 +4,13 @@
 import logging
 
 from holmes.facters import Facter
+from holmes.streaming import get_body_size, get_gzipped_body_size
 from holmes.utils import _
 
 
 class CSSFacter(Facter):
+    provides = async_provides = ('page.css', 'total.size.css', 'total.size.css.gzipped')
+
     @classmethod
     def get_fact_definitions(cls):
         return {
@@ -79,7 +82,7 @@ class CSSFacter(Facter):
         )
 
         for url in css_to_get:
-            self.async_get(url, self.handle_url_loaded)
+            self.async_get(url, self.handle_url_loaded, streamed=True)
 
     def handle_url_loaded(self, url, response):
         logging.debug('Got response (%s) from %s!' % (response.status_code,
@@ -88,12 +91,8 @@ class CSSFacter(Facter):
         self.review.facts['page.css']['value'].add(url)
         self.review.data['page.css'].add((url, response))
 
-        if response.text:
-            size_css = len(response.text) / 1024.0
-            size_gzip = len(self.to_gzip(response.text)) / 1024.0
-        else:
-            size_css = 0
-            size_gzip = 0
+        size_css = get_body_size(response) / 1024.0
+        size_gzip = get_gzipped_body_size(response) / 1024.0
 
         self.review.facts['total.size.css']['value'] += size_css
         self.review.data['total.size.css'] += size_css
@@ -102,4 +101,4 @@ class CSSFacter(Facter):
         self.review.data['total.size.css.gzipped'] += size_gzip
 
     def get_css(self):
-        return self.reviewer.current_html.cssselect('link[href]')
+        return self.reviewer.current_html_index.find('link', 'href')
@@ -8,6 +8,7 @@ from holmes.utils import _
 
 
 class GoogleAnalyticsFacter(Facter):
+    provides = ('page.google_analytics',)
 
     @classmethod
     def get_fact_definitions(cls):
@@ -47,4 +48,4 @@ class GoogleAnalyticsFacter(Facter):
             )
 
     def get_script_data(self):
-        return self.reviewer.current_html.cssselect('script')
+        return self.reviewer.current_html_index.find('script')
@@ -6,6 +6,8 @@ from holmes.utils import _
 
 
 class HeadingHierarchyFacter(Facter):
+    provides = ('page.heading_hierarchy',)
+
     @classmethod
     def get_fact_definitions(cls):
         return {
@@ -33,4 +35,8 @@ class HeadingHierarchyFacter(Facter):
             )
 
     def get_heading(self):
-        return self.reviewer.current_html.cssselect('body h1,h2,h3,h4,h5,h6')
+        # same as cssselect('body h1,h2,h3,h4,h5,h6'): only h1 needs a body ancestor
+        return [
+            heading for heading in self.reviewer.current_html_index.find_all(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+            if heading.tag != 'h1' or next(heading.iterancestors('body'), None) is not None
+        ]
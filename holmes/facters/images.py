@@ -4,10 +4,16 @@
 import logging
 
 from holmes.facters import Facter
+from holmes.streaming import get_body_size
 from holmes.utils import _
 
 
 class ImageFacter(Facter):
+    provides = ('page.images', 'page.all_images', 'total.size.img')
+    async_provides = ('page.images', 'total.size.img')
+    needs_body = False
+    needs_size = True
+
     @classmethod
     def get_fact_definitions(cls):
         return {
@@ -39,7 +45,8 @@ class ImageFacter(Facter):
     def get_facts(self):
         img_files = self.get_images()
 
-        self.review.data['page.images'] = set()
+        # responses by url id
+        self.review.data['page.images'] = {}
         self.review.data['total.size.img'] = 0
 
         self.add_fact(
@@ -72,7 +79,7 @@ class ImageFacter(Facter):
         self.review.data['page.all_images'] = images_without_base64
 
         for src in images_to_get:
-            self.async_get(src, self.handle_url_loaded)
+            self.async_get(src, self.handle_url_loaded, streamed=True)
 
         self.add_fact(
             key='total.requests.img',
@@ -83,15 +90,13 @@ class ImageFacter(Facter):
         logging.debug('Got response (%s) from %s!' % (response.status_code,
                                                       url))
 
-        size_img = 0
-        if response.text:
-            size_img = len(response.text) / 1024.0
+        size_img = get_body_size(response) / 1024.0
 
         self.review.facts['page.images']['value'].add(url)
-        self.review.data['page.images'].add((url, response))
+        self.review.data['page.images'][self.review.urls.get_id(url)] = response
 
         self.review.facts['total.size.img']['value'] += size_img
         self.review.data['total.size.img'] += size_img
 
     def get_images(self):
-        return self.reviewer.current_html.cssselect(':not(script) img[src]')
+        return self.reviewer.current_html_index.find('img', 'src', include_root=False)
@@ -4,10 +4,13 @@
 import logging
 
 from holmes.facters import Facter
+from holmes.streaming import get_body_size, get_gzipped_body_size
 from holmes.utils import _
 
 
 class JSFacter(Facter):
+    provides = async_provides = ('page.js', 'total.size.js', 'total.size.js.gzipped')
+
     @classmethod
     def get_fact_definitions(cls):
         return {
@@ -77,7 +80,7 @@ class JSFacter(Facter):
         )
 
         for url in js_to_get:
-            self.async_get(url, self.handle_url_loaded)
+            self.async_get(url, self.handle_url_loaded, streamed=True)
 
     def handle_url_loaded(self, url, response):
         logging.debug('Got response (%s) from %s!' % (response.status_code,
@@ -86,12 +89,8 @@ class JSFacter(Facter):
         self.review.facts['page.js']['value'].add(url)
         self.review.data['page.js'].add((url, response))
 
-        if response.text:
-            size_js = len(response.text) / 1024.0
-            size_gzip = len(self.to_gzip(response.text)) / 1024.0
-        else:
-            size_js = 0
-            size_gzip = 0
+        size_js = get_body_size(response) / 1024.0
+        size_gzip = get_gzipped_body_size(response) / 1024.0
 
         self.review.facts['total.size.js']['value'] += size_js
         self.review.data['total.size.js'] += size_js
@@ -100,4 +99,4 @@ class JSFacter(Facter):
         self.review.data['total.size.js.gzipped'] += size_gzip
 
     def get_js_requests(self):
-        return self.reviewer.current_html.cssselect('script[src]')
+        return self.reviewer.current_html_index.find('script', 'src')
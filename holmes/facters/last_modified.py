@@ -9,6 +9,7 @@ from holmes.utils import _
 
 
 class LastModifiedFacter(Facter):
+    provides = ('page.last_modified',)
 
     @classmethod
     def get_fact_definitions(cls):
@@ -18,6 +18,10 @@ URL_RE = re.compile(
 
 
 class LinkFacter(Facter):
+    provides = ('page.links', 'page.all_links')
+    async_provides = ('page.links',)
+    needs_body = False
+
     @classmethod
     def get_fact_definitions(cls):
         return {
@@ -58,7 +62,8 @@ class LinkFacter(Facter):
     def get_facts(self):
         links = self.get_links()
 
-        self.review.data['page.links'] = set()
+        # responses by url id
+        self.review.data['page.links'] = {}
         self.review.data['page.all_links'] = links
 
         self.add_fact(
@@ -121,7 +126,7 @@ class LinkFacter(Facter):
     def handle_url_loaded(self, url, response):
         logging.debug('Got response (%s) from %s!' % (response.status_code, url))
         self.review.facts['page.links']['value'].add(url)
-        self.review.data['page.links'].add((url, response))
+        self.review.data['page.links'][self.review.urls.get_id(url)] = response
 
     def get_links(self):
-        return self.reviewer.current_html.cssselect(':not(script) a[href]')
+        return self.reviewer.current_html_index.find('a', 'href', include_root=False)
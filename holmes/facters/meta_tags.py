@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class MetaTagsFacter(Facter):
+    provides = ('meta.tags',)
 
     @classmethod
     def get_fact_definitions(cls):
@@ -71,7 +72,7 @@ class MetaTagsFacter(Facter):
         return data
 
     def get_meta_tags(self):
-        meta_tags = self.reviewer.current_html.cssselect('meta')
+        meta_tags = self.reviewer.current_html_index.find('meta')
         values = []
         for tags in meta_tags:
             values.append(dict(tags.items()))
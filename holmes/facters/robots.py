@@ -8,6 +8,7 @@ from holmes.utils import _
 
 
 class RobotsFacter(Facter):
+    provides = async_provides = ('robots.response',)
 
     @classmethod
     def get_fact_definitions(cls):
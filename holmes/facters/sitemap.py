@@ -3,18 +3,119 @@
 
 import logging
 import re
+import zlib
+from array import array
 import lxml.etree
-from cStringIO import StringIO
-from gzip import GzipFile
 
 from holmes.facters import Facter
+from holmes.streaming import get_body_size, get_gzipped_body_size
 from holmes.utils import _
 
 
 ROBOTS_SITEMAP = re.compile('Sitemap:\s+(.*)')
 
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+LOC_TAGS = ('loc', '{%s}loc' % SITEMAP_NAMESPACE)
+SITEMAP_TAGS = ('sitemap', '{%s}sitemap' % SITEMAP_NAMESPACE)
+URL_TAGS = ('url', '{%s}url' % SITEMAP_NAMESPACE)
+
+GZIP_MAGIC = '\x1f\x8b'
+
+
+class SitemapStream(object):
+    '''Parses a sitemap, plain or gzipped, chunk by chunk as it is downloaded.
+
+    Elements are dropped as soon as they are read, so neither the body nor
+    its tree is kept. Urls are only counted unless a UrlTable is given to
+    keep them, and then their ids grow with the sitemap (4 bytes each).
+    '''
+
+    def __init__(self, table=None):
+        self.table = table
+        self.url_ids = array('I') if table is not None else None
+        self.fed = False
+        self.gzipped = False
+        self.decompressor = None
+        self.failed = False
+        self.size = 0
+        self.sitemaps = []
+        self.urls_count = 0
+        self.parser = lxml.etree.XMLPullParser(events=('end',), encoding='utf-8', recover=True)
+
+    def feed(self, chunk):
+        if not chunk or self.failed:
+            return
+
+        if not self.fed:
+            self.fed = True
+            self.gzipped = chunk.startswith(GZIP_MAGIC)
+            if self.gzipped:
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if self.gzipped:
+            try:
+                chunk = self.decompressor.decompress(chunk)
+            except zlib.error:
+                logging.warning('Could not decompress gzipped sitemap.')
+                self.failed = True
+                return
+
+        self.parse(chunk)
+
+    def parse(self, data):
+        if not data:
+            return
+
+        self.size += len(data)
+
+        try:
+            self.parser.feed(data)
+        except lxml.etree.XMLSyntaxError:
+            self.failed = True
+            return
+
+        self.read_events()
+
+    def read_events(self):
+        for event, element in self.parser.read_events():
+            if element.tag in LOC_TAGS:
+                self.read_loc(element)
+            elif element.tag in SITEMAP_TAGS or element.tag in URL_TAGS:
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+
+    def read_loc(self, element):
+        parent = element.getparent()
+        if parent is None or not element.text:
+            return
+
+        loc = element.text.strip()
+
+        if parent.tag in SITEMAP_TAGS:
+            self.sitemaps.append(loc)
+        elif parent.tag in URL_TAGS:
+            self.urls_count += 1
+            if self.table is not None:
+                self.url_ids.append(self.table.get_id(loc))
+
+    def close(self):
+        if self.gzipped and not self.failed:
+            self.parse(self.decompressor.flush())
+
+        try:
+            self.parser.close()
+        except lxml.etree.XMLSyntaxError:
+            pass
+
+        self.read_events()
+
 
 class SitemapFacter(Facter):
+    provides = async_provides = (
+        'sitemap.data', 'sitemap.urls', 'sitemap.files', 'sitemap.files.size',
+        'sitemap.files.urls', 'total.size.sitemap', 'total.size.sitemap.gzipped'
+    )
 
     @classmethod
     def get_fact_definitions(cls):
@@ -41,6 +142,11 @@ class SitemapFacter(Facter):
             }
         }
 
+    def __init__(self, reviewer):
+        super(SitemapFacter, self).__init__(reviewer)
+        self.sitemap_depths = {}
+        self.sitemap_streams = {}
+
     def get_facts(self):
         if not self.reviewer.is_root():
             return
@@ -85,31 +191,60 @@ class SitemapFacter(Facter):
 
         return sitemaps
 
+    def keep_sitemap_urls(self):
+        # SitemapValidator requires them (it is in the default validators):
+        # it enqueues every url with a share of the page score that depends
+        # on the total count, only known once the whole sitemap is read
+        for validator in self.reviewer.validators:
+            if validator.requires is None or 'sitemap.urls' in validator.requires:
+                return True
+
+        return False
+
+    def create_sitemap_stream(self):
+        if self.keep_sitemap_urls():
+            return SitemapStream(self.review.urls)
+
+        return SitemapStream()
+
+    def load_sitemap(self, url, depth=0):
+        if url in self.sitemap_depths:
+            return
+
+        self.sitemap_depths[url] = depth
+
+        stream = self.sitemap_streams[url] = self.create_sitemap_stream()
+        self.async_get(url, self.handle_sitemap_loaded, streamed=True, chunk_callback=stream.feed)
+
     def handle_sitemap_loaded(self, url, response):
         logging.debug('Got sitemap %s with status %s' % (url, response.status_code))
         self.review.data['sitemap.data'][url] = response
 
-        namespaces = [
-            ('sm', 'http://www.sitemaps.org/schemas/sitemap/0.9'),
-        ]
+        stream = self.sitemap_streams.pop(url, None)
 
         if response.status_code > 399 or response.text is None or not response.text.strip():
             return
 
-        try:
-            gzipped = GzipFile(mode='r', fileobj=StringIO(response.text))
-            response.text = gzipped.read()
-        except IOError:
-            pass
+        # responses that did not come through the stream (cache hits)
+        if stream is None:
+            stream = self.create_sitemap_stream()
+        if not stream.fed:
+            stream.feed(response.text)
+
+        stream.close()
 
         self.review.facts['total.sitemap.indexes']['value'] += 1
 
-        size_sitemap = len(response.text) / 1024.0
-        size_gzip = len(self.to_gzip(response.text)) / 1024.0
+        size_sitemap = stream.size / 1024.0
+        if stream.gzipped:
+            size_gzip = get_body_size(response) / 1024.0  # served already gzipped
+        else:
+            size_gzip = get_gzipped_body_size(response) / 1024.0
 
-        self.review.data['sitemap.files.urls'][url] = 0
+        self.review.data['sitemap.files.urls'][url] = len(stream.sitemaps) + stream.urls_count
         self.review.data['sitemap.files.size'][url] = size_sitemap
-        self.review.data['sitemap.urls'][url] = set()
+        # url ids, in the order of the sitemap
+        self.review.data['sitemap.urls'][url] = stream.url_ids if stream.url_ids is not None else array('I')
 
         self.review.facts['total.size.sitemap']['value'] += size_sitemap
         self.review.data['total.size.sitemap'] += size_sitemap
@@ -117,25 +252,20 @@ class SitemapFacter(Facter):
         self.review.facts['total.size.sitemap.gzipped']['value'] += size_gzip
         self.review.data['total.size.sitemap.gzipped'] += size_gzip
 
-        magical_parser = lxml.etree.XMLParser(encoding='utf-8', recover=True)
-        tree = lxml.etree.parse(StringIO(response.text), magical_parser)
+        self.review.facts['total.sitemap.urls']['value'] += stream.urls_count
+
+        depth = self.sitemap_depths.get(url, 0)
 
-        for sitemap in tree.xpath('//sm:sitemap | //sitemap', namespaces=namespaces):
-            for loc in sitemap.xpath('sm:loc | loc', namespaces=namespaces):
-                loc = loc.text.strip()
-                self.review.data['sitemap.files'].add(loc)
-                self.review.data['sitemap.files.urls'][url] += 1
-                self.async_get(loc, self.handle_sitemap_loaded)
+        for loc in stream.sitemaps:
+            self.review.data['sitemap.files'].add(loc)
 
-        for sitemap in tree.xpath('//sm:url | //url', namespaces=namespaces):
-            for loc in sitemap.xpath('sm:loc | loc', namespaces=namespaces):
-                loc = loc.text.strip()
-                self.review.data['sitemap.urls'][url].add(loc)
-                self.review.data['sitemap.files.urls'][url] += 1
-                self.review.facts['total.sitemap.urls']['value'] += 1
+            if depth < self.config.MAX_SITEMAP_DEPTH:
+                self.load_sitemap(loc, depth + 1)
+            else:
+                logging.debug('Not following sitemap %s nested too deep in %s.' % (loc, url))
 
     def handle_robots_loaded(self, url, response):
         sitemaps = self.get_sitemaps(response)
 
         for sitemap in sitemaps:
-            self.async_get(sitemap, self.handle_sitemap_loaded)
+            self.load_sitemap(sitemap)
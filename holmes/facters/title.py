@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class TitleFacter(Facter):
+    provides = ('page.title', 'page.title_count')
 
     @classmethod
     def get_fact_definitions(cls):
@@ -18,7 +19,7 @@ class TitleFacter(Facter):
         }
 
     def get_facts(self):
-        titles = self.reviewer.current_html.cssselect('title')
+        titles = self.reviewer.current_html_index.find('title')
 
         if not titles:
             return
@@ -8,6 +8,7 @@ from ujson import dumps
 from tornado.web import RequestHandler
 
 from holmes import __version__
+from holmes.executor import resolved_future
 from holmes.models import User
 import holmes.utils as utils
 
@@ -113,6 +114,25 @@ class BaseHandler(RequestHandler):
         self.set_header("Content-Type", "application/json")
         self.write(dumps(obj))
 
+    def run_on_db(self, method, *args, **kw):
+        '''Runs method(db, *args, **kw) on the database executor with a
+        session of its own, returning a future with its result. The result
+        must not reference the session (return plain values, not models).'''
+
+        maker = getattr(self.application, 'request_db_maker', None)
+
+        if maker is None:
+            return resolved_future(method(self.db, *args, **kw))
+
+        def run():
+            db = maker()
+            try:
+                return method(db, *args, **kw)
+            finally:
+                db.close()
+
+        return self.application.db_executor.submit(run)
+
     @property
     def cache(self):
         return self.application.cache
@@ -124,3 +144,7 @@ class BaseHandler(RequestHandler):
     @property
     def girl(self):
         return self.application.girl
+
+    @property
+    def material_cache(self):
+        return self.application.material_cache
@@ -34,56 +34,54 @@ class DomainsFullDataHandler(BaseHandler):
 
     @coroutine
     def get(self):
-        result = self.girl.get('domains_details') or []
+        result = (yield self.material_cache.fetch('domains_details')) or []
         self.write_json(result)
 
 
 class DomainDetailsHandler(BaseHandler):
 
-    @coroutine
-    def get(self, domain_name):
-        domain = Domain.get_domain_by_name(domain_name, self.db)
+    @classmethod
+    def get_domain_data(cls, db, domain_name):
+        domain = Domain.get_domain_by_name(domain_name, db)
 
         if not domain:
-            self.set_status(404, self._('Domain %s not found') % domain_name)
-            return
+            return None
 
-        result = self.girl.get('domains_details') or []
-        data = next((l for l in result if l['name'] == domain_name), None)
+        homepage = domain.get_homepage(db)
 
-        if not data:
-            self.set_status(404, self._('Domain %s not found') % domain_name)
-            return
-
-        page_count = data.get('pageCount', 0)
-        review_count = data.get('reviewCount', 0)
-        violation_count = data.get('violationCount', 0)
-        error_percentage = data.get('errorPercentage', 0)
-        response_time_avg = data.get('averageResponseTime', 0)
-        review_percentage = data.get('reviewPercentage', 0)
-
-        domain_json = {
+        return {
             "id": domain.id,
             "name": domain.name,
             "url": domain.url,
-            "pageCount": page_count,
-            "reviewCount": review_count,
-            "violationCount": violation_count,
-            "reviewPercentage": review_percentage,
             "is_active": domain.is_active,
-            "errorPercentage": error_percentage,
-            "averageResponseTime": response_time_avg,
-            "homepageId": "",
-            "homepageReviewId": "",
+            "homepageId": str(homepage.uuid) if homepage and homepage.uuid else "",
+            "homepageReviewId": (
+                str(homepage.last_review_uuid) if homepage and homepage.last_review_uuid else ""
+            ),
         }
 
-        homepage = domain.get_homepage(self.db)
+    @coroutine
+    def get(self, domain_name):
+        domain_json = yield self.run_on_db(self.get_domain_data, domain_name)
+
+        if not domain_json:
+            self.set_status(404, self._('Domain %s not found') % domain_name)
+            return
+
+        data = yield self.material_cache.fetch_indexed('domains_details', 'name', domain_name)
+
+        if not data:
+            self.set_status(404, self._('Domain %s not found') % domain_name)
+            return
 
-        if homepage:
-            if homepage.uuid:
-                domain_json["homepageId"] = str(homepage.uuid)
-            if homepage.last_review_uuid:
-                domain_json["homepageReviewId"] = str(homepage.last_review_uuid)
+        domain_json.update({
+            "pageCount": data.get('pageCount', 0),
+            "reviewCount": data.get('reviewCount', 0),
+            "violationCount": data.get('violationCount', 0),
+            "reviewPercentage": data.get('reviewPercentage', 0),
+            "errorPercentage": data.get('errorPercentage', 0),
+            "averageResponseTime": data.get('averageResponseTime', 0),
+        })
 
         self.write_json(domain_json)
 
@@ -116,6 +114,7 @@ class DomainReviewsHandler(BaseHandler):
         term = self.get_argument('term', None)
         current_page = int(self.get_argument('current_page', 1))
         page_size = int(self.get_argument('page_size', 10))
+        cursor = self.get_argument('cursor', None)
 
         domain = Domain.get_domain_by_name(domain_name, self.db)
 
@@ -128,6 +127,7 @@ class DomainReviewsHandler(BaseHandler):
             current_page=current_page,
             page_size=page_size,
             page_filter=term,
+            cursor=cursor,
         )
 
         if 'error' in reviews:
@@ -157,7 +157,7 @@ class DomainGroupedViolationsHandler(BaseHandler):
 
         violation_defs = self.application.violation_definitions
 
-        grouped_violations = self.girl.get('violation_count_by_category_for_domains') or {}
+        grouped_violations = (yield self.material_cache.fetch('violation_count_by_category_for_domains')) or {}
 
         total = 0
         violations = []
@@ -200,7 +200,7 @@ class DomainTopCategoryViolationsHandler(BaseHandler):
 
         violation_defs = self.application.violation_definitions
 
-        top_violations = self.girl.get('top_violations_in_category_for_domains') or {}
+        top_violations = (yield self.material_cache.fetch('top_violations_in_category_for_domains')) or {}
 
         violations = []
         for top_violation in top_violations.get(domain_name, {}).get(key_category.id, []):
@@ -0,0 +1,11 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from holmes.handlers import BaseHandler
+from holmes.material import get_materials_status
+
+
+class MaterialsStatusHandler(BaseHandler):
+
+    def get(self):
+        self.write_json(get_materials_status(self.girl, self.girl.storage.redis))
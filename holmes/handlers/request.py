@@ -10,28 +10,12 @@ from holmes.handlers import BaseHandler
 
 class RequestDomainHandler(BaseHandler):
 
-    @coroutine
-    def get(self, domain_name, status_code):
-
-        if not domain_name:
-            self.set_status(404, self._('Domain %s not found') % domain_name)
-            return
-
-        if not status_code:
-            self.set_status(404, self._('Status code %s not found') % status_code)
-            return
-
-        if status_code == '200':
-            self.set_status(403, self._('Status code %s is not allowed') % status_code)
-            return
-
-        current_page = int(self.get_argument('current_page', 1))
-        page_size = int(self.get_argument('page_size', 10))
-
+    @classmethod
+    def get_requests(cls, db, domain_name, status_code, current_page, page_size):
         requests = Request.get_requests_by_status_code(
             domain_name,
             status_code,
-            self.db,
+            db,
             current_page=current_page,
             page_size=page_size
         )
@@ -39,7 +23,7 @@ class RequestDomainHandler(BaseHandler):
         requests_count = Request.get_requests_by_status_count(
             domain_name,
             status_code,
-            self.db
+            db
         )
 
         result = {
@@ -56,6 +40,30 @@ class RequestDomainHandler(BaseHandler):
                 'completed_date': request.completed_date
             })
 
+        return result
+
+    @coroutine
+    def get(self, domain_name, status_code):
+
+        if not domain_name:
+            self.set_status(404, self._('Domain %s not found') % domain_name)
+            return
+
+        if not status_code:
+            self.set_status(404, self._('Status code %s not found') % status_code)
+            return
+
+        if status_code == '200':
+            self.set_status(403, self._('Status code %s is not allowed') % status_code)
+            return
+
+        current_page = int(self.get_argument('current_page', 1))
+        page_size = int(self.get_argument('page_size', 10))
+
+        result = yield self.run_on_db(
+            self.get_requests, domain_name, status_code, current_page, page_size
+        )
+
         self.write_json(result)
 
 
@@ -78,7 +86,7 @@ class LastRequestsHandler(BaseHandler):
 class FailedResponsesHandler(BaseHandler):
     @coroutine
     def get(self):
-        requests = self.girl.get('failed_responses_count') or []
+        requests = (yield self.material_cache.fetch('failed_responses_count')) or []
         domain_filter = self.get_argument('domain_filter', None)
 
         if not domain_filter:
@@ -102,3 +110,24 @@ class LastRequestsStatusCodeHandler(BaseHandler):
         status_code = Request.get_all_status_code(self.db)
 
         self.write_json(status_code)
+
+
+class RequestCacheStatsHandler(BaseHandler):
+    @coroutine
+    def get(self):
+        stats = yield self.cache.get_request_cache_stats()
+        self.write_json(stats)
+
+
+class TransportStatsHandler(BaseHandler):
+    @coroutine
+    def get(self):
+        stats = yield self.cache.get_transport_stats()
+        self.write_json(stats)
+
+
+class FetchStatsHandler(BaseHandler):
+    @coroutine
+    def get(self):
+        stats = yield self.cache.get_fetch_stats()
+        self.write_json(stats)
@@ -4,6 +4,8 @@
 import datetime
 from uuid import UUID
 
+from tornado.gen import coroutine
+
 from holmes.models import Review, Page
 from holmes.handlers import BaseHandler
 
@@ -17,22 +19,20 @@ class BaseReviewHandler(BaseHandler):
 
 
 class ReviewHandler(BaseReviewHandler):
-    def get(self, page_uuid, review_uuid):
+    def get_review_data(self, db, page_uuid, review_uuid):
         review = None
         page = None
         if self._parse_uuid(review_uuid):
-            review = Review.by_uuid(review_uuid, self.db)
+            review = Review.by_uuid(review_uuid, db)
 
         if self._parse_uuid(page_uuid):
-            page = Page.by_uuid(page_uuid, self.db)
-
-        if not review and page:
-            self.redirect('/page/%s/review/%s/' % (page_uuid, page.last_review_uuid))
-            return
+            page = Page.by_uuid(page_uuid, db)
 
         if not page:
-            self.set_status(404, self._('Page UUID [%s] not found') % page_uuid)
-            return
+            return 'not_found', None
+
+        if not review:
+            return 'redirect', page.last_review_uuid
 
         result = review.to_dict(self.application.fact_definitions,
                                 self.application.violation_definitions,
@@ -42,14 +42,26 @@ class ReviewHandler(BaseReviewHandler):
             'violationCount': review.violation_count,
         })
 
+        return 'found', result
+
+    @coroutine
+    def get(self, page_uuid, review_uuid):
+        status, result = yield self.run_on_db(self.get_review_data, page_uuid, review_uuid)
+
+        if status == 'redirect':
+            self.redirect('/page/%s/review/%s/' % (page_uuid, result))
+            return
+
+        if status == 'not_found':
+            self.set_status(404, self._('Page UUID [%s] not found') % page_uuid)
+            return
+
         self.write_json(result)
 
 
 class LastReviewsHandler(BaseReviewHandler):
-    def get(self):
-        reviews = Review.get_last_reviews(
-            self.db, domain_filter=self.get_argument('domain_filter', None)
-        )
+    def get_reviews_data(self, db, domain_filter):
+        reviews = Review.get_last_reviews(db, domain_filter=domain_filter)
 
         reviews_json = []
         for review in reviews:
@@ -62,6 +74,14 @@ class LastReviewsHandler(BaseReviewHandler):
             review_dict.update(data)
             reviews_json.append(review_dict)
 
+        return reviews_json
+
+    @coroutine
+    def get(self):
+        reviews_json = yield self.run_on_db(
+            self.get_reviews_data, self.get_argument('domain_filter', None)
+        )
+
         self.write_json(reviews_json)
 
 
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from sqlalchemy import or_
+from tornado.gen import coroutine
 
 from holmes.models import Page
 from holmes.handlers import BaseHandler
@@ -33,3 +34,11 @@ class SearchHandler(BaseHandler):
             "reviewId": str(page.last_review.uuid),
             "domain": domain_name
         })
+
+
+class IndexingStatusHandler(BaseHandler):
+
+    @coroutine
+    def get(self):
+        status = yield self.cache.get_indexing_queue_status()
+        self.write_json(status)
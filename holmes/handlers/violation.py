@@ -12,7 +12,7 @@ class MostCommonViolationsHandler(BaseHandler):
 
     @gen.coroutine
     def get(self):
-        violations = dict(self.girl.get('most_common_violations') or [])
+        violations = dict((yield self.material_cache.fetch('most_common_violations')) or [])
 
         result = []
         for violation in self.application.violation_definitions.values():
@@ -35,6 +35,7 @@ class ViolationHandler(BaseHandler):
         page_size = int(self.get_argument('page_size', 10))
         domain_filter = self.get_argument('domain_filter', None)
         page_filter = self.get_argument('page_filter', None)
+        cursor = self.get_argument('cursor', None)
 
         domain = None
         if domain_filter is not None:
@@ -59,6 +60,7 @@ class ViolationHandler(BaseHandler):
             page_size=page_size,
             domain=domain,
             page_filter=page_filter,
+            cursor=cursor,
         )
 
         if 'error' in violation:
@@ -83,7 +85,7 @@ class ViolationDomainsHandler(BaseHandler):
     def __init__(self, *args, **kw):
         super(ViolationDomainsHandler, self).__init__(*args, **kw)
         self.key_details_handler = {
-            'blacklist.domains': partial(self.girl.get, 'blacklist_domain_count')
+            'blacklist.domains': partial(self.material_cache.fetch, 'blacklist_domain_count')
         }
 
     @gen.coroutine
@@ -99,7 +101,7 @@ class ViolationDomainsHandler(BaseHandler):
         violation_category = violations[key_name]['category']
         key_id = violations[key_name]['key'].id
 
-        grouped_violations = self.girl.get('violation_count_for_domains') or {}
+        grouped_violations = (yield self.material_cache.fetch('violation_count_for_domains')) or {}
         domains = grouped_violations.get(key_id, [])
 
         violation = {
@@ -111,7 +113,7 @@ class ViolationDomainsHandler(BaseHandler):
         }
 
         if key_name in self.key_details_handler:
-            violation['details'] = self.key_details_handler[key_name]() or []
+            violation['details'] = (yield self.key_details_handler[key_name]()) or []
 
         self.write_json(violation)
         self.finish()
@@ -0,0 +1,53 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+class HtmlIndex(object):
+    '''Elements of a parsed page grouped by tag in a single pass.
+
+    Facters and validators query it instead of walking the whole tree once
+    per cssselect call. Every lookup returns elements in document order.
+    '''
+
+    def __init__(self, root):
+        self.root = root
+        self.tags = {}
+        self.positions = {}
+        self.cache = {}
+
+        if root is None:
+            return
+
+        for position, element in enumerate(root.iter()):
+            if not isinstance(element.tag, basestring):  # comments and PIs
+                continue
+
+            self.tags.setdefault(element.tag, []).append(element)
+            self.positions[element] = position
+
+    def find(self, tag, attribute=None, include_root=True):
+        '''Same as cssselect('tag[attribute]'), or as
+        cssselect(':not(script) tag[attribute]') when include_root is False.'''
+
+        key = (tag, attribute, include_root)
+
+        elements = self.cache.get(key, None)
+        if elements is None:
+            elements = self.tags.get(tag, [])
+
+            if attribute is not None:
+                elements = [element for element in elements if element.get(attribute) is not None]
+
+            if not include_root:
+                elements = [element for element in elements if element is not self.root]
+
+            self.cache[key] = elements
+
+        return list(elements)
+
+    def find_all(self, tags):
+        elements = []
+        for tag in tags:
+            elements.extend(self.tags.get(tag, []))
+
+        return sorted(elements, key=self.positions.get)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+from uuid import uuid4
+
+from colorama import Fore, Style
+
+from holmes.cli import BaseCLI
+
+
+class IndexerWorker(BaseCLI):
+    '''Consumes the indexing queue, sending reviews to the search provider
+    in bulk requests.'''
+
+    def initialize(self):
+        self.uuid = uuid4().hex
+        self.db = None
+
+        authnz_wrapper_class = self.load_authnz_wrapper()
+        if authnz_wrapper_class:
+            self.authnz_wrapper = authnz_wrapper_class(self.config)
+        else:
+            self.authnz_wrapper = None
+
+        self.error_handlers = [handler(self.config) for handler in self.load_error_handlers()]
+
+        self.search_provider = self.load_search_provider()(
+            config=self.config,
+            db=None,
+            authnz_wrapper=self.authnz_wrapper
+        )
+
+        self.connect_to_redis()
+
+    def get_description(self):
+        uuid = str(getattr(self, 'uuid', ''))
+
+        return "%s%sholmes-indexer-%s%s" % (
+            Fore.BLUE,
+            Style.BRIGHT,
+            uuid,
+            Style.RESET_ALL,
+        )
+
+    def claim_reviews(self):
+        bulk_size = self.config.ELASTIC_SEARCH_BULK_SIZE
+        flush_interval = self.config.ELASTIC_SEARCH_BULK_FLUSH_INTERVAL_IN_SECONDS
+        lease_expiration = self.config.ELASTIC_SEARCH_INDEXING_LEASE_IN_SECONDS
+        max_attempts = self.config.ELASTIC_SEARCH_INDEXING_MAX_ATTEMPTS
+
+        started = time.time()
+        reviews = []
+
+        while True:
+            reviews.extend(self.cache.claim_reviews_to_index(bulk_size - len(reviews), lease_expiration, max_attempts))
+
+            if len(reviews) >= bulk_size or time.time() - started >= flush_interval:
+                return reviews
+
+            time.sleep(min(0.5, flush_interval))
+
+    def index_reviews(self, reviews):
+        docs = [review['doc'] for review in reviews]
+        backoff = self.config.ELASTIC_SEARCH_RETRY_BACKOFF_IN_SECONDS
+        max_retries = self.config.ELASTIC_SEARCH_MAX_RETRIES
+
+        for attempt in range(max_retries):
+            docs = self.search_provider.index_docs(docs)
+
+            if not docs or attempt >= max_retries - 1:
+                break
+
+            self.warn('%d reviews could not be indexed. Retrying in %.1fs...' % (len(docs), backoff))
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.config.ELASTIC_SEARCH_MAX_RETRY_BACKOFF_IN_SECONDS)
+
+        failed = set([doc['page_id'] for doc in docs])
+
+        # reviews left leased go back to the queue when their leases expire
+        self.cache.release_reviews_to_index([
+            review for review in reviews if review['page_id'] not in failed
+        ])
+
+        if failed:
+            self.error('%d reviews could not be indexed. They will be retried when their leases expire.' % len(failed))
+
+        return len(reviews) - len(failed)
+
+    def do_work(self):
+        reviews = self.claim_reviews()
+
+        if reviews:
+            indexed = self.index_reviews(reviews)
+
+            lag = time.time() - min(review['queued_at'] for review in reviews)
+            self.info('Indexed %d of %d reviews (lag of %.1fs).' % (indexed, len(reviews), lag))
+
+        status = self.cache.get_indexing_queue_status()
+        self.info('Indexing queue has %(queueSize)d reviews (lag of %(lagInSeconds).1fs).' % status)
+
+
+def main():
+    worker = IndexerWorker(sys.argv[1:])
+    worker.run()
+
+if __name__ == '__main__':
+    main()
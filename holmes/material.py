@@ -2,17 +2,218 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import time
 from uuid import uuid4
 from functools import partial
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+
+from six.moves.queue import Queue, Empty
+from ujson import dumps, loads
 
 from holmes.cli import BaseCLI
+from holmes.executor import resolved_future
 from holmes.models.domain import Domain
 from holmes.models.violation import Violation
 from holmes.models.request import Request
+from holmes.models.domain_stats import DomainStats
+from holmes.models.violation_count import ViolationCount
 from holmes.utils import get_domain_from_url
 
 
+MATERIAL_STATS_KEY = '_material_stats'
+
+# Materials refreshed again right after the materials they are computed
+# from are refreshed (they never wait for them)
+MATERIAL_DEPENDENCIES = {
+    'domains_details': ('domain_stats_reconciliation',),
+    'violation_count_for_domains': ('violation_count_reconciliation',),
+    'violation_count_by_category_for_domains': ('violation_count_reconciliation',),
+    'top_violations_in_category_for_domains': ('violation_count_reconciliation',),
+    'most_common_violations': ('violation_count_reconciliation',),
+}
+
+
+def get_material_dependents(key):
+    return [name for name, dependencies in MATERIAL_DEPENDENCIES.items() if key in dependencies]
+
+
+def get_materials_status(girl, redis):
+    stats = redis.hgetall(MATERIAL_STATS_KEY) or {}
+    now = time.time()
+
+    result = []
+    for key in sorted(girl.materials):
+        material = girl.materials[key]
+        status = {
+            'key': key,
+            'expirationInSeconds': material.expiration,
+            'refreshedAt': None,
+            'refreshDurationInSeconds': None,
+            'stalenessInSeconds': None,
+            'isStale': True,
+        }
+
+        if key in stats:
+            data = loads(stats[key])
+            staleness = max(now - data['refreshedAt'], 0)
+            status.update({
+                'refreshedAt': data['refreshedAt'],
+                'refreshDurationInSeconds': data['durationInSeconds'],
+                'stalenessInSeconds': staleness,
+                'isStale': staleness > material.expiration,
+            })
+
+        result.append(status)
+
+    return result
+
+
+def get_material_version(redis, key):
+    stats = redis.hget(MATERIAL_STATS_KEY, key)
+    return loads(stats)['refreshedAt'] if stats else None
+
+
+class MaterialCache(object):
+    '''Per process cache of decoded materials in front of the material girl.
+
+    Each material is kept with its version (the time the material worker
+    stored it), which is checked at most every check_interval seconds, so
+    requests don't fetch and decode the whole material from redis. Indexes
+    registered with add_index are built once per version. Materials without
+    a version are never cached, as their changes can't be detected.
+
+    Given an executor, fetch and fetch_indexed run the redis calls on it
+    and return futures, so the io loop doesn't wait on redis. A cache miss
+    loads the material on the executor through db, the scoped session the
+    materials were configured with, so the session of the executor thread
+    is removed after each call instead of holding a connection and a stale
+    transaction.
+    '''
+
+    def __init__(self, girl, check_interval=1, executor=None, db=None):
+        self.girl = girl
+        self.redis = girl.storage.redis
+        self.check_interval = check_interval
+        self.executor = executor
+        self.db = db
+        self.entries = {}
+        self.indexers = defaultdict(dict)
+        self.refreshing = False
+
+    def add_index(self, key, name, index_method):
+        self.indexers[key][name] = index_method
+
+    def load(self, key, version):
+        entry = {
+            'value': self.girl.get(key),
+            'version': version,
+            'indexes': {},
+            'checked_at': time.time(),
+        }
+
+        if version is not None and entry['value'] is not None:
+            self.entries[key] = entry
+        else:
+            self.entries.pop(key, None)
+
+        return entry
+
+    def get_entry(self, key):
+        entry = self.entries.get(key)
+
+        if entry is not None and time.time() - entry['checked_at'] < self.check_interval:
+            return entry
+
+        version = get_material_version(self.redis, key)
+
+        if entry is not None and entry['version'] == version:
+            entry['checked_at'] = time.time()
+            return entry
+
+        return self.load(key, version)
+
+    def get(self, key):
+        return self.get_entry(key)['value']
+
+    def get_indexed(self, key, index_name, item_key):
+        entry = self.get_entry(key)
+
+        if index_name not in entry['indexes']:
+            entry['indexes'][index_name] = self.indexers[key][index_name](entry['value'])
+
+        return entry['indexes'][index_name].get(item_key)
+
+    def is_fresh(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and time.time() - entry['checked_at'] < self.check_interval
+
+    def submit(self, method, *args):
+        def run():
+            try:
+                return method(*args)
+            finally:
+                # only scoped sessions have a session per thread to remove
+                remove = getattr(self.db, 'remove', None)
+                if remove is not None:
+                    remove()
+
+        return self.executor.submit(run)
+
+    def run(self, method, *args):
+        if self.executor is None or self.is_fresh(args[0]):
+            return resolved_future(method(*args))
+
+        return self.submit(method, *args)
+
+    def fetch(self, key):
+        return self.run(self.get, key)
+
+    def fetch_indexed(self, key, index_name, item_key):
+        return self.run(self.get_indexed, key, index_name, item_key)
+
+    def refresh(self):
+        '''Reloads the cached materials the worker has refreshed since they
+        were loaded. Meant to run in the background.'''
+
+        if not self.entries:
+            return
+
+        stats = self.redis.hgetall(MATERIAL_STATS_KEY) or {}
+
+        for key, entry in self.entries.items():
+            version = loads(stats[key])['refreshedAt'] if key in stats else None
+
+            if version != entry['version']:
+                self.load(key, version)
+            else:
+                entry['checked_at'] = time.time()
+
+    def refresh_in_background(self):
+        if self.executor is None:
+            return self.refresh()
+
+        if self.refreshing:
+            return
+
+        self.refreshing = True
+
+        def refresh():
+            try:
+                self.refresh()
+            finally:
+                self.refreshing = False
+
+        self.submit(refresh)
+
+
+def configure_material_cache(material_cache):
+    material_cache.add_index(
+        'domains_details', 'name',
+        lambda details: dict((item['name'], item) for item in details or [])
+    )
+
+
 # Materials grouped by domain should be expired bellow, this function is called
 # every time a new domain is added (see holmes/models/page.py:Page.add_domain)
 def expire_materials(girl):
@@ -31,6 +232,23 @@ def configure_materials(girl, db, config):
         config.MATERIALS_LOCK_TIMEOUT_IN_SECONDS['domains_details']
     )
 
+    girl.add_material(
+        'domain_stats_reconciliation',
+        partial(MaterialConveyor.reconcile_domain_stats, db),
+        config.MATERIALS_EXPIRATION_IN_SECONDS['domain_stats_reconciliation'],
+        config.MATERIALS_GRACE_PERIOD_IN_SECONDS['domain_stats_reconciliation'],
+        config.MATERIALS_LOCK_TIMEOUT_IN_SECONDS['domain_stats_reconciliation']
+    )
+
+    if config.VIOLATION_COUNT_RECONCILIATION_ENABLED:
+        girl.add_material(
+            'violation_count_reconciliation',
+            partial(MaterialConveyor.reconcile_violation_counts, db),
+            config.MATERIALS_EXPIRATION_IN_SECONDS['violation_count_reconciliation'],
+            config.MATERIALS_GRACE_PERIOD_IN_SECONDS['violation_count_reconciliation'],
+            config.MATERIALS_LOCK_TIMEOUT_IN_SECONDS['violation_count_reconciliation']
+        )
+
     girl.add_material(
         'violation_count_for_domains',
         partial(MaterialConveyor.get_violation_count_for_domains, db),
@@ -69,11 +287,7 @@ def configure_materials(girl, db, config):
 
     girl.add_material(
         'most_common_violations',
-        partial(
-            Violation.get_most_common_violations_names,
-            db,
-            config.get('MOST_COMMON_VIOLATIONS_SAMPLE_LIMIT')
-        ),
+        partial(Violation.get_most_common_violations_names, db),
         config.MATERIALS_EXPIRATION_IN_SECONDS['most_common_violations'],
         config.MATERIALS_GRACE_PERIOD_IN_SECONDS['most_common_violations'],
         config.MATERIALS_LOCK_TIMEOUT_IN_SECONDS['most_common_violations']
@@ -93,6 +307,18 @@ def configure_materials(girl, db, config):
 
 
 class MaterialConveyor(object):
+    @classmethod
+    def reconcile_domain_stats(cls, db):
+        # corrects any drift of the counters kept by the write paths, in a
+        # transaction per domain
+        return DomainStats.reconcile(db, commit=db.commit)
+
+    @classmethod
+    def reconcile_violation_counts(cls, db):
+        # corrects any drift of the counts kept as reviews are saved, in a
+        # transaction per domain
+        return ViolationCount.reconcile(db, commit=db.commit)
+
     @classmethod
     def get_blacklist_domain_count(cls, db):
         ungrouped = defaultdict(int)
@@ -154,11 +380,138 @@ class MaterialWorker(BaseCLI):
 
         self.configure_material_girl()
 
+        self.pool = ThreadPool(self.config.get('MATERIALS_CONCURRENCY'))
+
+    def is_expired(self, key):
+        material = self.girl.materials[key]
+        return self.girl.storage.is_expired(key, material.expiration) or material.is_expired
+
+    def get_deadline(self, key):
+        '''Seconds until the stored material expires, negative when it is
+        overdue.'''
+
+        ttl = self.redis_material.ttl(key)
+        if ttl is None or ttl < 0 or self.redis_material.exists('_expired_%s' % key):
+            return float('-inf')
+
+        return ttl - self.girl.materials[key].expiration
+
+    def refresh_material(self, key, force=False):
+        '''Refreshes a material on the calling thread (with its own session,
+        as self.db is thread scoped). Returns whether it was refreshed.'''
+
+        material = self.girl.materials[key]
+        lock = self.girl.storage.acquire_lock(key, timeout=material.lock_timeout)
+
+        if lock is None:
+            self.info('%s is locked, skipping.' % key)
+            return False
+
+        try:
+            if not force and not self.is_expired(key):
+                return False
+
+            started = time.time()
+            self.girl.storage.store(
+                key, material.get(),
+                expiration=material.expiration,
+                grace_period=material.grace_period
+            )
+            finished = time.time()
+            material.expiration_date = finished + material.expiration
+
+            self.redis_material.hset(MATERIAL_STATS_KEY, key, dumps({
+                'refreshedAt': finished,
+                'durationInSeconds': finished - started,
+            }))
+
+            self.info('Refreshed %s in %.2fs.' % (key, finished - started))
+            return True
+        except Exception:
+            err = sys.exc_info()[1]
+            self.error('Could not refresh %s: %s' % (key, err))
+            return False
+        finally:
+            self.girl.storage.release_lock(lock)
+            self.db.remove()
+
+    def _refresh_material_into(self, done, key, force):
+        try:
+            result = self.refresh_material(key, force)
+        except Exception:
+            err = sys.exc_info()[1]
+            self.error('Could not refresh %s: %s' % (key, err))
+            result = False
+
+        done.put((key, result))
+
+    def get_due_materials(self, running, forced, skipped):
+        due = [
+            key for key in self.girl.materials
+            if key not in running and (key in forced or (key not in skipped and self.is_expired(key)))
+        ]
+
+        return sorted(due, key=self.get_deadline)
+
+    def get_rescan_timeout(self, running, skipped):
+        '''Seconds until the next idle material is due, so it doesn't wait
+        for the running ones to finish.'''
+
+        deadlines = [
+            self.get_deadline(key) for key in self.girl.materials
+            if key not in running and key not in skipped
+        ]
+
+        if not deadlines:
+            return None
+
+        return max(min(deadlines), 1)
+
+    def refresh_materials(self):
+        '''Keeps the pool refreshing the expired materials, the most overdue
+        first, rescanning the expirations whenever a refresh finishes or the
+        next material is due, so a slow material never holds the others
+        back. Materials are refreshed again after the materials they are
+        computed from. Materials that were locked or failed are left for the
+        next run. Returns the refreshed keys once nothing is running or due.'''
+
+        concurrency = self.config.get('MATERIALS_CONCURRENCY')
+        running = set()
+        forced = set()
+        skipped = set()
+        done = Queue()
+        refreshed = []
+
+        while True:
+            for key in self.get_due_materials(running, forced, skipped)[:max(concurrency - len(running), 0)]:
+                running.add(key)
+                self.pool.apply_async(self._refresh_material_into, (done, key, key in forced))
+                forced.discard(key)
+
+            if not running:
+                return refreshed
+
+            try:
+                key, result = done.get(timeout=self.get_rescan_timeout(running, skipped))
+            except Empty:
+                continue
+
+            running.discard(key)
+
+            if not result:
+                skipped.add(key)
+                continue
+
+            refreshed.append(key)
+
+            for dependent in get_material_dependents(key):
+                if dependent in self.girl.materials:
+                    forced.add(dependent)
+
     def do_work(self):
         self.info('Running material girl...')
-        self.db.begin(subtransactions=True)
-        self.girl.run()
-        self.db.close()
+        refreshed = self.refresh_materials()
+        self.info('Refreshed %d materials.' % len(refreshed))
 
 
 def main():
@@ -0,0 +1,46 @@
+"""create violation_counts table
+
+Revision ID: 1d9b6e4f3a27
+Revises: 4c7e1a5d2b90
+Create Date: 2026-10-18 11:48:05.261734
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1d9b6e4f3a27'
+down_revision = '4c7e1a5d2b90'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'violation_counts',
+        sa.Column('domain_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('key_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('count', sa.Integer, server_default='0', nullable=False)
+    )
+
+    op.create_foreign_key(
+        'fk_violation_counts_domain', 'violation_counts',
+        'domains', ['domain_id'], ['id'], ondelete='CASCADE'
+    )
+
+    op.create_foreign_key(
+        'fk_violation_counts_key', 'violation_counts',
+        'keys', ['key_id'], ['id']
+    )
+
+    op.execute(
+        'INSERT INTO violation_counts (domain_id, key_id, count) '
+        'SELECT domain_id, key_id, COUNT(id) FROM violations '
+        'WHERE review_is_active = 1 AND domain_id IS NOT NULL '
+        'GROUP BY domain_id, key_id'
+    )
+
+
+def downgrade():
+    op.drop_constraint('fk_violation_counts_domain', 'violation_counts', type_='foreignkey')
+    op.drop_constraint('fk_violation_counts_key', 'violation_counts', type_='foreignkey')
+    op.drop_table('violation_counts')
@@ -0,0 +1,25 @@
+"""Pages: domain and violations count index
+
+Revision ID: 3b8d2f6a91c4
+Revises: 2e3c3d79c318
+Create Date: 2026-10-18 10:12:31.418205
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3b8d2f6a91c4'
+down_revision = '2e3c3d79c318'
+
+from alembic import op
+
+
+def upgrade():
+    # innodb appends the primary key to secondary indexes, so this also
+    # serves the (violations_count, id) keyset of the domain reviews cursor
+    op.create_index(
+        'idx_pages_domain_violations_count', 'pages', ['domain_id', 'violations_count']
+    )
+
+
+def downgrade():
+    op.drop_index('idx_pages_domain_violations_count', 'pages')
@@ -0,0 +1,55 @@
+"""create domain_stats table
+
+Revision ID: 4c7e1a5d2b90
+Revises: 3b8d2f6a91c4
+Create Date: 2026-10-18 11:02:47.903118
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4c7e1a5d2b90'
+down_revision = '3b8d2f6a91c4'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'domain_stats',
+        sa.Column('domain_id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('page_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('review_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('violation_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('good_request_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('bad_request_count', sa.Integer, server_default='0', nullable=False),
+        sa.Column('response_time_sum', sa.Float, server_default='0', nullable=False)
+    )
+
+    op.create_foreign_key(
+        'fk_domain_stats_domain', 'domain_stats',
+        'domains', ['domain_id'], ['id'], ondelete='CASCADE'
+    )
+
+    op.execute(
+        'INSERT INTO domain_stats (domain_id, page_count, review_count, violation_count, '
+        'good_request_count, bad_request_count, response_time_sum) '
+        'SELECT domains.id, '
+        '(SELECT COUNT(id) FROM pages WHERE pages.domain_id = domains.id), '
+        '(SELECT COUNT(DISTINCT page_id) FROM reviews '
+        'WHERE reviews.domain_id = domains.id AND reviews.is_active = 1), '
+        '(SELECT COUNT(id) FROM violations '
+        'WHERE violations.domain_id = domains.id AND violations.review_is_active = 1), '
+        '(SELECT COUNT(id) FROM requests '
+        'WHERE requests.domain_name = domains.name AND requests.status_code < 400), '
+        '(SELECT COUNT(id) FROM requests '
+        'WHERE requests.domain_name = domains.name AND requests.status_code >= 400), '
+        '(SELECT COALESCE(SUM(response_time), 0) FROM requests '
+        'WHERE requests.domain_name = domains.name AND requests.status_code < 400) '
+        'FROM domains'
+    )
+
+
+def downgrade():
+    op.drop_constraint('fk_domain_stats_domain', 'domain_stats', type_='foreignkey')
+    op.drop_table('domain_stats')
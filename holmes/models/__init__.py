@@ -1,13 +1,12 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from gzip import GzipFile
-from cStringIO import StringIO
-
 import sqlalchemy.types as types
 from sqlalchemy.ext.declarative import declarative_base
 from ujson import dumps, loads
 
+from holmes.models.codec import ColumnCodec
+
 Base = declarative_base()
 
 
@@ -39,19 +38,10 @@ class JsonTypeGzipped(types.TypeDecorator):
     impl = types.BLOB
 
     def process_bind_param(self, value, dialect):
-        value = dumps(value)
-        out = StringIO()
-        with GzipFile(fileobj=out, mode="w", mtime=0) as f:
-            f.write(value)
-        return out.getvalue()
+        return ColumnCodec.encode(value)
 
     def process_result_value(self, value, dialect):
-        if value:
-            gzipped = GzipFile(mode='r', fileobj=StringIO(value))
-            out = loads(gzipped.read())
-        else:
-            out = ''
-        return out
+        return ColumnCodec.decode(value)
 
 from holmes.models.domain import Domain  # NOQA
 from holmes.models.page import Page  # NOQA
@@ -65,3 +55,5 @@ from holmes.models.user import User  # NOQA
 from holmes.models.limiter import Limiter # NOQA
 from holmes.models.domains_violations_prefs import DomainsViolationsPrefs # NOQA
 from holmes.models.users_violations_prefs import UsersViolationsPrefs # NOQA
+from holmes.models.domain_stats import DomainStats  # NOQA
+from holmes.models.violation_count import ViolationCount  # NOQA
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import zlib
+from gzip import GzipFile
+from cStringIO import StringIO
+
+import msgpack
+from ujson import dumps, loads
+
+
+GZIP_MAGIC = '\x1f\x8b'
+
+# one byte header in front of every encoded value; none of them can be
+# mistaken for the gzip magic number of values written before the header
+JSON = 'j'
+JSON_ZLIB = 'J'
+MSGPACK = 'm'
+MSGPACK_ZLIB = 'M'
+
+SERIALIZERS = {
+    'json': (JSON, JSON_ZLIB),
+    'msgpack': (MSGPACK, MSGPACK_ZLIB),
+}
+
+
+def to_msgpack(value):
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+
+    # anything else is stored the way json would store it
+    return loads(dumps(value))
+
+
+def pack(value):
+    return msgpack.packb(value, default=to_msgpack)
+
+
+def unpack(value):
+    return msgpack.unpackb(value, encoding='utf-8')
+
+
+class ColumnCodec(object):
+    '''Encodes the values of JsonTypeGzipped columns.
+
+    Values are serialized with json or msgpack and only compressed with zlib
+    when they are larger than compression_threshold bytes. The header byte
+    tells how each value was written, so changing the settings never breaks
+    reading older values.
+    '''
+
+    serializer = 'json'
+    compression_threshold = 512
+
+    @classmethod
+    def configure(cls, config):
+        serializer = config.get('COLUMN_CODEC_SERIALIZER', cls.serializer)
+
+        if serializer not in SERIALIZERS:
+            raise ValueError('Unknown column codec serializer: %s' % serializer)
+
+        cls.serializer = serializer
+        cls.compression_threshold = config.get('COLUMN_CODEC_COMPRESSION_THRESHOLD', cls.compression_threshold)
+
+    @classmethod
+    def encode(cls, value, serializer=None, compression_threshold=None):
+        serializer = serializer or cls.serializer
+        if compression_threshold is None:
+            compression_threshold = cls.compression_threshold
+
+        plain, compressed = SERIALIZERS[serializer]
+
+        if serializer == 'msgpack':
+            data = pack(value)
+        else:
+            data = dumps(value)
+
+        if len(data) > compression_threshold:
+            return compressed + zlib.compress(data)
+
+        return plain + data
+
+    @classmethod
+    def decode(cls, data):
+        if not data:
+            return ''
+
+        if data.startswith(GZIP_MAGIC):
+            return loads(GzipFile(mode='r', fileobj=StringIO(data)).read())
+
+        header, data = data[0], data[1:]
+
+        if header == JSON:
+            return loads(data)
+
+        if header == JSON_ZLIB:
+            return loads(zlib.decompress(data))
+
+        if header == MSGPACK:
+            return unpack(data)
+
+        if header == MSGPACK_ZLIB:
+            return unpack(zlib.decompress(data))
+
+        raise ValueError('Unknown column codec header: %r' % header)
+
+    @classmethod
+    def is_legacy(cls, data):
+        return bool(data) and data.startswith(GZIP_MAGIC)
@@ -108,15 +108,17 @@ class Domain(Base):
 
         return result
 
-    def get_active_reviews(self, db, page_filter=None, current_page=1, page_size=10):
-        from holmes.models import Page  # Prevent circular dependency
+    def get_active_reviews(self, db, page_filter=None, current_page=1, page_size=10, cursor=None):
+        '''Reviewed pages of the domain, most violated first. When cursor
+        (the [violations_count, page_id] of the last item of the previous
+        page) is given, the page after it is returned instead of
+        current_page.'''
 
-        lower_bound = (current_page - 1) * page_size
-        upper_bound = lower_bound + page_size
+        from holmes.models import Page  # Prevent circular dependency
 
         items_query = db \
             .query(
-                Page.url, Page.uuid, Page.last_review_date,
+                Page.id, Page.url, Page.uuid, Page.last_review_date,
                 Page.last_review_uuid, Page.violations_count
             ) \
             .filter(Page.last_review_date != None) \
@@ -125,9 +127,21 @@ class Domain(Base):
         if page_filter:
             items_query = items_query.filter(Page.url.like('%s/%s%%' % (self.url, page_filter)))
 
-        items = items_query.order_by('violations_count desc')[lower_bound:upper_bound]
+        items_query = items_query.order_by(Page.violations_count.desc(), Page.id.desc())
+
+        if cursor is not None:
+            violations_count, page_id = cursor
+            items_query = items_query.filter(sa.or_(
+                Page.violations_count < violations_count,
+                sa.and_(Page.violations_count == violations_count, Page.id < page_id)
+            ))
+
+            return items_query[:page_size]
+
+        lower_bound = (current_page - 1) * page_size
+        upper_bound = lower_bound + page_size
 
-        return items
+        return items_query[lower_bound:upper_bound]
 
     @classmethod
     def get_domain_by_name(self, domain_name, db):
@@ -211,20 +225,25 @@ class Domain(Base):
 
     @classmethod
     def get_domains_details(cls, db):
-        domains = db.query(Domain).order_by(Domain.name.asc()).all()
+        from holmes.models import DomainStats  # Prevent circular dependency
 
-        if not domains:
-            return []
+        domains = db \
+            .query(
+                Domain.id, Domain.url, Domain.name, Domain.is_active,
+                DomainStats.page_count, DomainStats.review_count, DomainStats.violation_count,
+                DomainStats.good_request_count, DomainStats.bad_request_count, DomainStats.response_time_sum
+            ) \
+            .outerjoin(DomainStats, DomainStats.domain_id == Domain.id) \
+            .order_by(Domain.name.asc()) \
+            .all()
 
         result = []
 
         for domain in domains:
-            page_count = domain.get_page_count(db)
-            review_count = domain.get_active_review_count(db)
-            violation_count = domain.get_violation_data(db)
-            good_request_count = domain.get_good_request_count(db)
-            bad_request_count = domain.get_bad_request_count(db)
-            response_time_avg = domain.get_response_time_avg(db)
+            page_count = domain.page_count or 0
+            review_count = domain.review_count or 0
+            good_request_count = domain.good_request_count or 0
+            bad_request_count = domain.bad_request_count or 0
 
             if page_count > 0:
                 review_percentage = round(float(review_count) / page_count * 100, 2)
@@ -237,11 +256,16 @@ class Domain(Base):
             else:
                 error_percentage = 0
 
+            if good_request_count > 0:
+                response_time_avg = round(domain.response_time_sum / good_request_count, 3)
+            else:
+                response_time_avg = 0
+
             result.append({
                 "id": domain.id,
                 "url": domain.url,
                 "name": domain.name,
-                "violationCount": violation_count,
+                "violationCount": domain.violation_count or 0,
                 "pageCount": page_count,
                 "reviewCount": review_count,
                 "reviewPercentage": review_percentage,
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sqlalchemy as sa
+from sqlalchemy import func
+
+from holmes.models import Base
+
+
+class DomainStats(Base):
+    '''Per domain rollup of the numbers shown in the domains details.
+
+    Counters are bumped as pages, reviews and requests are saved and are
+    periodically reconciled against the source tables to correct drift.
+    '''
+
+    __tablename__ = "domain_stats"
+
+    COUNTERS = (
+        'page_count', 'review_count', 'violation_count',
+        'good_request_count', 'bad_request_count', 'response_time_sum'
+    )
+
+    # the query each counter is recomputed from
+    SOURCES = {
+        'page_count': 'SELECT COUNT(id) FROM pages WHERE domain_id = :domain_id',
+        'review_count': (
+            'SELECT COUNT(DISTINCT page_id) FROM reviews WHERE domain_id = :domain_id AND is_active = 1'
+        ),
+        'violation_count': (
+            'SELECT COUNT(id) FROM violations WHERE domain_id = :domain_id AND review_is_active = 1'
+        ),
+        'good_request_count': (
+            'SELECT COUNT(id) FROM requests WHERE domain_name = :domain_name AND status_code < 400'
+        ),
+        'bad_request_count': (
+            'SELECT COUNT(id) FROM requests WHERE domain_name = :domain_name AND status_code >= 400'
+        ),
+        'response_time_sum': (
+            'SELECT COALESCE(SUM(response_time), 0) FROM requests '
+            'WHERE domain_name = :domain_name AND status_code < 400'
+        ),
+    }
+
+    domain_id = sa.Column(
+        'domain_id', sa.Integer, sa.ForeignKey('domains.id', ondelete='CASCADE'), primary_key=True
+    )
+    page_count = sa.Column('page_count', sa.Integer, server_default='0', nullable=False)
+    review_count = sa.Column('review_count', sa.Integer, server_default='0', nullable=False)
+    violation_count = sa.Column('violation_count', sa.Integer, server_default='0', nullable=False)
+    good_request_count = sa.Column('good_request_count', sa.Integer, server_default='0', nullable=False)
+    bad_request_count = sa.Column('bad_request_count', sa.Integer, server_default='0', nullable=False)
+    response_time_sum = sa.Column('response_time_sum', sa.Float, server_default='0', nullable=False)
+
+    def to_dict(self):
+        return dict((name, getattr(self, name)) for name in ('domain_id',) + self.COUNTERS)
+
+    def __str__(self):
+        return str(self.domain_id)
+
+    def __repr__(self):
+        return str(self)
+
+    @classmethod
+    def _upsert(cls, db, domain_id, values, increment):
+        unknown = set(values) - set(cls.COUNTERS)
+        if unknown:
+            raise ValueError('Unknown domain stats counters: %s' % ', '.join(sorted(unknown)))
+
+        columns = sorted(values)
+
+        if increment:
+            updates = ['%s = %s + VALUES(%s)' % (column, column, column) for column in columns]
+        else:
+            updates = ['%s = VALUES(%s)' % (column, column) for column in columns]
+
+        params = dict(values)
+        params['domain_id'] = domain_id
+
+        db.execute(
+            'INSERT INTO domain_stats (domain_id, %s) VALUES (:domain_id, %s) '
+            'ON DUPLICATE KEY UPDATE %s' % (
+                ', '.join(columns),
+                ', '.join(':%s' % column for column in columns),
+                ', '.join(updates)
+            ),
+            params
+        )
+
+    @classmethod
+    def increment(cls, db, domain_id, **deltas):
+        deltas = dict((name, value) for name, value in deltas.items() if value)
+
+        if not deltas:
+            return
+
+        cls._upsert(db, domain_id, deltas, increment=True)
+
+    @classmethod
+    def get_request_stats(cls, db, request_filter=None):
+        '''Good and bad request counts and the response time sum of good
+        requests, grouped by domain name.'''
+
+        from holmes.models import Request  # to avoid circular dependency
+
+        is_good = Request.status_code < 400
+
+        query = db \
+            .query(
+                Request.domain_name,
+                func.sum(sa.case([(is_good, 1)], else_=0)).label('good_request_count'),
+                func.sum(sa.case([(is_good, 0)], else_=1)).label('bad_request_count'),
+                func.sum(sa.case([(is_good, Request.response_time)], else_=0)).label('response_time_sum')
+            )
+
+        if request_filter is not None:
+            query = query.filter(request_filter)
+
+        return query.group_by(Request.domain_name).all()
+
+    @classmethod
+    def decrement_requests(cls, db, request_ids):
+        '''Takes requests about to be deleted out of the stats.'''
+
+        from holmes.models import Domain, Request  # to avoid circular dependency
+
+        if not request_ids:
+            return
+
+        stats = cls.get_request_stats(db, Request.id.in_(request_ids))
+
+        names = [item.domain_name for item in stats]
+        domain_ids = dict(db.query(Domain.name, Domain.id).filter(Domain.name.in_(names)).all())
+
+        for item in stats:
+            if item.domain_name not in domain_ids:
+                continue
+
+            cls.increment(
+                db, domain_ids[item.domain_name],
+                good_request_count=-int(item.good_request_count or 0),
+                bad_request_count=-int(item.bad_request_count or 0),
+                response_time_sum=-float(item.response_time_sum or 0)
+            )
+
+    @classmethod
+    def reconcile_domain(cls, db, domain_id, domain_name):
+        '''Recomputes the stats of a domain from the source tables in a
+        single UPDATE, so increments made meanwhile wait for its lock on the
+        row and are applied on top of it instead of being overwritten.'''
+
+        params = {'domain_id': domain_id, 'domain_name': domain_name}
+
+        db.execute(
+            'INSERT INTO domain_stats (domain_id) VALUES (:domain_id) '
+            'ON DUPLICATE KEY UPDATE domain_id = domain_id',
+            params
+        )
+
+        db.execute(
+            'UPDATE domain_stats SET %s WHERE domain_id = :domain_id' % ', '.join(
+                '%s = (%s)' % (column, cls.SOURCES[column]) for column in cls.COUNTERS
+            ),
+            params
+        )
+
+    @classmethod
+    def reconcile(cls, db, commit=None):
+        '''Reconciles the stats domain by domain. commit, when given, is
+        called after each domain to keep the locks on the stats short.
+        Returns the number of domains reconciled.'''
+
+        from holmes.models import Domain  # to avoid circular dependency
+
+        domains = db.query(Domain.id, Domain.name).order_by(Domain.id).all()
+
+        for domain_id, domain_name in domains:
+            cls.reconcile_domain(db, domain_id, domain_name)
+
+            if commit is not None:
+                commit()
+
+        return len(domains)
@@ -37,6 +37,18 @@ class Key(Base):
             'category': self.category.name
         }
 
+    @classmethod
+    def get_id(cls, key):
+        # keys are long lived and expire on every commit; their identity
+        # still has the id without another round trip to the database
+        identity = sa.inspect(key, raiseerr=False)
+        identity = identity and identity.identity
+
+        if identity:
+            return identity[0]
+
+        return key.id
+
     @classmethod
     def get_by_name(cls, db, key_name):
         try:
@@ -199,28 +199,38 @@ class Page(Base):
             cache.increment_page_score(page.url)
             return page.uuid
 
-        try:
-            page_uuid = uuid4()
-            query_params = {
-                'url': url,
-                'url_hash': url_hash,
-                'uuid': page_uuid,
-                'domain_id': domain.id,
-                'created_date': datetime.utcnow(),
-                'score': score
-            }
+        page_uuid = uuid4()
+        query_params = {
+            'url': url,
+            'url_hash': url_hash,
+            'uuid': page_uuid,
+            'domain_id': domain.id,
+            'created_date': datetime.utcnow(),
+            'score': score
+        }
 
+        try:
+            # a plain insert, as the affected rows of an upsert can't tell
+            # an insert from an update leaving the score as it was (mysqldb
+            # sets CLIENT.FOUND_ROWS)
             db.execute(
                 'INSERT INTO pages (url, url_hash, uuid, domain_id, created_date, score) '
-                'VALUES (:url, :url_hash, :uuid, :domain_id, :created_date, :score) ON DUPLICATE KEY '
-                'UPDATE score = :score',
+                'VALUES (:url, :url_hash, :uuid, :domain_id, :created_date, :score)',
                 query_params
             )
 
+            from holmes.models import DomainStats
+            DomainStats.increment(db, domain.id, page_count=1)
+
         except Exception:
             err = sys.exc_info()[1]
             if 'Duplicate entry' in str(err):
+                # another worker got past the check above and added it
                 logging.debug('Duplicate entry! (Details: %s)' % str(err))
+                db.execute('UPDATE pages SET score = :score WHERE url_hash = :url_hash', query_params)
+                page_uuid = db.execute(
+                    'SELECT uuid FROM pages WHERE url_hash = :url_hash', query_params
+                ).scalar()
             else:
                 raise
 
@@ -143,6 +143,9 @@ class Request(Base):
         if not older_requests_ids:
             return None
 
+        from holmes.models.domain_stats import DomainStats
+        DomainStats.decrement_requests(db, older_requests_ids)
+
         return db \
             .query(Request) \
             .filter(Request.id.in_(older_requests_ids)) \
@@ -190,6 +193,15 @@ class Request(Base):
 
         db.execute(Request.__table__.insert(), data)
 
+        from holmes.models.domain_stats import DomainStats
+        good_requests = [item for item in data if item['status_code'] < 400]
+        DomainStats.increment(
+            db, page.domain_id,
+            good_request_count=len(good_requests),
+            bad_request_count=len(data) - len(good_requests),
+            response_time_sum=sum(item['response_time'] for item in good_requests)
+        )
+
         url = url.encode('utf-8')
 
         publish(dumps({
@@ -7,6 +7,7 @@ from datetime import datetime
 from ujson import dumps
 import sqlalchemy as sa
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
 
 from holmes.models import Base
 
@@ -167,15 +168,19 @@ class Review(Base):
         return query.scalar()
 
     @classmethod
-    def get_by_violation_key_name(cls, db, key_id, current_page=1, page_size=10, domain_filter=None, page_filter=None):
+    def get_by_violation_key_name(cls, db, key_id, current_page=1, page_size=10, domain_filter=None, page_filter=None,
+                                  cursor=None):
+        '''Pages whose last review has a violation of key_id, latest first.
+        When cursor (the [completed_date, page_id] of the last item of the
+        previous page) is given, the page after it is returned instead of
+        current_page.'''
+
         from holmes.models.page import Page  # to avoid circular dependency
         from holmes.models.domain import Domain  # to avoid circular dependency
 
-        lower_bound = (current_page - 1) * page_size
-        upper_bound = lower_bound + page_size
-
         query = db \
             .query(
+                Page.id.label('page_id'),
                 Page.last_review_uuid.label('review_uuid'),
                 Page.url,
                 Page.uuid.label('page_uuid'),
@@ -186,14 +191,26 @@ class Review(Base):
                 Domain.id == Page.domain_id
             )
 
-
         query = cls._filter_by_violation_key_name(db, query, key_id, domain_filter, page_filter)
+        query = query.order_by(Page.last_review_date.desc(), Page.id.desc())
+
+        if cursor is not None:
+            completed_date, page_id = cursor
+            query = query.filter(sa.or_(
+                Page.last_review_date < completed_date,
+                sa.and_(Page.last_review_date == completed_date, Page.id < page_id)
+            ))
+
+            return query[:page_size]
+
+        lower_bound = (current_page - 1) * page_size
+        upper_bound = lower_bound + page_size
 
-        return query.order_by(Page.last_review_date.desc())[lower_bound:upper_bound]
+        return query[lower_bound:upper_bound]
 
     @classmethod
     def save_review(cls, page_uuid, review_data, db, search_provider, fact_definitions, violation_definitions, cache, publish, config):
-        from holmes.models import Page, Request
+        from holmes.models import Page, Request, Fact, Violation, Key, DomainStats, ViolationCount
 
         page = Page.by_uuid(page_uuid, db)
 
@@ -203,54 +220,95 @@ class Review(Base):
         if review_data['requests']:
             Request.save_requests(db, publish, page, review_data['requests'])
 
-        last_review = page.last_review
+        last_review_id = page.last_review_id
+        last_violations_count = page.violations_count if last_review_id else 0
 
         review = Review(
-            domain_id=page.domain.id,
+            domain_id=page.domain_id,
             page_id=page.id,
             is_active=True,
-            is_complete=False,
+            is_complete=True,
             completed_date=datetime.utcnow(),
             uuid=uuid4(),
         )
 
         db.add(review)
+        db.flush()
+
+        facts = [
+            {
+                'review_id': review.id,
+                'key_id': Key.get_id(fact_definitions[fact['key']]['key']),
+                'value': fact['value']
+            }
+            for fact in review_data['facts']
+        ]
+
+        if facts:
+            db.execute(Fact.__table__.insert(), facts)
+
+        violations = [
+            {
+                'review_id': review.id,
+                'key_id': Key.get_id(violation_definitions[violation['key']]['key']),
+                'value': violation['value'],
+                'points': int(float(violation['points'])),
+                'domain_id': page.domain_id,
+                'review_is_active': True
+            }
+            for violation in review_data['violations']
+        ]
+
+        if violations:
+            db.execute(Violation.__table__.insert(), violations)
+
+        # before the previous review's violations are deactivated below
+        ViolationCount.apply_review(
+            db, page.domain_id, [violation['key_id'] for violation in violations], last_review_id
+        )
 
-        for fact in review_data['facts']:
-            name = fact['key']
-            key = fact_definitions[name]['key']
-            review.add_fact(key, fact['value'])
-
-        for violation in review_data['violations']:
-            name = violation['key']
-            key = violation_definitions[name]['key']
-            review.add_violation(
-                key,
-                violation['value'],
-                violation['points'],
-                page.domain
-            )
+        page_values = {
+            'expires': review_data['expires'],
+            'last_modified': review_data['lastModified'],
+            'last_review_uuid': review.uuid,
+            'last_review_id': review.id,
+            'last_review_date': review.completed_date,
+            'violations_count': len(review_data['violations']),
+        }
+
+        db.execute(Page.__table__.update().where(Page.id == page.id).values(**page_values))
 
-        page.expires = review_data['expires']
-        page.last_modified = review_data['lastModified']
-        page.last_review_uuid = review.uuid
-        page.last_review = review
-        page.last_review_date = review.completed_date
-        page.violations_count = len(review_data['violations'])
+        # keeps the loaded page in sync without flushing it again
+        for name, value in page_values.items():
+            set_committed_value(page, name, value)
+        set_committed_value(page, 'last_review', review)
 
-        review.is_complete = True
+        db.expire(review, ['facts', 'violations'])
 
-        if not last_review:
+        DomainStats.increment(
+            db, page.domain_id,
+            review_count=0 if last_review_id else 1,
+            violation_count=len(violations) - (last_violations_count or 0)
+        )
+
+        if not last_review_id:
             cache.increment_active_review_count(page.domain)
         else:
-            for violation in last_review.violations:
-                violation.review_is_active = False
+            db.execute(
+                Violation.__table__.update()
+                .where(Violation.review_id == last_review_id)
+                .values(review_is_active=False)
+            )
 
-            last_review.is_active = False
+            db.execute(
+                Review.__table__.update()
+                .where(Review.id == last_review_id)
+                .values(is_active=False)
+            )
 
         Review.delete_old_reviews(db, config, page)
 
-        search_provider.index_review(review)
+        search_provider.index_review(review, cache)
 
         publish(dumps({
             'type': 'new-review',
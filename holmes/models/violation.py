@@ -50,68 +50,52 @@ class Violation(Base):
         }
 
     @classmethod
-    def get_most_common_violations_names(cls, db, sample_limit=50000):
-        sample = db \
-            .query(
-                Violation.id,
-                Violation.key_id,
-                Key.name.label('key_name')
-            ) \
-            .filter(Violation.key_id == Key.id) \
-            .filter(Violation.review_is_active == True) \
-            .order_by(Violation.id.desc()) \
-            .limit(sample_limit) \
-            .subquery()
+    def get_most_common_violations_names(cls, db):
+        from holmes.models.violation_count import ViolationCount  # to avoid circular dependency
 
-        return db \
+        violations = db \
             .query(
-                sample.columns.key_name,
-                sa.func.count(sample.columns.key_id).label('count')
+                Key.name.label('key_name'),
+                sa.func.sum(ViolationCount.count).label('count')
             ) \
-            .group_by(sample.columns.key_id) \
+            .filter(ViolationCount.key_id == Key.id) \
+            .filter(ViolationCount.count > 0) \
+            .group_by(ViolationCount.key_id) \
             .order_by('count desc').all()
 
+        return [(item.key_name, int(item.count)) for item in violations]
+
     @classmethod
     def get_group_by_key_id_for_all_domains(cls, db):
-
-        from holmes.models.violation import Violation  # to avoid circular dependency
         from holmes.models.domain import Domain  # to avoid circular dependency
-
-        sample = db \
-            .query(
-                Violation.key_id.label('violations_key_id'),
-                Violation.domain_id,
-                sa.func.count(Violation.id).label('violation_count')
-            ) \
-            .filter(Violation.review_is_active == True) \
-            .group_by(Violation.domain_id, Violation.key_id) \
-            .subquery()
+        from holmes.models.violation_count import ViolationCount  # to avoid circular dependency
 
         return db \
             .query(
-                sample.columns.violations_key_id,
+                ViolationCount.key_id.label('violations_key_id'),
                 Domain.name.label('domain_name'),
-                sample.columns.violation_count
+                ViolationCount.count.label('violation_count')
             ) \
-            .filter(Domain.id == sample.columns.domain_id) \
+            .filter(Domain.id == ViolationCount.domain_id) \
+            .filter(ViolationCount.count > 0) \
             .order_by('violation_count DESC') \
             .all()
 
     @classmethod
     def get_group_by_category_id_for_all_domains(cls, db):
         from holmes.models.keys import Key  # to avoid circular dependency
-        from holmes.models.violation import Violation  # to avoid circular dependency
+        from holmes.models.violation_count import ViolationCount  # to avoid circular dependency
 
         data = db \
             .query(
-                Violation.domain_id,
+                ViolationCount.domain_id,
                 Key.name,
                 Key.category_id,
-                sa.func.count(Key.category_id).label('violation_count')
+                sa.func.sum(ViolationCount.count).label('violation_count')
             ) \
-            .filter(Key.id == Violation.key_id) \
-            .filter(Violation.review_is_active == True) \
-            .group_by(Violation.domain_id) \
+            .filter(Key.id == ViolationCount.key_id) \
+            .filter(ViolationCount.count > 0) \
+            .group_by(ViolationCount.domain_id) \
             .group_by(Key.category_id) \
             .order_by('violation_count DESC') \
             .all()
@@ -122,7 +106,7 @@ class Violation(Base):
             result[item.domain_id].append({
                 'key_name': item.name,
                 'category_id': item.category_id,
-                'violation_count': item.violation_count
+                'violation_count': int(item.violation_count)
             })
 
         return result
@@ -148,32 +132,18 @@ class Violation(Base):
     def get_top_in_category_for_all_domains(cls, db, limit=1000):
         from holmes.models.keys import Key  # to avoid circular dependency
         from holmes.models.domain import Domain  # to avoid circular dependency
-        from holmes.models.violation import Violation  # to avoid circular dependency
-
-        sample = db \
-            .query(
-                Violation.key_id.label('violations_key_id'),
-                Violation.domain_id,
-                sa.func.count(Violation.id).label('violation_count')
-            ) \
-            .filter(Violation.review_is_active == True) \
-            .group_by(Violation.domain_id, Violation.key_id) \
-            .subquery()
+        from holmes.models.violation_count import ViolationCount  # to avoid circular dependency
 
         return db \
             .query(
                 Domain.name,
                 Key.category_id,
                 Key.name,
-                sample.columns.violation_count
-            ) \
-            .filter(sample.columns.domain_id == Domain.id) \
-            .filter(sample.columns.violations_key_id == Key.id) \
-            .group_by(
-                sample.columns.domain_id,
-                sample.columns.violations_key_id,
-                Key.category_id
+                ViolationCount.count.label('violation_count')
             ) \
+            .filter(ViolationCount.domain_id == Domain.id) \
+            .filter(ViolationCount.key_id == Key.id) \
+            .filter(ViolationCount.count > 0) \
             .order_by('violation_count DESC') \
             .limit(limit) \
             .all()
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+from holmes.models import Base
+
+
+class ViolationCount(Base):
+    '''Number of violations of each key in the active reviews of each
+    domain, kept in the same transaction that saves the reviews.'''
+
+    __tablename__ = "violation_counts"
+
+    domain_id = sa.Column(
+        'domain_id', sa.Integer, sa.ForeignKey('domains.id', ondelete='CASCADE'), primary_key=True
+    )
+    key_id = sa.Column('key_id', sa.Integer, sa.ForeignKey('keys.id'), primary_key=True)
+    count = sa.Column('count', sa.Integer, server_default='0', nullable=False)
+
+    def to_dict(self):
+        return {
+            'domain_id': self.domain_id,
+            'key_id': self.key_id,
+            'count': self.count
+        }
+
+    def __str__(self):
+        return '%s:%s (%s)' % (self.domain_id, self.key_id, self.count)
+
+    def __repr__(self):
+        return str(self)
+
+    @classmethod
+    def get_active_counts_for_review(cls, db, review_id):
+        from holmes.models.violation import Violation  # to avoid circular dependency
+
+        return dict(
+            db.query(Violation.key_id, sa.func.count(Violation.id))
+            .filter(Violation.review_id == review_id)
+            .filter(Violation.review_is_active == True)
+            .group_by(Violation.key_id)
+            .all()
+        )
+
+    @classmethod
+    def apply_review(cls, db, domain_id, key_ids, last_review_id=None):
+        '''Adds the violations (key_ids) of a new review of a page and
+        subtracts the ones of its previous review, which must still be
+        active.'''
+
+        deltas = defaultdict(int)
+
+        for key_id in key_ids:
+            deltas[key_id] += 1
+
+        if last_review_id:
+            for key_id, count in cls.get_active_counts_for_review(db, last_review_id).items():
+                deltas[key_id] -= count
+
+        # sorted so concurrent reviews lock the rows in the same order
+        values = [
+            {'domain_id': domain_id, 'key_id': key_id, 'count': delta}
+            for key_id, delta in sorted(deltas.items())
+            if delta
+        ]
+
+        if not values:
+            return
+
+        db.execute(
+            'INSERT INTO violation_counts (domain_id, key_id, count) '
+            'VALUES (:domain_id, :key_id, :count) '
+            'ON DUPLICATE KEY UPDATE count = count + VALUES(count)',
+            values
+        )
+
+    @classmethod
+    def reconcile_domain(cls, db, domain_id, key_ids):
+        '''Corrects the counts of a domain to the violations of its active
+        reviews, writing only the ones that differ. Returns how many did.
+
+        The counts of the domain are locked before its violations are
+        counted, so reviews saved meanwhile apply their deltas on top of the
+        corrected counts instead of being overwritten by them.'''
+
+        from holmes.models.violation import Violation  # to avoid circular dependency
+
+        if not key_ids:
+            return 0
+
+        stored = dict(
+            db.query(cls.key_id, cls.count)
+            .filter(cls.domain_id == domain_id)
+            .with_for_update()
+            .all()
+        )
+
+        # key, domain and review_is_active are the idx_key_domain_review_active
+        # ranges, so only the violations of this domain are read
+        counted = dict(
+            db.query(Violation.key_id, sa.func.count(Violation.id))
+            .filter(Violation.key_id.in_(key_ids))
+            .filter(Violation.domain_id == domain_id)
+            .filter(Violation.review_is_active == True)
+            .group_by(Violation.key_id)
+            .all()
+        )
+
+        changed = [
+            {'domain_id': domain_id, 'key_id': key_id, 'count': count}
+            for key_id, count in sorted(counted.items())
+            if stored.get(key_id) != count
+        ]
+
+        # keys created after key_ids was read are left alone
+        missing = sorted(set(stored) & set(key_ids) - set(counted))
+
+        if changed:
+            db.execute(
+                'INSERT INTO violation_counts (domain_id, key_id, count) '
+                'VALUES (:domain_id, :key_id, :count) '
+                'ON DUPLICATE KEY UPDATE count = VALUES(count)',
+                changed
+            )
+
+        if missing:
+            db.execute(
+                cls.__table__.delete()
+                .where(cls.domain_id == domain_id)
+                .where(cls.key_id.in_(missing))
+            )
+
+        return len(changed) + len(missing)
+
+    @classmethod
+    def reconcile(cls, db, commit=None):
+        '''Reconciles the counts domain by domain. commit, when given, is
+        called after each domain to keep the transactions (and the locks on
+        the counts) short. Returns how many counts were corrected.'''
+
+        from holmes.models import Domain, Key  # to avoid circular dependency
+
+        domain_ids = [domain_id for (domain_id,) in db.query(Domain.id).order_by(Domain.id)]
+        key_ids = [key_id for (key_id,) in db.query(Key.id)]
+
+        if commit is not None:
+            # the counts of each domain are read in a transaction of its own
+            commit()
+
+        corrected = 0
+        for domain_id in domain_ids:
+            corrected += cls.reconcile_domain(db, domain_id, key_ids)
+
+            if commit is not None:
+                commit()
+
+        return corrected
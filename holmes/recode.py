@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import logging
+import argparse
+
+import sqlalchemy as sa
+from derpconf.config import ConfigurationError
+
+from holmes.config import Config
+from holmes.models import Fact, Violation
+from holmes.models.codec import ColumnCodec
+
+
+TABLES = {
+    'facts': Fact.__table__,
+    'violations': Violation.__table__,
+}
+
+
+def recode_table(connection, table, batch_size=1000, sleep=0):
+    '''Rewrites the gzipped values of a table with the configured column
+    codec, batch_size rows at a time. Returns the number of rows rewritten.'''
+
+    raw_value = sa.type_coerce(table.c.value, sa.LargeBinary)
+
+    update = table.update() \
+        .where(table.c.id == sa.bindparam('row_id')) \
+        .values(value=sa.bindparam('new_value', type_=sa.LargeBinary))
+
+    last_id = 0
+    recoded = 0
+
+    while True:
+        rows = connection.execute(
+            sa.select([table.c.id, raw_value])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).fetchall()
+
+        if not rows:
+            break
+
+        last_id = rows[-1][0]
+
+        values = [
+            {'row_id': row_id, 'new_value': ColumnCodec.encode(ColumnCodec.decode(value))}
+            for row_id, value in rows
+            if ColumnCodec.is_legacy(value)
+        ]
+
+        if values:
+            with connection.begin():
+                connection.execute(update, values)
+
+            recoded += len(values)
+
+        logging.info('Recoded %d %s so far (last id %d).' % (recoded, table.name, last_id))
+
+        if sleep:
+            time.sleep(sleep)
+
+    return recoded
+
+
+def argparser():
+    parser = argparse.ArgumentParser(description='Rewrite gzipped fact and violation values with the configured column codec')
+    parser.add_argument(
+        '-c', '--conf',
+        nargs=1,
+        metavar='conf_file',
+        help='path to configuration file'
+    )
+    parser.add_argument(
+        '-t', '--tables',
+        nargs='+',
+        choices=sorted(TABLES),
+        default=sorted(TABLES),
+        help='tables to recode (default is all of them)'
+    )
+    parser.add_argument(
+        '-b', '--batch-size',
+        type=int,
+        default=1000,
+        metavar='N',
+        help='rows read and rewritten per batch (default is 1000)'
+    )
+    parser.add_argument(
+        '-s', '--sleep',
+        type=float,
+        default=0,
+        metavar='seconds',
+        help='pause between batches to spare the database (default is 0)'
+    )
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        config = Config()
+        if args.conf:
+            config = config.load(args.conf[0])
+    except ConfigurationError:
+        logging.error('Could not load config! Use --conf conf_file')
+        sys.exit(1)
+
+    ColumnCodec.configure(config)
+
+    engine = sa.create_engine(
+        config.get('SQLALCHEMY_CONNECTION_STRING'),
+        convert_unicode=True,
+        pool_size=1,
+        max_overflow=0
+    )
+
+    connection = engine.connect()
+
+    try:
+        for name in args.tables:
+            recoded = recode_table(connection, TABLES[name], args.batch_size, args.sleep)
+            logging.info('Done recoding %s: %d rows rewritten.' % (name, recoded))
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
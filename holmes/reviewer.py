@@ -9,6 +9,7 @@ try:
 except ImportError:
     from urlparse import urlparse
 
+import time
 import inspect
 import email.utils as eut
 from datetime import datetime
@@ -24,6 +25,8 @@ from holmes.config import Config
 from holmes.facters import Facter
 from holmes.validators.base import Validator
 from holmes.models import Page
+from holmes.html_index import HtmlIndex
+from holmes.url_table import UrlTable
 from holmes.utils import get_domain_from_url
 
 
@@ -42,6 +45,7 @@ class ReviewDAO(object):
         self.data = {}
         self._current = None
         self.requests = []
+        self.urls = UrlTable()
 
     def add_fact(self, key, value):
         self.facts[key] = {
@@ -118,6 +122,15 @@ class Reviewer(object):
         self._wait_for_async_requests = wait
         self._wait_timeout = wait_timeout
 
+        self.is_async = False
+        self.pending_requests = 0
+        self._requests_done_callbacks = []
+        self._review_callback = None
+        self._review_started_at = None
+
+        self.facter_requests = {}
+        self._validators_to_run = None
+
         self.fact_definitions = fact_definitions
         self.violation_definitions = violation_definitions
 
@@ -147,24 +160,89 @@ class Reviewer(object):
         if self.ping_method is not None:
             self.ping_method()
 
-    def _async_get(self, url, handler, method='GET', **kw):
+    def _async_get(self, url, handler, method='GET', owner=None, **kw):
         if self.async_get_func:
-            self.async_get_func(url, self.handle_async_get(handler), method, **kw)
+            if not isinstance(owner, Facter):
+                owner = None
+
+            self.pending_requests += 1
+            if owner is not None:
+                self.facter_requests[owner] = self.facter_requests.get(owner, 0) + 1
 
-    def handle_async_get(self, handler):
+            self.async_get_func(url, self.handle_async_get(handler, owner), method, **kw)
+
+    def handle_async_get(self, handler, owner=None):
         def handle(url, response):
             if not hasattr(response, 'from_cache') or not response.from_cache:
                 response.from_cache = False
                 self.review_dao.requests.append((url, response))
 
-            handler(url, response)
+            try:
+                handler(url, response)
+            except Exception:
+                # the review must still complete, or its slot never frees up
+                logging.exception('Error handling the response of %s for %s.' % (url, self.page_url))
+
+            self.pending_requests -= 1
+            facter_done = owner is not None and self.complete_facter_request(owner)
+
+            if facter_done:
+                self.run_ready_validators()
+
+            self.run_requests_done_callbacks()
 
         return handle
 
+    def complete_facter_request(self, facter):
+        self.facter_requests[facter] -= 1
+
+        if self.facter_requests[facter] > 0:
+            return False
+
+        del self.facter_requests[facter]
+        logging.debug('---------- Facter %s has all of its data ---------' % facter.__class__.__name__)
+
+        return True
+
+    def run_requests_done_callbacks(self):
+        while self.pending_requests == 0 and self._requests_done_callbacks:
+            callback = self._requests_done_callbacks.pop(0)
+            callback()
+
     def review(self):
+        self._review_started_at = time.time()
         self.load_content(self.content_loaded)
         self.wait_for_async_requests()
 
+    def review_async(self, callback):
+        '''Reviews the page without blocking on the fetcher.
+
+        Each phase starts as soon as the requests of this review are done, so
+        many reviews can share the same fetcher. The callback is called once
+        the review is saved (or could not be done).
+        '''
+        self.is_async = True
+        self._review_callback = callback
+        self._review_started_at = time.time()
+        self.load_content(self.content_loaded)
+
+    def after_async_requests(self, callback):
+        if not self.is_async:
+            self.wait_for_async_requests()
+            callback()
+        elif self.pending_requests > 0:
+            self._requests_done_callbacks.append(callback)
+        else:
+            callback()
+
+    def finish_async_review(self):
+        if self._review_callback is None:
+            return
+
+        callback = self._review_callback
+        self._review_callback = None
+        callback()
+
     def load_content(self, callback):
         self._async_get(self.page_url, callback)
 
@@ -187,6 +265,7 @@ class Reviewer(object):
             if headers is not None:
                 logging.warning('Response is from cache: %s' % response.from_cache)
                 logging.warning('Headers for "%s": %s' % (url, headers))
+            self.finish_async_review()
             return
 
         logging.debug('Content for url %s loaded.' % url)
@@ -218,13 +297,26 @@ class Reviewer(object):
         except (lxml.etree.XMLSyntaxError, lxml.etree.ParserError):
             self._current.html = None
 
+        self._current.html_index = HtmlIndex(self._current.html)
+
         self.run_facters()
-        self.wait_for_async_requests()
+        self.start_validators()
+        self.after_async_requests(self.facts_loaded)
 
+    def facts_loaded(self):
         self.run_validators()
-        self.wait_for_async_requests()
+        self.after_async_requests(self.review_validated)
+
+    def review_validated(self):
+        if self.is_async:
+            self.save_review_in_savepoint()
+        else:
+            self.save_review()
+
+        if self._review_started_at is not None:
+            logging.info('Review for %s took %.3fs.' % (self.page_url, time.time() - self._review_started_at))
 
-        self.save_review()
+        self.finish_async_review()
 
     @property
     def current(self):
@@ -237,6 +329,13 @@ class Reviewer(object):
         else:
             return self.current.html
 
+    @property
+    def current_html_index(self):
+        if not hasattr(self.current, 'html_index') or self.current.html_index is None:
+            return HtmlIndex(self.current_html)
+        else:
+            return self.current.html_index
+
     def run_facters(self):
         for facter in self.facters:
             self.ping()
@@ -244,12 +343,45 @@ class Reviewer(object):
             facter_instance = facter(self)
             facter_instance.get_facts()
 
+    def start_validators(self):
+        self._validators_to_run = list(self.validators)
+        self.run_ready_validators()
+
+    def is_validator_ready(self, validator):
+        requires = validator.requires
+
+        for facter in self.facter_requests:
+            if requires is None or facter.provides is None:
+                return False
+
+            if set(requires) & set(facter.async_provides):
+                return False
+
+        return True
+
+    def run_ready_validators(self):
+        if self._validators_to_run is None:
+            return
+
+        for validator in list(self._validators_to_run):
+            if validator in self._validators_to_run and self.is_validator_ready(validator):
+                self.run_validator(validator)
+
     def run_validators(self):
-        for validator in self.validators:
-            self.ping()
-            logging.debug('---------- Started running validator %s ---------' % validator.__name__)
-            validator_instance = validator(self)
-            validator_instance.validate()
+        if self._validators_to_run is None:
+            self._validators_to_run = list(self.validators)
+
+        for validator in list(self._validators_to_run):
+            if validator in self._validators_to_run:
+                self.run_validator(validator)
+
+    def run_validator(self, validator):
+        self._validators_to_run.remove(validator)
+
+        self.ping()
+        logging.debug('---------- Started running validator %s ---------' % validator.__name__)
+        validator_instance = validator(self)
+        validator_instance.validate()
 
     def get_url(self, url):
         return join(self.api_url.rstrip('/'), url.lstrip('/'))
@@ -298,7 +430,24 @@ class Reviewer(object):
             self.cache, self.publish, self.config
         )
 
+    def save_review_in_savepoint(self):
+        '''Concurrent reviews share the session of the worker, so each one is
+        saved in a savepoint. A failed save rolls back only its own
+        savepoint, and the work of the other reviews stays in the session.'''
+
+        savepoint = self.db.begin_nested()
+
+        try:
+            self.save_review()
+            savepoint.commit()
+        except Exception:
+            logging.exception('Could not save the review of %s.' % self.page_url)
+            savepoint.rollback()
+
     def wait_for_async_requests(self):
+        if self.is_async:
+            return
+
         self._wait_for_async_requests(self._wait_timeout)
 
     def is_root(self):
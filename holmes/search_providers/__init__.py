@@ -8,15 +8,20 @@ class SearchProvider(object):
     def __init__(self, config, db, authnz_wrapper=None, io_loop=None):
         raise NotImplementedError()
 
-    def index_review(self, review):
+    def index_review(self, review, cache=None):
+        raise NotImplementedError()
+
+    def index_docs(self, docs):
         raise NotImplementedError()
 
     @return_future
-    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None, callback=None):
+    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None,
+                                  cursor=None, callback=None):
         raise NotImplementedError()
 
     @return_future
-    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, callback=None):
+    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, cursor=None,
+                                  callback=None):
         raise NotImplementedError()
 
     @classmethod
@@ -52,6 +57,11 @@ class SearchProvider(object):
             action='store_true',
             help='recreate the index (use with caution)'
         )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='rebuild the index with every review in a new index and swap it in without downtime (might take long)'
+        )
         parser.add_argument(
             '--delete',
             action='store_true',
@@ -75,6 +85,19 @@ class SearchProvider(object):
             metavar='N',
             help='batch size (default is 200)'
         )
+        parser.add_argument(
+            '-n', '--concurrency',
+            type=int,
+            nargs=1,
+            metavar='N',
+            help='number of bulk requests sent concurrently (default is 1)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            nargs=1,
+            metavar='checkpoint_file',
+            help='file keeping the last page indexed, to resume interrupted runs from'
+        )
         parser.add_argument(
             '-r', '--replace',
             action='store_true',
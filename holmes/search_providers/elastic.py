@@ -5,19 +5,26 @@ from holmes.search_providers import SearchProvider
 
 from holmes.models.keys import Key
 from holmes.models.page import Page
+from holmes.models.review import Review
+from holmes.models.domain import Domain
 from holmes.models.violation import Violation
+from holmes.utils import encode_cursor, decode_cursor, CURSOR_NUMBER
 
 from pyelasticsearch import ElasticSearch
 from pyelasticsearch.exceptions import (
-    Timeout, ConnectionError, ElasticHttpError, InvalidJsonResponseError
+    Timeout, ConnectionError, ElasticHttpError, ElasticHttpNotFoundError,
+    IndexAlreadyExistsError, InvalidJsonResponseError
 )
 from tornado.concurrent import return_future
 from tornadoes import ESConnection
 from ujson import loads, dumps
 from datetime import datetime
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
+from copy import deepcopy
+from collections import defaultdict, deque
+from multiprocessing.pool import ThreadPool
+from sqlalchemy import func, exists
 
+import os
 import logging
 import time
 
@@ -38,7 +45,10 @@ class ElasticSearchProvider(SearchProvider):
             protocol=config.get('ELASTIC_SEARCH_PROTOCOL'),
         )
         self.index = config.get('ELASTIC_SEARCH_INDEX')
+        self.rebuild_alias = '%s-rebuild' % self.index
         self.max_retries = config.get('ELASTIC_SEARCH_MAX_RETRIES')
+        self.write_indexes = None
+        self.write_indexes_expiration = 0
 
     def activate_debug(self):
         self.debug = True
@@ -74,18 +84,47 @@ class ElasticSearchProvider(SearchProvider):
                 'match_all': {}
             }
 
-    def _assemble_outer_query(self, inner_query, filter_terms):
+    def _assemble_outer_query(self, inner_query, filter_terms, cursor_filter=None):
+        filters = [{
+            'term': filter_term
+        } for filter_term in filter_terms]
+
+        if cursor_filter:
+            filters.append(cursor_filter)
+
         return {
             'filtered': {
                 'query': inner_query,
                 'filter': {
-                    'and': [{
-                        'term': filter_term
-                    } for filter_term in filter_terms]
+                    'and': filters
                 }
             }
         }
 
+    def _assemble_cursor_filter(self, sort_, values):
+        '''Matches the documents sorted after the one with the given sort
+        values, for sort fields in descending order (search_after is not
+        available in this version of elastic search).'''
+
+        fields = [item.keys()[0] for item in sort_]
+        clauses = []
+
+        for position, field in enumerate(fields):
+            clause = [{'term': {fields[index]: values[index]}} for index in range(position)]
+            clause.append({'range': {field: {'lt': values[position]}}})
+            clauses.append({'and': clause})
+
+        return {'or': clauses}
+
+    def _decode_sort_cursor(self, cursor, sort_):
+        return decode_cursor(cursor, types=[CURSOR_NUMBER] * len(sort_))
+
+    def _get_next_cursor(self, hits, page_size):
+        if len(hits) < page_size or not hits[-1].get('sort'):
+            return None
+
+        return encode_cursor(hits[-1]['sort'])
+
     def _assemble_filter_terms(self, key_id=None, domain=None):
         filter_terms = []
 
@@ -111,15 +150,20 @@ class ElasticSearchProvider(SearchProvider):
             'domain_name': review.domain.name,
         }
 
-    def index_review(self, review):
+    def index_review(self, review, cache=None):
+        if cache is not None and self.config.get('ELASTIC_SEARCH_USE_INDEXING_QUEUE'):
+            cache.push_review_to_index(review.page_id, self.gen_doc(review))
+            return
+
         for attempt in range(self.max_retries):
             try:
-                self.syncES.send_request(
-                    method='POST',
-                    path_components=[self.index, 'review', review.page_id],
-                    body=dumps(self.gen_doc(review)),
-                    encode_body=False
-                )
+                for index in self.get_write_indexes():
+                    self.syncES.send_request(
+                        method='POST',
+                        path_components=[index, 'review', review.page_id],
+                        body=dumps(self.gen_doc(review)),
+                        encode_body=False
+                    )
                 break
             except (Timeout, ConnectionError, ElasticHttpError, InvalidJsonResponseError) as e:
                 values = review.id, review.page_id, str(e)
@@ -130,34 +174,233 @@ class ElasticSearchProvider(SearchProvider):
             else:
                 raise
 
-    def index_reviews(self, reviewed_pages, reviews_count, batch_size):
-        action = {'index': {'_type': 'review'}}
+    def get_write_indexes(self):
+        '''Indexes live writes go to: the alias and, while a rebuild is
+        running, the index being rebuilt. Looked up again every
+        ELASTIC_SEARCH_WRITE_INDEXES_EXPIRATION_IN_SECONDS.'''
+
+        if self.write_indexes is not None and time.time() < self.write_indexes_expiration:
+            return self.write_indexes
 
-        for i in range(0, reviews_count, batch_size):
-            body_bits = []
+        self.write_indexes = [self.index] + self.get_aliased_indexes(self.rebuild_alias)
+        self.write_indexes_expiration = time.time() + self.config.get('ELASTIC_SEARCH_WRITE_INDEXES_EXPIRATION_IN_SECONDS', 60)
 
-            for page in reviewed_pages[i:i + batch_size]:
-                doc = self.gen_doc(page.last_review)
+        return self.write_indexes
 
+    def get_aliased_indexes(self, alias):
+        try:
+            indexes = self.syncES.aliases(alias)
+            return sorted(name for name, data in indexes.items() if alias in data.get('aliases', {}))
+        except ElasticHttpNotFoundError:
+            return []
+        except Exception as e:
+            logging.warning('Could not get indexes of alias %s (%s)' % (alias, e))
+            return []
+
+    def get_bulk_body(self, docs, indexes=None):
+        body_bits = []
+
+        for doc in docs:
+            for index in indexes or [None]:
+                action = {'index': {'_type': 'review'}}
                 action['index']['_id'] = doc['page_id']
 
+                if index is not None:
+                    action['index']['_index'] = index
+
                 body_bits.append(dumps(action))
                 body_bits.append(dumps(doc))
 
-            # Yes, that trailing newline IS necessary
-            body = '\n'.join(body_bits) + '\n'
+        # Yes, that trailing newline IS necessary
+        return '\n'.join(body_bits) + '\n'
+
+    def send_bulk(self, docs, indexes=None):
+        if indexes is None:
+            indexes = self.get_write_indexes()
+
+        if len(indexes) == 1:
+            path_components = [indexes[0], '_bulk']
+            body = self.get_bulk_body(docs)
+        else:
+            path_components = ['_bulk']
+            body = self.get_bulk_body(docs, indexes)
+
+        return self.syncES.send_request(
+            method='POST',
+            path_components=path_components,
+            body=body,
+            encode_body=False
+        )
+
+    def index_docs(self, docs, indexes=None):
+        '''Indexes docs with a single bulk request and returns the ones
+        that could not be indexed.'''
+
+        if indexes is None:
+            indexes = self.get_write_indexes()
+
+        try:
+            response = self.send_bulk(docs, indexes)
+        except (Timeout, ConnectionError, ElasticHttpError, InvalidJsonResponseError) as e:
+            logging.error('Could not index %d reviews: %s' % (len(docs), str(e)))
+            return docs
+
+        if not response.get('errors', False):
+            return []
+
+        failed = []
+        for position, item in enumerate(response.get('items', [])):
+            doc = docs[position // len(indexes)]
+            result = item.get('index', {})
+            if (result.get('status', 200) >= 300 or 'error' in result) and (not failed or failed[-1] is not doc):
+                logging.error('Could not index review (page_id:{0}): {1}'.format(doc['page_id'], result.get('error')))
+                failed.append(doc)
+
+        return failed
+
+    def index_docs_with_retries(self, docs, indexes=None):
+        backoff = self.config.get('ELASTIC_SEARCH_RETRY_BACKOFF_IN_SECONDS', 1)
+
+        for attempt in range(self.max_retries):
+            docs = self.index_docs(docs, indexes)
+
+            if not docs or attempt >= self.max_retries - 1:
+                break
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.config.get('ELASTIC_SEARCH_MAX_RETRY_BACKOFF_IN_SECONDS', 30))
+
+        return docs
 
-            self.syncES.send_request(
-                method='POST',
-                path_components=[self.index, '_bulk'],
-                body=body,
-                encode_body=False
+    def gen_doc_from_row(self, row, key_ids):
+        return {
+            'keys': [{'id': key_id} for key_id in key_ids],
+            'uuid': str(row.review_uuid),
+            'completed_date': row.completed_date,
+            'violation_count': len(key_ids),
+            'page_id': row.page_id,
+            'page_uuid': str(row.page_uuid),
+            'page_url': row.page_url,
+            'page_last_review_date': row.page_last_review_date,
+            'domain_id': row.domain_id,
+            'domain_name': row.domain_name,
+        }
+
+    def get_reviewed_pages(self, last_page_id, batch_size, keys=None):
+        query = self.db \
+            .query(
+                Page.id.label('page_id'),
+                Page.uuid.label('page_uuid'),
+                Page.url.label('page_url'),
+                Page.last_review_date.label('page_last_review_date'),
+                Page.last_review_id.label('review_id'),
+                Review.uuid.label('review_uuid'),
+                Review.completed_date.label('completed_date'),
+                Review.domain_id.label('domain_id'),
+                Domain.name.label('domain_name')
+            ) \
+            .join(Review, Review.id == Page.last_review_id) \
+            .join(Domain, Domain.id == Review.domain_id) \
+            .filter(Page.id > last_page_id)
+
+        if keys is not None:
+            query = query.filter(
+                exists()
+                .where(Violation.review_id == Page.last_review_id)
+                .where(Violation.key_id.in_(keys))
             )
 
-        logging.info('Done!')
+        return query.order_by(Page.id.asc()).limit(batch_size).all()
+
+    def get_violation_key_ids(self, review_ids):
+        key_ids = defaultdict(list)
+
+        if not review_ids:
+            return key_ids
+
+        rows = self.db \
+            .query(Violation.review_id, Violation.key_id, func.count(Violation.id)) \
+            .filter(Violation.review_id.in_(review_ids)) \
+            .group_by(Violation.review_id, Violation.key_id) \
+            .all()
+
+        for review_id, key_id, count in rows:
+            key_ids[review_id].extend([key_id] * count)
+
+        return key_ids
+
+    def iter_review_docs(self, last_page_id, batch_size, keys=None):
+        '''Yields (last page id, docs) batches of the reviews of pages after
+        last_page_id, paginating on the page id.'''
+
+        while True:
+            rows = self.get_reviewed_pages(last_page_id, batch_size, keys)
+
+            if not rows:
+                return
+
+            key_ids = self.get_violation_key_ids([row.review_id for row in rows])
+            last_page_id = rows[-1].page_id
+
+            yield last_page_id, [self.gen_doc_from_row(row, key_ids[row.review_id]) for row in rows]
+
+    def load_checkpoint(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return None
+
+        with open(checkpoint) as f:
+            return int(f.read().strip() or 0)
+
+    def save_checkpoint(self, checkpoint, last_page_id):
+        if not checkpoint:
+            return
+
+        with open(checkpoint + '.tmp', 'w') as f:
+            f.write(str(last_page_id))
+
+        os.rename(checkpoint + '.tmp', checkpoint)
+
+    def index_review_batches(self, batches, concurrency=1, checkpoint=None, indexes=None):
+        '''Sends each batch in its own bulk request, concurrency requests at
+        a time. The checkpoint only moves past a batch once it and every
+        batch before it were indexed, so resuming from it skips nothing.'''
+
+        pool = ThreadPool(concurrency)
+        pending = deque()
+        failed = []
+        indexed = 0
+
+        def wait_for_oldest():
+            last_page_id, docs_count, result = pending.popleft()
+            failed_docs = result.get()
+
+            if failed_docs:
+                logging.error('Could not index %d reviews up to page_id %d.' % (len(failed_docs), last_page_id))
+                failed.extend(failed_docs)
+            elif not failed:
+                self.save_checkpoint(checkpoint, last_page_id)
+
+            return docs_count - len(failed_docs)
+
+        try:
+            for last_page_id, docs in batches:
+                pending.append((last_page_id, len(docs), pool.apply_async(self.index_docs_with_retries, (docs, indexes))))
+
+                if len(pending) >= concurrency:
+                    indexed += wait_for_oldest()
+                    logging.info('%d reviews indexed (up to page_id %d)...' % (indexed, last_page_id))
+
+            while pending:
+                indexed += wait_for_oldest()
+        finally:
+            pool.close()
+            pool.join()
+
+        return indexed, failed
 
     @return_future
-    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None, callback=None):
+    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None,
+                                  cursor=None, callback=None):
         def treat_response(response):
             if response.error is None:
                 try:
@@ -180,7 +423,8 @@ class ElasticSearchProvider(SearchProvider):
 
                     callback({
                         'reviews': reviews_data,
-                        'reviewsCount': reviews_count
+                        'reviewsCount': reviews_count,
+                        'nextCursor': self._get_next_cursor(hits['hits'], page_size)
                     })
                 except Exception as e:
                     reason = 'ElasticSearchProvider: invalid response (%s [%s])' % (type(e), e.message)
@@ -191,11 +435,6 @@ class ElasticSearchProvider(SearchProvider):
                 logging.error(reason)
                 callback({'error': {'status_code': 500, 'reason': reason}})
 
-        inner_query = self._assemble_inner_query(domain, page_filter)
-        filter_terms = self._assemble_filter_terms(key_id, domain)
-
-        query = self._assemble_outer_query(inner_query, filter_terms)
-
         sort_ = [{
             'completed_date': {
                 'order': 'desc'
@@ -204,8 +443,28 @@ class ElasticSearchProvider(SearchProvider):
             'violation_count': {
                 'order': 'desc'
             }
+        }, {
+            'page_id': {
+                'order': 'desc'
+            }
         }]
 
+        cursor_filter = None
+        if cursor is not None:
+            values = self._decode_sort_cursor(cursor, sort_)
+
+            if values is None:
+                callback({'error': {'status_code': 400, 'reason': 'Invalid cursor'}})
+                return
+
+            cursor_filter = self._assemble_cursor_filter(sort_, values)
+            current_page = 1
+
+        inner_query = self._assemble_inner_query(domain, page_filter)
+        filter_terms = self._assemble_filter_terms(key_id, domain)
+
+        query = self._assemble_outer_query(inner_query, filter_terms, cursor_filter)
+
         source = {'query': query, 'sort': sort_}
 
         self.asyncES.search(
@@ -218,7 +477,8 @@ class ElasticSearchProvider(SearchProvider):
         )
 
     @return_future
-    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, callback=None):
+    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, cursor=None,
+                                  callback=None):
         def treat_response(response):
             if response.error is None:
                 try:
@@ -239,7 +499,8 @@ class ElasticSearchProvider(SearchProvider):
 
                     callback({
                         'reviewsCount': reviews_count,
-                        'pages': pages
+                        'pages': pages,
+                        'nextCursor': self._get_next_cursor(hits['hits'], page_size)
                     })
                 except Exception as e:
                     reason = 'ElasticSearchProvider: invalid response (%s [%s])' % (type(e), e.message)
@@ -250,11 +511,6 @@ class ElasticSearchProvider(SearchProvider):
                 logging.error(reason)
                 callback({'error': {'status_code': 500, 'reason': reason}})
 
-        inner_query = self._assemble_inner_query(domain=domain, page_filter=page_filter)
-        filter_terms = self._assemble_filter_terms(domain=domain)
-
-        query = self._assemble_outer_query(inner_query, filter_terms)
-
         sort_ = [{
             'violation_count': {
                 'order': 'desc'
@@ -263,8 +519,28 @@ class ElasticSearchProvider(SearchProvider):
             'completed_date': {
                 'order': 'desc'
             }
+        }, {
+            'page_id': {
+                'order': 'desc'
+            }
         }]
 
+        cursor_filter = None
+        if cursor is not None:
+            values = self._decode_sort_cursor(cursor, sort_)
+
+            if values is None:
+                callback({'error': {'status_code': 400, 'reason': 'Invalid cursor'}})
+                return
+
+            cursor_filter = self._assemble_cursor_filter(sort_, values)
+            current_page = 1
+
+        inner_query = self._assemble_inner_query(domain=domain, page_filter=page_filter)
+        filter_terms = self._assemble_filter_terms(domain=domain)
+
+        query = self._assemble_outer_query(inner_query, filter_terms, cursor_filter)
+
         source = {'query': query, 'sort': sort_}
 
         self.asyncES.search(
@@ -283,14 +559,14 @@ class ElasticSearchProvider(SearchProvider):
             logging.error('Could not refresh index (%s)' % e)
 
     def get_index_settings(cls):
-        return {
+        return cls.config.get('ELASTIC_SEARCH_INDEX_SETTINGS') or {
             'index': {
                 'number_of_shards': 4
             }
         }
 
     def get_index_mapping(cls):
-        return {
+        return cls.config.get('ELASTIC_SEARCH_INDEX_MAPPING') or {
             'review': {
                 'properties': {
                     'keys': {
@@ -335,22 +611,107 @@ class ElasticSearchProvider(SearchProvider):
             }
         }
 
-    def setup_index(self):
+    def get_new_index_name(self):
+        return '%s-%s' % (self.index, datetime.utcnow().strftime('%Y%m%d%H%M%S'))
+
+    def create_physical_index(self, index, rebuilding=False):
+        settings = deepcopy(self.get_index_settings())
+
+        if rebuilding:
+            # no replicas nor refreshes until the bulk load is done
+            settings.setdefault('index', {}).update(self.config.get('ELASTIC_SEARCH_REBUILD_INDEX_SETTINGS') or {
+                'number_of_replicas': 0,
+                'refresh_interval': '-1'
+            })
+
+        self.syncES.create_index(index=index, settings=settings)
+        self.syncES.put_mapping(index=index, doc_type='review', mapping=self.get_index_mapping())
+        logging.info('Index %s created.' % index)
+
+    def swap_alias(self, index):
+        '''Points the alias to index, atomically removing it from the
+        indexes it pointed to. Returns those indexes.'''
+
+        old_indexes = [name for name in self.get_aliased_indexes(self.index) if name != index]
+
+        if self.syncES.aliases().get(self.index) is not None:
+            # an index created before aliases were used has the alias name
+            logging.warning('Deleting index %s to replace it with an alias.' % self.index)
+            self.syncES.delete_index(index=self.index)
+
+        actions = [{'remove': {'index': name, 'alias': self.index}} for name in old_indexes]
+        actions.append({'add': {'index': index, 'alias': self.index}})
+        actions.extend(
+            {'remove': {'index': name, 'alias': self.rebuild_alias}}
+            for name in self.get_aliased_indexes(self.rebuild_alias)
+        )
+
+        self.syncES.update_aliases({'actions': actions})
+        logging.info('Alias %s now points to index %s.' % (self.index, index))
+
+        return old_indexes
+
+    def index_exists(self):
         try:
-            settings = self.get_index_settings()
-            self.syncES.create_index(index=self.index, settings=settings)
-            mapping = self.get_index_mapping()
-            self.syncES.put_mapping(index=self.index, doc_type='review', mapping=mapping)
-            logging.info('Index %s created.' % self.index)
-        except Exception as e:
-            raise e
+            self.syncES.aliases(self.index)
+            return True
+        except ElasticHttpNotFoundError:
+            return False
+
+    def setup_index(self):
+        if self.index_exists():
+            raise IndexAlreadyExistsError(400, 'IndexAlreadyExistsException[[%s] already exists]' % self.index)
+
+        index = self.get_new_index_name()
+        self.create_physical_index(index)
+        self.swap_alias(index)
+
+    def rebuild_index(self, batch_size=200, concurrency=1):
+        '''Builds a new index with every review while the alias keeps
+        serving the current one, then swaps the alias and deletes the old
+        indexes. Live writes go to both indexes during the rebuild. Each
+        rebuild starts a new index, so there is nothing to resume.'''
+
+        index = self.get_new_index_name()
+        wait = self.config.get('ELASTIC_SEARCH_WRITE_INDEXES_EXPIRATION_IN_SECONDS', 60)
+
+        self.create_physical_index(index, rebuilding=True)
+        self.syncES.update_aliases({'actions': [{'add': {'index': index, 'alias': self.rebuild_alias}}]})
+
+        logging.info('Waiting %ds for live writes to reach index %s...' % (wait, index))
+        time.sleep(wait)
+
+        self.index_all_reviews(batch_size=batch_size, replace=True, concurrency=concurrency, index=index)
+
+        index_settings = self.get_index_settings().get('index', {})
+        self.syncES.update_settings(index, {
+            'index': {
+                'number_of_replicas': index_settings.get('number_of_replicas', 1),
+                'refresh_interval': index_settings.get('refresh_interval', '1s'),
+            }
+        })
+        self.syncES.refresh(index=index)
+
+        old_indexes = self.swap_alias(index)
+
+        if old_indexes:
+            logging.info('Waiting %ds for live writes to leave indexes %s...' % (wait, ', '.join(old_indexes)))
+            time.sleep(wait)
+
+            for old_index in old_indexes:
+                self.syncES.delete_index(index=old_index)
+                logging.info('Index %s deleted.' % old_index)
 
     def delete_index(self):
-        try:
-            self.syncES.delete_index(index=self.index)
-            logging.info('Index %s deleted.' % self.index)
-        except Exception as e:
-            raise e
+        indexes = self.get_aliased_indexes(self.index) + self.get_aliased_indexes(self.rebuild_alias)
+
+        if not indexes:
+            # an index created before aliases were used has the alias name
+            indexes = [self.index]
+
+        for index in indexes:
+            self.syncES.delete_index(index=index)
+            logging.info('Index %s deleted.' % index)
 
     def _get_max_page_id_from_index(self, must_have_domain_name=False):
         if must_have_domain_name:
@@ -384,38 +745,38 @@ class ElasticSearchProvider(SearchProvider):
             return results['hits']['hits'][0]['_id'] or 0
         return 0
 
-    def index_all_reviews(self, keys=None, batch_size=200, replace=False):
+    def index_all_reviews(self, keys=None, batch_size=200, replace=False, concurrency=1, checkpoint=None, index=None):
         logging.info('Querying database...')
         self.connect_to_db()
 
         if keys is not None:
             keys = [k.id for k in self.db.query(Key.id).filter(Key.name.in_(keys)).all()]
 
-        try:
-            max_page_id = self._get_max_page_id_from_index(must_have_domain_name=True)
-        except Exception:
-            logging.error('Could not retrieve max page_id! Use with --replace (with caution)')
-            return
+        last_page_id = 0
 
-        def apply_filters(query):
-            if keys is not None:
-                query = query \
-                    .filter(Violation.review_id == Page.last_review_id) \
-                    .filter(Violation.key_id.in_(keys))
+        if not replace:
+            last_page_id = self.load_checkpoint(checkpoint)
 
-            if not replace:
-                query = query.filter(Page.id > max_page_id)
-
-            return query.filter(Page.last_review_id != None)
+        if last_page_id is None:
+            try:
+                last_page_id = int(self._get_max_page_id_from_index(must_have_domain_name=True))
+            except Exception:
+                logging.error('Could not retrieve max page_id! Use with --replace (with caution)')
+                return
 
-        reviews_count = apply_filters(self.db.query(func.count(Page))).scalar()
+        logging.info('Indexing reviews after page_id %d with %d concurrent requests...' % (last_page_id, concurrency))
 
-        query = self.db.query(Page).options(joinedload('last_review'))
-        reviewed_pages = apply_filters(query).order_by(Page.id.asc())
+        indexed, failed = self.index_review_batches(
+            self.iter_review_docs(last_page_id, batch_size, keys),
+            concurrency=concurrency,
+            checkpoint=checkpoint,
+            indexes=[index] if index is not None else None
+        )
 
-        logging.info('Indexing %d reviews...' % reviews_count)
+        if failed:
+            logging.error('%d reviews could not be indexed! Run again to resume from the last checkpoint.' % len(failed))
 
-        self.index_reviews(reviewed_pages, reviews_count, batch_size)
+        logging.info('Done! %d reviews indexed.' % indexed)
 
     @classmethod
     def new_instance(cls, config):
@@ -438,10 +799,14 @@ class ElasticSearchProvider(SearchProvider):
         log_level = levels[args.verbose]
         logging.basicConfig(level=getattr(logging, log_level), format='%(levelname)s - %(message)s')
 
-        if not (args.create or args.recreate or args.delete or args.keys or args.all_keys):
+        if not (args.create or args.recreate or args.delete or args.rebuild or args.keys or args.all_keys):
             parser.print_help()
             sys.exit(1)
 
+        if args.rebuild and (args.keys or args.all_keys or args.checkpoint or args.replace):
+            logging.error('--rebuild always reindexes every review! Do not use it with --keys, --all-keys, --checkpoint or --replace')
+            sys.exit(1)
+
         if args.conf:
             from derpconf.config import ConfigurationError
             from holmes.config import Config
@@ -494,19 +859,29 @@ class ElasticSearchProvider(SearchProvider):
                     if args.create or args.recreate:
                         es.setup_index()
 
-            if args.keys or args.all_keys:
+            if args.rebuild or args.keys or args.all_keys:
                 if config is None:
                     logging.error('Need a config file to perform such operation! Use --conf conf_file')
                 else:
                     batch_size = args.batch_size[0] if args.batch_size else 200
+                    concurrency = args.concurrency[0] if args.concurrency else 1
+                    checkpoint = args.checkpoint[0] if args.checkpoint else None
                     es = cls.new_instance(config) if not es else es
                     try:
                         if args.verbose > 2:
                             es.activate_debug()
-                        if args.keys:
-                            es.index_all_reviews(args.keys, replace=args.replace, batch_size=batch_size)
+                        if args.rebuild:
+                            es.rebuild_index(batch_size=batch_size, concurrency=concurrency)
+                        elif args.keys:
+                            es.index_all_reviews(
+                                args.keys, replace=args.replace, batch_size=batch_size,
+                                concurrency=concurrency, checkpoint=checkpoint
+                            )
                         elif args.all_keys:
-                            es.index_all_reviews(replace=args.replace, batch_size=batch_size)
+                            es.index_all_reviews(
+                                replace=args.replace, batch_size=batch_size,
+                                concurrency=concurrency, checkpoint=checkpoint
+                            )
                     except InvalidJsonResponseError as e:
                         logging.error('Invalid response! Reason: %s' % e)
                         sys.exit(1)
@@ -3,6 +3,7 @@
 
 from holmes.search_providers import SearchProvider
 from holmes.models.review import Review
+from holmes.utils import encode_cursor, decode_cursor, parse_cursor_date, CURSOR_INTEGER
 
 from tornado.concurrent import return_future
 
@@ -11,11 +12,22 @@ class NoExternalSearchProvider(SearchProvider):
     def __init__(self, config, db, authnz_wrapper=None, io_loop=None):
         self.db = db
 
-    def index_review(self, review):
+    def index_review(self, review, cache=None):
         pass
 
     @return_future
-    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None, callback=None):
+    def get_by_violation_key_name(self, key_id, current_page=1, page_size=10, domain=None, page_filter=None,
+                                  cursor=None, callback=None):
+        if cursor is not None:
+            cursor = decode_cursor(cursor, types=(basestring, CURSOR_INTEGER))
+            completed_date = parse_cursor_date(cursor[0]) if cursor else None
+
+            if completed_date is None:
+                callback({'error': {'status_code': 400, 'reason': 'Invalid cursor'}})
+                return
+
+            cursor = [completed_date, cursor[1]]
+
         reviews = Review.get_by_violation_key_name(
             db=self.db,
             key_id=key_id,
@@ -23,6 +35,7 @@ class NoExternalSearchProvider(SearchProvider):
             page_size=page_size,
             domain_filter=domain.name if domain else None,
             page_filter=page_filter,
+            cursor=cursor,
         )
 
         reviews_data = []
@@ -37,17 +50,31 @@ class NoExternalSearchProvider(SearchProvider):
                 'domain': item.domain_name,
             })
 
+        next_cursor = None
+        if reviews and len(reviews) == page_size:
+            next_cursor = encode_cursor([reviews[-1].completed_date, reviews[-1].page_id])
+
         callback({
-            'reviews': reviews_data
+            'reviews': reviews_data,
+            'nextCursor': next_cursor
         })
 
     @return_future
-    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, callback=None):
+    def get_domain_active_reviews(self, domain, current_page=1, page_size=10, page_filter=None, cursor=None,
+                                  callback=None):
+        if cursor is not None:
+            cursor = decode_cursor(cursor, types=(CURSOR_INTEGER, CURSOR_INTEGER))
+
+            if cursor is None:
+                callback({'error': {'status_code': 400, 'reason': 'Invalid cursor'}})
+                return
+
         reviews = domain.get_active_reviews(
             db=self.db,
             page_filter=page_filter,
             current_page=current_page,
             page_size=page_size,
+            cursor=cursor,
         )
 
         pages = []
@@ -61,7 +88,11 @@ class NoExternalSearchProvider(SearchProvider):
                 'reviewId': str(page.last_review_uuid)
             })
 
-        callback({'pages': pages})
+        next_cursor = None
+        if reviews and len(reviews) == page_size:
+            next_cursor = encode_cursor([reviews[-1].violations_count, reviews[-1].id])
+
+        callback({'pages': pages, 'nextCursor': next_cursor})
 
     @classmethod
     def new_instance(cls, config):
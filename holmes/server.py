@@ -5,11 +5,13 @@ from cow.server import Server
 from cow.plugins.sqlalchemy_plugin import SQLAlchemyPlugin
 from cow.plugins.redis_plugin import RedisPlugin
 from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import PeriodicCallback
 import tornado.locale
 import redis
 from materialgirl import Materializer
 from materialgirl.storage.redis import RedisStorage
 
+from holmes.executor import ThreadPoolExecutor
 from holmes.handlers.auth import AuthenticateHandler
 from holmes.handlers.page import (
     PageHandler, PageReviewsHandler, PageViolationsPerDayHandler, NextJobHandler
@@ -26,13 +28,15 @@ from holmes.handlers.domains import (
     DomainGroupedViolationsHandler, DomainTopCategoryViolationsHandler
 )
 from holmes.handlers.search import (
-    SearchHandler
+    SearchHandler, IndexingStatusHandler
 )
 from holmes.handlers.request import (
     RequestDomainHandler, LastRequestsHandler, FailedResponsesHandler,
-    LastRequestsStatusCodeHandler
+    LastRequestsStatusCodeHandler, RequestCacheStatsHandler, TransportStatsHandler,
+    FetchStatsHandler
 )
 from holmes.handlers.limiter import LimiterHandler
+from holmes.handlers.material import MaterialsStatusHandler
 from holmes.handlers.domains_violations_prefs import (
     DomainsViolationsPrefsHandler
 )
@@ -43,6 +47,7 @@ from holmes.handlers.bus import EventBusHandler
 from holmes.event_bus import EventBus
 from holmes.utils import load_classes, load_languages, locale_path
 from holmes.models import Key, DomainsViolationsPrefs
+from holmes.models.codec import ColumnCodec
 from holmes.cache import Cache
 from holmes import __version__
 from holmes.handlers import BaseHandler
@@ -93,6 +98,8 @@ class HolmesApiServer(Server):
             ('/page/(%s)/violations-per-day/?' % uuid_regex, PageViolationsPerDayHandler),
             ('/page/(%s)/?' % uuid_regex, PageHandler),
             ('/search/?', SearchHandler),
+            ('/search/indexing-status/?', IndexingStatusHandler),
+            ('/materials/status/?', MaterialsStatusHandler),
             ('/page/?', PageHandler),
             ('/domains/?', DomainsHandler),
             ('/domains-details/?', DomainsFullDataHandler),
@@ -114,6 +121,9 @@ class HolmesApiServer(Server):
             ('/last-requests/?', LastRequestsHandler),
             ('/last-requests/status-code/?', LastRequestsStatusCodeHandler),
             ('/last-requests/failed-responses/?', FailedResponsesHandler),
+            ('/requests/cache-stats/?', RequestCacheStatsHandler),
+            ('/requests/transport-stats/?', TransportStatsHandler),
+            ('/requests/fetch-stats/?', FetchStatsHandler),
             ('/version/?', VersionHandler, dict(is_public=True)),
             ('/authenticate/?', AuthenticateHandler, dict(is_public=True)),
             ('/users/violations-prefs/?', UsersViolationsPrefsHandler),
@@ -131,8 +141,15 @@ class HolmesApiServer(Server):
     def after_start(self, io_loop):
         if self.db is not None:
             self.application.db = self.db
+            # a session given to the server is shared by every request
+            self.application.request_db_maker = None
         else:
             self.application.db = self.application.get_sqlalchemy_session()
+            self.application.request_db_maker = self.application.sqlalchemy_db_maker
+
+        self.application.db_executor = ThreadPoolExecutor(self.config.DB_EXECUTOR_MAX_WORKERS, io_loop)
+
+        ColumnCodec.configure(self.application.config)
 
         if self.debug:
             from sqltap import sqltap
@@ -183,7 +200,7 @@ class HolmesApiServer(Server):
 
         self.application.cache = Cache(self.application)
 
-        self.configure_material_girl()
+        self.configure_material_girl(io_loop)
 
         self.configure_i18n()
 
@@ -194,8 +211,8 @@ class HolmesApiServer(Server):
             self.application.cache
         )
 
-    def configure_material_girl(self):
-        from holmes.material import configure_materials
+    def configure_material_girl(self, io_loop=None):
+        from holmes.material import configure_materials, configure_material_cache, MaterialCache
 
         host = self.config.get('MATERIAL_GIRL_REDISHOST')
         port = self.config.get('MATERIAL_GIRL_REDISPORT')
@@ -209,6 +226,19 @@ class HolmesApiServer(Server):
 
         configure_materials(self.application.girl, self.application.db, self.config)
 
+        check_interval = self.config.get('MATERIALS_CACHE_CHECK_INTERVAL_IN_SECONDS')
+        self.application.material_cache = MaterialCache(
+            self.application.girl, check_interval, getattr(self.application, 'db_executor', None),
+            self.application.db
+        )
+        configure_material_cache(self.application.material_cache)
+
+        if check_interval:
+            self.material_cache_refresher = PeriodicCallback(
+                self.application.material_cache.refresh_in_background, check_interval * 1000, io_loop=io_loop
+            )
+            self.material_cache_refresher.start()
+
     def _load_validators(self):
         return load_classes(default=self.config.VALIDATORS)
 
@@ -235,6 +265,10 @@ class HolmesApiServer(Server):
 
     def before_end(self, io_loop):
         self.application.db.remove()
+        self.application.db_executor.shutdown()
+
+        if getattr(self, 'material_cache_refresher', None) is not None:
+            self.material_cache_refresher.stop()
 
         if self.debug and getattr(self, 'sqltap', None) is not None:
             from sqltap import sqltap
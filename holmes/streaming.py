@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import zlib
+
+from tornado.httputil import HTTPHeaders
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_header(headers, name):
+    if not headers:
+        return None
+
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+
+    return None
+
+
+def get_served_gzipped_size(headers):
+    '''Size the origin sent the body with, when it was already gzipped.'''
+
+    encoding = get_header(headers, 'Content-Encoding')
+    if not encoding or 'gzip' not in encoding.lower():
+        return None
+
+    try:
+        return int(get_header(headers, 'Content-Length'))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_content_length(headers):
+    '''Body size announced by the origin, from Content-Range (ranged
+    responses) or Content-Length, or None when it is not known.'''
+
+    content_range = get_header(headers, 'Content-Range')
+    if content_range:
+        total = content_range.rsplit('/', 1)[-1].strip()
+        return int(total) if total.isdigit() else None
+
+    try:
+        return int(get_header(headers, 'Content-Length'))
+    except (TypeError, ValueError):
+        return None
+
+
+class GzippedSizeEstimator(object):
+    '''Compressed size of a body (the same Baser.to_gzip would give),
+    computed chunk by chunk as the body arrives.'''
+
+    def __init__(self):
+        self.size = 0
+        self.written = 0
+        self.compressor = zlib.compressobj()
+
+    def use_served_size(self, size):
+        self.size = size
+        self.compressor = None
+
+    def write(self, chunk):
+        self.written += len(chunk)
+
+        if self.compressor is not None:
+            self.size += len(self.compressor.compress(chunk))
+
+    def close(self):
+        if self.compressor is not None:
+            if self.written:
+                self.size += len(self.compressor.flush())
+            self.compressor = None
+
+        return self.size
+
+    @classmethod
+    def estimate(cls, text, headers=None):
+        served_size = get_served_gzipped_size(headers)
+        if served_size is not None:
+            return served_size
+
+        if not text:
+            return 0
+
+        estimator = cls()
+        for index in range(0, len(text), CHUNK_SIZE):
+            estimator.write(text[index:index + CHUNK_SIZE])
+
+        return estimator.close()
+
+
+class StreamedBody(object):
+    '''Consumes a response body chunk by chunk, keeping only its size, its
+    compressed size and its first head_size bytes. Consumers that need the
+    whole body, like parsers, can read it through chunk_callback.'''
+
+    def __init__(self, head_size, chunk_callback=None):
+        self.head_size = head_size
+        self.chunk_callback = chunk_callback
+        self.head = ''
+        self.size = 0
+        self.gzipped_size = 0
+        self.headers = HTTPHeaders()
+        self.estimator = GzippedSizeEstimator()
+
+    @classmethod
+    def from_sizes(cls, head, size, gzipped_size):
+        body = cls(len(head))
+        body.head = head
+        body.size = size
+        body.gzipped_size = gzipped_size
+        body.estimator = None
+        return body
+
+    @property
+    def truncated(self):
+        return self.size > len(self.head)
+
+    def header(self, line):
+        # each redirect starts a new set of headers with its status line
+        if line.startswith('HTTP/'):
+            self.headers = HTTPHeaders()
+        elif line.strip():
+            self.headers.parse_line(line)
+
+    def write(self, chunk):
+        if not self.size:
+            served_size = get_served_gzipped_size(self.headers)
+            if served_size is not None:
+                self.estimator.use_served_size(served_size)
+
+        self.size += len(chunk)
+
+        if len(self.head) < self.head_size:
+            self.head += chunk[:self.head_size - len(self.head)]
+
+        self.estimator.write(chunk)
+
+        if self.chunk_callback is not None:
+            self.chunk_callback(chunk)
+
+    def close(self):
+        if self.estimator is None:
+            return
+
+        self.gzipped_size = self.estimator.close()
+        self.estimator = None
+
+
+def get_streamed_body(response):
+    body = getattr(response, 'streamed_body', None)
+
+    if isinstance(body, StreamedBody):
+        return body
+
+    return None
+
+
+def get_body_size(response):
+    body = get_streamed_body(response)
+
+    if body is not None:
+        return body.size
+
+    return len(response.text) if response.text else 0
+
+
+def get_gzipped_body_size(response):
+    body = get_streamed_body(response)
+
+    if body is not None:
+        return body.gzipped_size
+
+    if not response.text:
+        return 0
+
+    headers = getattr(response, 'headers', None)
+    if not isinstance(headers, dict):
+        headers = None
+
+    return GzippedSizeEstimator.estimate(response.text, headers)
@@ -0,0 +1,236 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from datetime import timedelta
+from collections import defaultdict
+
+from octopus import TornadoOctopus
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+
+from holmes.utils import get_domain_from_url
+
+try:
+    import pycurl
+    from tornado.curl_httpclient import CurlAsyncHTTPClient
+except ImportError:
+    pycurl = None
+    CurlAsyncHTTPClient = None
+
+
+def get_pool_limits(domains, concurrency):
+    '''Connections kept open in total and per host. A host never takes
+    more connections than its limiter allows concurrent requests, so the
+    largest limiter value (or the concurrency, without limiters) bounds
+    the per host pool.'''
+
+    limits = [limit for domain in domains or [] for limit in domain.values()]
+
+    max_host_connections = min(max(limits), concurrency) if limits else concurrency
+
+    return concurrency, max(max_host_connections, 1)
+
+
+class HostStats(object):
+    '''Connection reuse and handshake times of the requests to each host.'''
+
+    FIELDS = ('requests', 'reused_connections', 'new_connections', 'connect_time', 'handshake_time')
+
+    def __init__(self):
+        self.hosts = defaultdict(lambda: defaultdict(float))
+
+    def record(self, url, time_info):
+        # only the curl client of the transport reports new connections
+        if not time_info or 'num_connects' not in time_info:
+            return
+
+        host, host_url = get_domain_from_url(url)
+        stats = self.hosts[host]
+
+        stats['requests'] += 1
+
+        # curl opens no connection for requests sent over a pooled one
+        if time_info['num_connects'] > 0:
+            stats['new_connections'] += 1
+            stats['connect_time'] += time_info.get('connect', 0)
+            # only https requests have an app connect (tls handshake) time
+            if time_info.get('appconnect', 0) > 0:
+                stats['handshake_time'] += max(time_info['appconnect'] - time_info.get('connect', 0), 0)
+        else:
+            stats['reused_connections'] += 1
+
+    def pop(self):
+        hosts, self.hosts = self.hosts, defaultdict(lambda: defaultdict(float))
+        return hosts
+
+
+def get_host_stats(counters):
+    '''Per host transport stats from the hash of host:field counters the
+    workers flush.'''
+
+    hosts = defaultdict(lambda: defaultdict(float))
+
+    for key, value in (counters or {}).items():
+        host, field = key.rsplit(':', 1)
+        hosts[host][field] = float(value)
+
+    result = []
+    for host, stats in hosts.items():
+        requests = stats['requests']
+        new_connections = stats['new_connections']
+
+        result.append({
+            'host': host,
+            'requests': int(requests),
+            'reusedConnections': int(stats['reused_connections']),
+            'newConnections': int(new_connections),
+            'reuseRate': stats['reused_connections'] / requests if requests else 0.0,
+            'averageConnectTime': stats['connect_time'] / new_connections if new_connections else 0.0,
+            'averageHandshakeTime': stats['handshake_time'] / new_connections if new_connections else 0.0,
+        })
+
+    return sorted(result, key=lambda item: -item['requests'])
+
+
+if CurlAsyncHTTPClient is not None:
+    class ConnectionInfoCurlAsyncHTTPClient(CurlAsyncHTTPClient):
+        '''Curl client adding the number of connections each request opened
+        (0 when it reused a pooled one) and its tls handshake end to the
+        time_info of the responses.'''
+
+        def _finish(self, curl, curl_error=None, curl_message=None):
+            info = curl.info
+            connection_info = {'num_connects': curl.getinfo(pycurl.NUM_CONNECTS)}
+
+            if hasattr(pycurl, 'APPCONNECT_TIME'):
+                connection_info['appconnect'] = curl.getinfo(pycurl.APPCONNECT_TIME)
+
+            callback = info['callback']
+
+            def add_connection_info(response):
+                response.time_info.update(connection_info)
+                callback(response)
+
+            info['callback'] = add_connection_info
+
+            super(ConnectionInfoCurlAsyncHTTPClient, self)._finish(curl, curl_error, curl_message)
+
+
+class FetchTransport(TornadoOctopus):
+    '''Octopus with keep-alive connection pools per host, sized after the
+    domain limiters, that records connection reuse per host.'''
+
+    def __init__(self, *args, **kw):
+        self.domains = kw.pop('domains', None)
+        super(FetchTransport, self).__init__(*args, **kw)
+        self.host_stats = HostStats()
+        self.running_polls = 0
+
+    @property
+    def uses_curl(self):
+        return pycurl is not None and not self.ignore_pycurl
+
+    def start(self):
+        logging.debug('Creating IOLoop and http_client.')
+        self.ioloop = IOLoop()
+
+        if self.uses_curl:
+            self.http_client = ConnectionInfoCurlAsyncHTTPClient(io_loop=self.ioloop, max_clients=self.concurrency)
+        else:
+            self.http_client = AsyncHTTPClient(io_loop=self.ioloop, max_clients=self.concurrency)
+        self.configure_pools()
+
+    def update_domains(self, domains):
+        self.domains = domains
+        self.configure_pools()
+
+    def configure_pools(self):
+        if not self.uses_curl:
+            return
+
+        max_connections, max_host_connections = get_pool_limits(self.domains, self.concurrency)
+
+        # both options depend on the libcurl pycurl was built with
+        options = (
+            ('M_MAXCONNECTS', max_connections),
+            ('M_MAX_HOST_CONNECTIONS', max_host_connections),
+        )
+
+        for name, value in options:
+            if hasattr(pycurl, name):
+                self.http_client._multi.setopt(getattr(pycurl, name), value)
+
+    def handle_curl_callback(self, curl):
+        super(FetchTransport, self).handle_curl_callback(curl)
+
+        if self.allow_connection_reuse and hasattr(pycurl, 'TCP_KEEPALIVE'):
+            curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+
+    def fetch(self, url, handler, method, **kw):
+        # requests may wait in the queue and on limiter misses before this
+        dispatch_callback = kw.pop('dispatch_callback', None)
+        if dispatch_callback is not None:
+            dispatch_callback(url)
+
+        super(FetchTransport, self).fetch(url, handler, method, **kw)
+
+    def handle_request(self, url, callback):
+        handle = super(FetchTransport, self).handle_request(url, callback)
+
+        def record(response):
+            self.host_stats.record(url, getattr(response, 'time_info', None))
+            handle(response)
+
+        return record
+
+    def poll(self, check, handler, interval, timeout):
+        '''Calls check every interval seconds until it returns something
+        other than None, or for timeout seconds, then calls handler with
+        the result. Polls take no concurrency slot from the requests, but
+        wait returns only after they are done.'''
+
+        self.running_polls += 1
+        deadline = time.time() + timeout
+
+        def run():
+            result = check()
+
+            if result is None and time.time() < deadline:
+                self.ioloop.add_timeout(timedelta(seconds=interval), run)
+                return
+
+            self.running_polls -= 1
+
+            try:
+                handler(result)
+            except Exception:
+                logging.exception('Error calling poll handler.')
+
+            if self.running_urls < self.concurrency and self.url_queue:
+                self.get_next_url()
+
+            if self.running_urls < 1 and self.remaining_requests == 0:
+                self.stop()
+
+        self.ioloop.add_timeout(timedelta(seconds=interval), run)
+
+    def wait(self, timeout=10):
+        # octopus returns right away when no urls are left, polls or not
+        if not self.running_polls or self.running_urls or self.url_queue:
+            super(FetchTransport, self).wait(timeout)
+            return
+
+        self.last_timeout = timeout
+        if timeout:
+            self.ioloop.set_blocking_signal_threshold(timeout, self.handle_wait_timeout)
+
+        self.ioloop.start()
+
+    def stop(self, force=False):
+        # the last request done leaves the ioloop to the polls still running
+        if self.running_polls and not force:
+            return
+
+        super(FetchTransport, self).stop(force)
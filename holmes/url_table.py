@@ -0,0 +1,43 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+class UrlTable(object):
+    '''Urls seen during a review, each known by an integer id.
+
+    The table only maps urls to ids. Review data keeps ids (dicts of id to
+    response, or arrays of ids) and gets the urls back in bulk with
+    iter_urls, so the table holds no reverse index and each url string is
+    kept once per review.
+    '''
+
+    def __init__(self):
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_id(self, url):
+        url_id = self.ids.get(url, None)
+
+        if url_id is None:
+            url_id = self.ids[url] = len(self.ids)
+
+        return url_id
+
+    def iter_urls(self, ids):
+        '''(id, url) of each of the given ids, once each, in a single pass
+        over the table.'''
+
+        if not isinstance(ids, (set, frozenset, dict)):
+            ids = set(ids)
+
+        if not ids:
+            return
+
+        for url, url_id in self.ids.iteritems():
+            if url_id in ids:
+                yield url_id, url
+
+    def get_urls(self, ids):
+        return dict(self.iter_urls(ids))
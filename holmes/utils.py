@@ -7,6 +7,9 @@ import logging
 import gettext
 
 import jwt
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+from ujson import dumps, loads
 from tornado import httputil
 from six.moves.urllib.parse import urlparse
 
@@ -127,6 +130,53 @@ def count_url_levels(url):
     return None
 
 
+CURSOR_DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+CURSOR_INTEGER = (int, long)
+CURSOR_NUMBER = (int, long, float)
+
+
+def encode_cursor(values):
+    '''Opaque token for the sort values of the last item of a page.'''
+    values = [
+        value.strftime(CURSOR_DATE_FORMAT) if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return urlsafe_b64encode(dumps(values))
+
+
+def decode_cursor(cursor, size=None, types=None):
+    '''Values of a cursor, or None when it is not a list of size values,
+    or of values of the given types (one type or tuple of types per value).'''
+    if not cursor:
+        return None
+
+    try:
+        values = loads(urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        return None
+
+    if types is not None:
+        size = len(types)
+
+    if not isinstance(values, list) or (size is not None and len(values) != size):
+        return None
+
+    if types is not None:
+        for value, value_types in zip(values, types):
+            # booleans are ints to isinstance
+            if isinstance(value, bool) or not isinstance(value, value_types):
+                return None
+
+    return values
+
+
+def parse_cursor_date(value):
+    try:
+        return datetime.strptime(value, CURSOR_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
 class Jwt(object):
     '''Json Web Tokens encoding/decoding utility class.
     Usage:
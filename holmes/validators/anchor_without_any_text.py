@@ -7,6 +7,8 @@ from holmes.utils import _
 
 
 class AnchorWithoutAnyTextValidator(Validator):
+    requires = ('page.all_links',)
+
     @classmethod
     def get_empty_anchors_parsed_value(cls, value):
         return ', '.join([
@@ -6,6 +6,10 @@ from holmes.facters import Baser
 
 class Validator(Baser):
 
+    # review.data keys this validator reads. The reviewer runs it as soon as
+    # no facter is still fetching any of them; None waits for every facter.
+    requires = None
+
     def __init__(self, reviewer):
         self.reviewer = reviewer
         self.url_buffer = set()
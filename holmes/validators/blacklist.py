@@ -7,6 +7,8 @@ from holmes.utils import _
 
 
 class BlackListValidator(Validator):
+    requires = ('page.all_links',)
+
     @classmethod
     def get_blacklist_parsed_value(cls, value):
         return ', '.join([
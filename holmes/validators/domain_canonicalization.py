@@ -7,6 +7,11 @@ from holmes.utils import _
 
 
 class DomainCanonicalizationValidator(Validator):
+    # reads no facts, only the responses of its own requests
+    requires = ()
+
+    www_url_res = None
+    no_www_url_res = None
 
     @classmethod
     def get_no_301_parsed_value(cls, value):
@@ -79,14 +84,22 @@ class DomainCanonicalizationValidator(Validator):
 
         canonical_urls = self.get_canonical_urls()
 
+        self.www_url_res = None
+        self.no_www_url_res = None
+
         self.async_get(canonical_urls['www_url'],
                        self.handle_www_url_res,
                        follow_redirects=False)
         self.async_get(canonical_urls['no_www_url'],
                        self.handle_no_www_url_res,
                        follow_redirects=False)
-        self.reviewer.wait_for_async_requests()
 
+    def validate_when_loaded(self):
+        # runs on the second response, without waiting on other requests
+        if self.www_url_res is not None and self.no_www_url_res is not None:
+            self.validate_canonical_urls(self.get_canonical_urls())
+
+    def validate_canonical_urls(self, canonical_urls):
         if not self.has_same_effective_urls():
             self.add_violation(
                 key='page.canonicalization.different_endpoints',
@@ -104,9 +117,11 @@ class DomainCanonicalizationValidator(Validator):
 
     def handle_www_url_res(self, url, response):
         self.www_url_res = response
+        self.validate_when_loaded()
 
     def handle_no_www_url_res(self, url, response):
         self.no_www_url_res = response
+        self.validate_when_loaded()
 
     def has_same_effective_urls(self):
         def target_url(res):
@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class GoogleAnalyticsValidator(Validator):
+    requires = ('page.google_analytics',)
 
     @classmethod
     def get_violation_definitions(cls):
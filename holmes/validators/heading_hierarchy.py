@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class HeadingHierarchyValidator(Validator):
+    requires = ('page.heading_hierarchy',)
 
     @classmethod
     def get_violation_parsed_value(cls, value):
@@ -69,6 +70,8 @@ class HeadingHierarchyValidator(Validator):
 
 
 class H1HeadingValidator(Validator):
+    requires = ('page.heading_hierarchy',)
+
     @classmethod
     def get_violation_definitions(cls):
         return {
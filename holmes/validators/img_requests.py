@@ -2,10 +2,12 @@
 # -*- coding: utf-8 -*-
 
 from holmes.validators.base import Validator
+from holmes.streaming import get_body_size
 from holmes.utils import _
 
 
 class ImageRequestsValidator(Validator):
+    requires = ('page.images', 'total.size.img')
 
     @classmethod
     def get_broken_images_parsed_values(cls, value):
@@ -122,13 +124,14 @@ class ImageRequestsValidator(Validator):
 
         over_max_size = set()
 
-        for url, response in img_files:
+        for url_id, url in self.review.urls.iter_urls(img_files):
+            response = img_files[url_id]
 
             if response.status_code > 399:
                 broken_imgs.add(url)
 
             if response.text is not None:
-                size_img = len(response.text) / 1024.0
+                size_img = get_body_size(response) / 1024.0
 
                 if size_img > max_single_size_img:
                     over_max_size.add((url, size_img))
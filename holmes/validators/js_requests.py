@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class JSRequestsValidator(Validator):
+    requires = ('page.js', 'total.requests.js', 'total.size.js', 'total.size.js.gzipped')
 
     @classmethod
     def get_violation_definitions(cls):
@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class LastModifiedValidator(Validator):
+    requires = ('page.last_modified',)
 
     @classmethod
     def get_violation_definitions(cls):
@@ -10,6 +10,8 @@ REMOVE_HASH = re.compile('([#].*)$')
 
 
 class LinkCrawlerValidator(Validator):
+    requires = ('page.links',)
+
     def __init__(self, *args, **kw):
         super(LinkCrawlerValidator, self).__init__(*args, **kw)
         self.broken_links = set()
@@ -69,7 +71,8 @@ class LinkCrawlerValidator(Validator):
         number_of_links = float(len(links)) or 1.0
         link_score = available_score / number_of_links
 
-        for url, response in links:
+        for url_id, url in self.review.urls.iter_urls(links):
+            response = links[url_id]
             domain, domain_url = get_domain_from_url(url)
             if domain in self.page_url:
                 self.send_url(response.effective_url, link_score, response)
@@ -82,14 +85,14 @@ class LinkCrawlerValidator(Validator):
         if self.broken_links:
             self.add_violation(
                 key='link.broken',
-                value=self.broken_links,
+                value=self.get_urls(self.broken_links),
                 points=100 * len(self.broken_links)
             )
 
         if self.moved_links:
             self.add_violation(
                 key='link.moved.temporarily',
-                value=self.moved_links,
+                value=self.get_urls(self.moved_links),
                 points=100
             )
 
@@ -103,8 +106,11 @@ class LinkCrawlerValidator(Validator):
     def get_links(self):
         return self.review.data['page.links']
 
+    def get_urls(self, url_ids):
+        return set(self.review.urls.get_urls(url_ids).values())
+
     def broken_link_violation(self, url, response):
-        self.broken_links.add(url)
+        self.broken_links.add(self.review.urls.get_id(url))
 
     def moved_link_violation(self, url, response):
-        self.moved_links.add(url)
+        self.moved_links.add(self.review.urls.get_id(url))
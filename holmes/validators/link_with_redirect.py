@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class LinkWithRedirectValidator(Validator):
+    requires = ('page.links',)
 
     @classmethod
     def get_violation_definitions(cls):
@@ -41,7 +42,8 @@ class LinkWithRedirectValidator(Validator):
     def validate(self):
         links = self.get_links()
 
-        for url, response in links:
+        # only the responses matter, not their urls
+        for response in links.values():
             if response.status_code in [302, 307]:
                 self.add_violation(
                     key='link.redirect.%d' % response.status_code,
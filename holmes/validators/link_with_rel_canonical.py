@@ -12,6 +12,7 @@ from holmes.validators.base import Validator
 
 
 class LinkWithRelCanonicalValidator(Validator):
+    requires = ('page.head',)
 
     @classmethod
     def get_violation_definitions(cls):
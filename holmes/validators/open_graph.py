@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class OpenGraphValidator(Validator):
+    requires = ('meta.tags',)
 
     @classmethod
     def get_open_graph_parsed_value(cls, value):
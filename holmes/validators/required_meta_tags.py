@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class RequiredMetaTagsValidator(Validator):
+    requires = ('meta.tags',)
 
     @classmethod
     def get_violation_definitions(cls):
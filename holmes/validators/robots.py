@@ -7,6 +7,7 @@ from holmes.utils import _
 
 
 class RobotsValidator(Validator):
+    requires = ('robots.response',)
 
     SITEMAP_NOT_FOUND = _('You must specify the location of the Sitemap '
                           'using a robots.txt file')
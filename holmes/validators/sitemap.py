@@ -19,6 +19,8 @@ INVALID_CHARS = re.compile(r'(&|\'|"|>|<)')
 
 
 class SitemapValidator(Validator):
+    requires = ('sitemap.data', 'sitemap.urls', 'sitemap.files.size', 'sitemap.files.urls')
+
     MAX_SITEMAP_SIZE = 10  # 10 MB
     MAX_LINKS_SITEMAP = 50000
 
@@ -121,7 +123,7 @@ class SitemapValidator(Validator):
                     points=10
                 )
 
-            for url in self.review.data['sitemap.urls'][sitemap]:
+            for url_id, url in self.review.urls.iter_urls(self.review.data['sitemap.urls'][sitemap]):
                 match = URL_RE.match(url)
 
                 if not match:
@@ -6,6 +6,7 @@ from holmes.utils import _
 
 
 class TitleValidator(Validator):
+    requires = ('page.title', 'page.title_count')
 
     @classmethod
     def get_violation_definitions(cls):
@@ -6,6 +6,7 @@ from holmes.validators.base import Validator
 
 
 class UrlWithUnderscoreValidator(Validator):
+    requires = ()
 
     @classmethod
     def get_url_with_underscore_message(cls):
@@ -3,32 +3,53 @@
 
 import sys
 import logging
+from copy import copy
+from collections import deque, defaultdict
 from uuid import uuid4
 from datetime import datetime, timedelta
 
 from ujson import dumps
 from colorama import Fore, Style
-from octopus import TornadoOctopus
 from octopus.limiter.redis.per_domain import Limiter
-from retools.lock import Lock, LockTimeout
 from sqlalchemy.orm import scoped_session
+from tornado.ioloop import PeriodicCallback
 
 from holmes import __version__
 from holmes.reviewer import Reviewer
+from holmes.streaming import StreamedBody, get_content_length
+from holmes.transport import FetchTransport
 from holmes.utils import load_classes, count_url_levels, get_domain_from_url
 from holmes.models import Request, Key, DomainsViolationsPrefs
 from holmes.cli import BaseCLI
 
 
+# statuses of origins that don't answer HEAD requests properly
+HEAD_REFUSED_STATUS_CODES = (400, 403, 405, 501)
+
+
 class BaseWorker(BaseCLI):
+    def __init__(self, *args, **kw):
+        super(BaseWorker, self).__init__(*args, **kw)
+
+        # handlers waiting for the fetches in flight, by method and url
+        self.in_flight = {}
+        self.fetch_counters = defaultdict(int)
+
+        # leases of the jobs being reviewed, renewed until they complete
+        self.leases = set()
+        # urls of the jobs being reviewed, in the order they started
+        self.working_urls = []
+
     def _load_validators(self):
         return load_classes(default=self.config.VALIDATORS)
 
     def _load_facters(self):
         return load_classes(default=self.config.FACTERS)
 
-    def get_otto_limiter(self):
-        domains = self.cache.get_domain_limiters()
+    def get_otto_limiter(self, domains=None):
+        if domains is None:
+            domains = self.cache.get_domain_limiters()
+
         limiter = None
 
         if domains:
@@ -48,13 +69,18 @@ class BaseWorker(BaseCLI):
         if hasattr(self.otto, 'limiter') and self.otto.limiter is not None:
             self.otto.limiter.update_domain_definitions(*domains)
 
+        if hasattr(self.otto, 'update_domains'):
+            self.otto.update_domains(domains)
+
     def start_otto(self):
         self.info('Starting Octopus with %d concurrent threads.' % self.options.concurrency)
-        self.otto = TornadoOctopus(
+        domains = self.cache.get_domain_limiters()
+        self.otto = FetchTransport(
             concurrency=self.options.concurrency, cache=self.options.cache,
             connect_timeout_in_seconds=self.config.CONNECT_TIMEOUT_IN_SECONDS,
             request_timeout_in_seconds=self.config.REQUEST_TIMEOUT_IN_SECONDS,
-            limiter=self.get_otto_limiter()
+            limiter=self.get_otto_limiter(domains),
+            domains=domains
         )
         self.otto.start()
 
@@ -67,6 +93,9 @@ class BaseWorker(BaseCLI):
             logging.error("Cannot rollback: %s" % str(err))
 
         self.otto.url_queue = []
+        self.in_flight = {}
+        # the jobs of the failed reviews go back to the bucket as failed attempts
+        self.leases.clear()
         self.db.close_all()
         self.db.remove()
         self.db = scoped_session(self.sqlalchemy_db_maker)
@@ -79,28 +108,265 @@ class BaseWorker(BaseCLI):
                 }
             )
 
-    def async_get(self, url, handler, method='GET', **kw):
-        url, response = self.cache.get_request(url)
+    def async_get(self, url, handler, method='GET', streamed=False, chunk_callback=None, skip_body=False,
+                  need_size=False, **kw):
+        if skip_body and method == 'GET':
+            return self.async_get_without_body(url, handler, need_size, **kw)
 
-        if not response:
-            kw['proxy_host'] = self.config.HTTP_PROXY_HOST
-            kw['proxy_port'] = self.config.HTTP_PROXY_PORT
+        # truncated cached bodies are of no use to whoever reads the chunks
+        url, response = self.cache.get_request(url, streamed=streamed and chunk_callback is None)
 
-            self.debug('Enqueueing %s for %s...' % (method, url))
-            self.otto.enqueue(url, self.handle_response(url, handler), method, **kw)
-        else:
+        if response:
             handler(url, response)
+            return
+
+        # each chunk callback needs its own fetch
+        if method != 'GET' or chunk_callback is not None:
+            self.enqueue_get(url, handler, method, streamed, chunk_callback, **kw)
+            return
 
-    def handle_response(self, url, handler):
+        handler = self.coalesce(('GET', url, streamed), handler)
+
+        if handler is not None:
+            self.fetch_once(
+                url, handler,
+                lambda: self.cache.get_request(url, streamed=streamed)[1],
+                lambda handler, **dispatch: self.enqueue_get(url, handler, method, streamed, **dict(kw, **dispatch))
+            )
+
+    def enqueue_get(self, url, handler, method='GET', streamed=False, chunk_callback=None, **kw):
+        kw['proxy_host'] = self.config.HTTP_PROXY_HOST
+        kw['proxy_port'] = self.config.HTTP_PROXY_PORT
+
+        validated = None
+        if method == 'GET' and chunk_callback is None:
+            validated, validators = self.cache.get_validated_request(url, streamed=streamed)
+            if validated is not None:
+                kw['headers'] = dict(kw.get('headers') or {}, **validators)
+
+        body = None
+        if streamed:
+            body = StreamedBody(self.config.STREAMED_BODY_HEAD_SIZE_IN_BYTES, chunk_callback)
+            kw['streaming_callback'] = body.write
+            kw['header_callback'] = body.header
+
+        self.debug('Enqueueing %s for %s...' % (method, url))
+        self.otto.enqueue(url, self.handle_response(url, handler, body, validated), method, **kw)
+
+    def coalesce(self, key, handler):
+        '''Adds handler to the fetch in flight for key, returning None, or
+        returns the handler of a new fetch, which hands its response to
+        every handler added meanwhile.'''
+
+        if key in self.in_flight:
+            self.in_flight[key].append(handler)
+            self.fetch_counters['coalesced_in_process'] += 1
+            return None
+
+        self.in_flight[key] = [handler]
+
+        def fan_out(url, response):
+            handlers = self.in_flight.pop(key, [])
+
+            responses = [response]
+            for waiting in handlers[1:]:
+                # only the first review made the request
+                shared = copy(response)
+                shared.from_cache = True
+                responses.append(shared)
+
+            for waiting, shared in zip(handlers, responses):
+                try:
+                    waiting(url, shared)
+                except Exception:
+                    logging.exception('Error handling response of %s.' % url)
+
+        return fan_out
+
+    def fetch_once(self, url, handler, get_cached, fetch):
+        '''Fetches url with fetch(handler, dispatch_callback=...) unless
+        another worker is already fetching it. Then the response it caches
+        (got with get_cached) is used, or url is fetched here when that
+        worker is done without caching it.'''
+
+        lock_expiration = self.config.REQUEST_TIMEOUT_IN_SECONDS
+        acquired, duplicate = self.cache.acquire_fetch(url, lock_expiration, self.config.DUPLICATE_FETCH_WINDOW_IN_SECONDS)
+
+        # failed responses aren't cached, so waiting for another worker
+        # to fetch them again is useless
+        coalesce = self.config.FETCH_COALESCING_ACROSS_WORKERS and not acquired and not self.cache.has_failed_fetch(url)
+
+        if not coalesce:
+            self.fetch_counters['origin_fetches'] += 1
+            self.fetch_counters['duplicate_fetches'] += int(duplicate)
+
+            def release(url, response):
+                if response.status_code > 399 or response.status_code < 100:
+                    self.cache.set_failed_fetch(url, self.config.REQUEST_CACHE_EXPIRATION_IN_SECONDS)
+                if acquired:
+                    self.cache.release_fetch(url)
+                handler(url, response)
+
+            def extend(url):
+                # the request waited in the queue or on limiter misses, so
+                # the lock covers its timeout from its dispatch on
+                self.cache.extend_fetch(url, lock_expiration)
+
+            if acquired:
+                fetch(release, dispatch_callback=extend)
+            else:
+                fetch(release)
+            return
+
+        def check():
+            response = get_cached()
+            if response is not None:
+                return response
+
+            # done (or gave up) without caching a response
+            return None if self.cache.is_fetching(url) else False
+
+        def handle(response):
+            if response:
+                self.fetch_counters['coalesced_across_workers'] += 1
+                handler(url, response)
+                return
+
+            self.fetch_counters['origin_fetches'] += 1
+            self.fetch_counters['duplicate_fetches'] += 1
+            fetch(handler)
+
+        # the lock is gone once that worker is done, so the timeout only
+        # bounds the wait of a lock extended when its request was dispatched
+        self.otto.poll(check, handle, self.config.FETCH_COALESCING_POLL_INTERVAL_IN_SECONDS, 2 * lock_expiration)
+
+    def handle_response(self, url, handler, body=None, validated=None):
         def handle(url, response):
+            if body is not None:
+                body.close()
+                response.text = body.head
+                response.streamed_body = body
+
+                # curl leaves the headers to header_callback
+                if not response.headers:
+                    response.headers = dict(body.headers)
+
+            if validated is not None and response.status_code == 304:
+                self.debug('%s not modified, using the validated response.' % url)
+                validated.request_time = response.request_time
+                response, stored_body = validated, getattr(validated, 'streamed_body', None)
+            else:
+                stored_body = body
+
             self.cache.set_request(
                 url, response.status_code, response.headers, response.cookies,
                 response.text, response.effective_url, response.error, response.request_time,
-                self.config.REQUEST_CACHE_EXPIRATION_IN_SECONDS
+                self.config.REQUEST_CACHE_EXPIRATION_IN_SECONDS, body=stored_body,
+                validated_expiration=self.get_validated_request_expiration(),
+                validated_max_size=self.config.VALIDATED_REQUEST_MAX_BODY_SIZE_IN_BYTES
             )
             handler(url, response)
         return handle
 
+    def get_validated_request_expiration(self):
+        '''Responses are kept to be revalidated just until the page is
+        reviewed again.'''
+
+        if not self.config.VALIDATED_REQUEST_MAX_BODY_SIZE_IN_BYTES:
+            return None
+
+        return self.config.REVIEW_EXPIRATION_IN_SECONDS + self.config.VALIDATED_REQUEST_CACHE_MARGIN_IN_SECONDS
+
+    def async_get_without_body(self, url, handler, need_size=False, **kw):
+        '''Gets the status, headers and (with need_size) the body size of url
+        with a HEAD request. Origins that refuse HEAD or don't tell the size
+        get a ranged GET for the first byte instead.'''
+
+        response = self.get_cached_without_body(url)
+
+        if response:
+            handler(url, response)
+            return
+
+        handler = self.coalesce(('HEAD', url), handler)
+
+        if handler is not None:
+            self.fetch_once(
+                url, handler,
+                lambda: self.get_cached_without_body(url),
+                lambda handler, **dispatch: self.enqueue_head(url, handler, need_size, **dict(kw, **dispatch))
+            )
+
+    def get_cached_without_body(self, url):
+        url, response = self.cache.get_request(url, streamed=True)
+
+        if not response:
+            url, response = self.cache.get_request(url, head=True)
+
+        return response
+
+    def enqueue_head(self, url, handler, need_size=False, **kw):
+        kw['proxy_host'] = self.config.HTTP_PROXY_HOST
+        kw['proxy_port'] = self.config.HTTP_PROXY_PORT
+
+        self.debug('Enqueueing HEAD for %s...' % url)
+        self.otto.enqueue(url, self.handle_head_response(url, handler, need_size, kw), 'HEAD', **kw)
+
+    def handle_head_response(self, url, handler, need_size, kw):
+        def handle(url, response):
+            size = get_content_length(response.headers)
+
+            refused = response.status_code in HEAD_REFUSED_STATUS_CODES
+            if refused or (need_size and size is None and response.status_code < 300):
+                body = StreamedBody(self.config.STREAMED_BODY_HEAD_SIZE_IN_BYTES)
+
+                ranged_kw = dict(kw)
+                ranged_kw['headers'] = dict(kw.get('headers') or {}, Range='bytes=0-0')
+                ranged_kw['streaming_callback'] = body.write
+                ranged_kw['header_callback'] = body.header
+
+                self.debug('Enqueueing ranged GET for %s...' % url)
+                self.otto.enqueue(url, self.handle_ranged_response(url, handler, body), 'GET', **ranged_kw)
+                return
+
+            self.handle_response_without_body(url, handler, response, size or 0)
+
+        return handle
+
+    def handle_ranged_response(self, url, handler, body):
+        def handle(url, response):
+            body.close()
+
+            # curl leaves the headers to header_callback
+            if not response.headers:
+                response.headers = dict(body.headers)
+
+            if response.status_code == 206:
+                # the resource is fine, only its first byte was requested
+                response.status_code = 200
+                size = get_content_length(response.headers)
+            else:
+                size = None
+
+            self.handle_response_without_body(url, handler, response, body.size if size is None else size)
+
+        return handle
+
+    def handle_response_without_body(self, url, handler, response, size):
+        response.text = ''
+        response.streamed_body = StreamedBody.from_sizes('', size, 0)
+
+        self.cache.set_request(
+            url, response.status_code, response.headers, response.cookies,
+            response.text, response.effective_url, response.error, response.request_time,
+            self.config.REQUEST_CACHE_EXPIRATION_IN_SECONDS, body=response.streamed_body, head=True
+        )
+        handler(url, response)
+
+    def flush_fetch_stats(self):
+        counters, self.fetch_counters = self.fetch_counters, defaultdict(int)
+        self.cache.flush_fetch_stats(counters)
+
     def handle_limiter_miss(self, url):
         pass
 
@@ -114,6 +380,9 @@ class HolmesWorker(BaseWorker):
         self.working_url = None
         self.domain_name = None
         self.last_ping = None
+        self.jobs = deque()
+        self.active_reviews = set()
+        self.filling_reviews = False
 
         authnz_wrapper_class = self.load_authnz_wrapper()
         if authnz_wrapper_class:
@@ -135,6 +404,7 @@ class HolmesWorker(BaseWorker):
 
         self.connect_to_redis()
         self.start_otto()
+        self.start_lease_renewer()
 
         self.fact_definitions = {}
         self.violation_definitions = {}
@@ -174,6 +444,13 @@ class HolmesWorker(BaseWorker):
         for domain in Domain.get_all_domains(self.db):
             self.cache.get_domain_violations_prefs(domain.name)
 
+    def start_lease_renewer(self):
+        # the callback runs whenever octopus runs its loop, which is while
+        # reviews wait on their requests
+        interval = self.config.WORKERS_JOB_LEASE_EXPIRATION_IN_SECONDS * 1000 / 3
+        self.lease_renewer = PeriodicCallback(self._renew_leases, interval, io_loop=self.otto.ioloop)
+        self.lease_renewer.start()
+
     def config_parser(self, parser):
         parser.add_argument(
             '--concurrency',
@@ -188,6 +465,14 @@ class HolmesWorker(BaseWorker):
             help='Whether http requests should be cached by Octopus.'
         )
 
+        parser.add_argument(
+            '--reviews',
+            '-r',
+            type=int,
+            default=1,
+            help='Number of pages to review concurrently using the same Octopus'
+        )
+
     def get_description(self):
         uuid = str(getattr(self, 'uuid', ''))
 
@@ -202,6 +487,11 @@ class HolmesWorker(BaseWorker):
         self.debug('Started doing work...')
 
         self.update_otto_limiter()
+
+        if self.options.reviews > 1:
+            self._do_concurrent_work()
+            return
+
         job = self._load_next_job()
 
         if job is None:
@@ -210,16 +500,13 @@ class HolmesWorker(BaseWorker):
             return
 
         if not self._start_job(job):
-            self.info('Could not start job for url "%s". Maybe other worker doing it?' % job['url'])
-            lock = job.get('lock', None)
-            self._release_lock(lock)
+            self.info('Could not start job for url "%s". Its lease has expired and it went back to the bucket.' % job['url'])
             return
 
         self.info('Starting new job for %s...' % job['url'])
         self._start_reviewer(job=job)
 
-        lock = job.get('lock', None)
-        self._complete_job(lock)
+        self._complete_job(job)
         self.db.commit()
 
     def _start_reviewer(self, job):
@@ -230,27 +517,95 @@ class HolmesWorker(BaseWorker):
                 return
 
             self.debug('Starting Review for [%s]' % job['url'])
-            reviewer = Reviewer(
-                api_url=self.config.HOLMES_API_URL,
-                page_uuid=job['page'],
-                page_url=job['url'],
-                page_score=0,
-                config=self.config,
-                validators=self.validators,
-                facters=self.facters,
-                search_provider=self.search_provider,
-                async_get=self.async_get,
-                wait=self.otto.wait,
-                wait_timeout=0,  # max time to wait for all requests to finish
-                db=self.db,
-                cache=self.cache,
-                publish=self.publish,
-                girl=self.girl,
-                fact_definitions=self.fact_definitions,
-                violation_definitions=self.violation_definitions
+            reviewer = self._create_reviewer(job, wait=self.otto.wait)
+            reviewer.review()
+
+    def _create_reviewer(self, job, wait=None):
+        return Reviewer(
+            api_url=self.config.HOLMES_API_URL,
+            page_uuid=job['page'],
+            page_url=job['url'],
+            page_score=0,
+            config=self.config,
+            validators=self.validators,
+            facters=self.facters,
+            search_provider=self.search_provider,
+            async_get=self.async_get,
+            wait=wait,
+            wait_timeout=0,  # max time to wait for all requests to finish
+            db=self.db,
+            cache=self.cache,
+            publish=self.publish,
+            girl=self.girl,
+            fact_definitions=self.fact_definitions,
+            violation_definitions=self.violation_definitions
+        )
+
+    def _do_concurrent_work(self):
+        self._fill_reviews()
+
+        if not self.active_reviews:
+            self.info('No jobs could be found! Returning...')
+            self._ping_api()
+            return
+
+        while self.active_reviews and (self.otto.running_urls or self.otto.url_queue or self.otto.running_polls):
+            if not self.otto.running_urls:
+                self.otto.get_next_url()
+            self.otto.wait(0)
+
+        if self.active_reviews:
+            self.error(
+                '%d reviews could not be completed. Their jobs will go back to the bucket when their leases expire.' %
+                len(self.active_reviews)
             )
+            self.active_reviews.clear()
+            self.leases.clear()
+            self.working_urls = []
+            self._update_working_url()
+
+    def _fill_reviews(self):
+        # reviews completed while filling are replaced by this same loop
+        if self.filling_reviews:
+            return
 
-            reviewer.review()
+        self.filling_reviews = True
+
+        try:
+            while len(self.active_reviews) < self.options.reviews:
+                job = self._load_next_job()
+
+                if job is None:
+                    return
+
+                if not self._start_job(job):
+                    self.info('Could not start job for url "%s". Its lease has expired and it went back to the bucket.' % job['url'])
+                    continue
+
+                self.info('Starting new job for %s...' % job['url'])
+                self._start_concurrent_reviewer(job)
+        finally:
+            self.filling_reviews = False
+
+    def _start_concurrent_reviewer(self, job):
+        if count_url_levels(job['url']) > self.config.MAX_URL_LEVELS:
+            self.info('Max URL levels! Details: %s' % job['url'])
+            self._complete_job(job)
+            return
+
+        self.debug('Starting Review for [%s]' % job['url'])
+        reviewer = self._create_reviewer(job)
+        self.active_reviews.add(reviewer)
+        reviewer.review_async(self.handle_review_completed(job, reviewer))
+
+    def handle_review_completed(self, job, reviewer):
+        def handle():
+            self.active_reviews.discard(reviewer)
+            self._complete_job(job)
+            self.db.commit()
+            self._fill_reviews()
+
+        return handle
 
     def _ping_api(self):
         self.debug('Pinging that this worker is still alive...')
@@ -262,46 +617,84 @@ class HolmesWorker(BaseWorker):
             'workerId': str(self.uuid),
             'dt': self.last_ping,
             'url': self.working_url,
+            'urls': list(self.working_urls),
             'domainName': self.domain_name,
         }))
 
     def handle_limiter_miss(self, url):
-        self.working_url = url
+        # with several reviews running the url of the miss is ambiguous
+        if len(self.working_urls) <= 1:
+            self.working_url = url
 
         if self.last_ping < datetime.utcnow() - timedelta(seconds=1):
             self._ping_api()
 
     def _load_next_job(self):
-        return self.cache.get_next_job(self.config.REVIEW_EXPIRATION_IN_SECONDS, self.config.WORKERS_LOOK_AHEAD_PAGES)
+        if not self.jobs:
+            self.jobs.extend(self.cache.get_next_jobs(
+                self.config.REVIEW_EXPIRATION_IN_SECONDS,
+                self.config.WORKERS_LOOK_AHEAD_PAGES,
+                self.config.WORKERS_JOB_BATCH_SIZE,
+                self.config.WORKERS_JOB_LEASE_EXPIRATION_IN_SECONDS,
+                self.config.WORKERS_JOB_MAX_ATTEMPTS
+            ))
+
+        if not self.jobs:
+            return None
+
+        return self.jobs.popleft()
 
     def _start_job(self, job):
-        try:
-            lock = Lock(job['url'], redis=self.redis, timeout=1)
-            lock.acquire()
+        lease = job.get('lease', None)
+        if lease is not None:
+            expiration = self.config.WORKERS_JOB_LEASE_EXPIRATION_IN_SECONDS
+            if not self.cache.renew_job_lease(lease, expiration):
+                return False
 
-            self.working_url = job['url']
+            self.leases.add(lease)
 
-            if self.working_url:
-                self.domain_name, domain_url = get_domain_from_url(self.working_url)
+        self.working_urls.append(job['url'])
+        self._update_working_url()
 
-            self._ping_api()
-            job['lock'] = lock
+        self._ping_api()
 
-            return True
-        except LockTimeout:
-            job['lock'] = None
-            return False
+        return True
+
+    def _complete_job(self, job):
+        if job['url'] in self.working_urls:
+            self.working_urls.remove(job['url'])
+        self._update_working_url()
 
-    def _complete_job(self, lock):
-        self.working_url = None
-        self.domain_name = None
         self._ping_api()
-        self._release_lock(lock)
+        self._release_lease(job)
         Request.delete_old_requests(self.db, self.config)
-
-    def _release_lock(self, lock):
-        if lock is not None:
-            lock.release()
+        self.cache.flush_request_cache_stats()
+        self.cache.flush_transport_stats(self.otto.host_stats.pop())
+        self.flush_fetch_stats()
+
+    def _update_working_url(self):
+        # a single url is reported only while a single review runs, all
+        # of them go in the urls of the ping
+        if len(self.working_urls) == 1 and self.working_urls[0]:
+            self.working_url = self.working_urls[0]
+            self.domain_name, domain_url = get_domain_from_url(self.working_url)
+        else:
+            self.working_url = None
+            self.domain_name = None
+
+    def _release_lease(self, job):
+        lease = job.get('lease', None)
+        if lease is not None:
+            self.leases.discard(lease)
+            self.cache.release_job_lease(lease)
+
+    def _renew_leases(self):
+        expiration = self.config.WORKERS_JOB_LEASE_EXPIRATION_IN_SECONDS
+
+        for lease in list(self.leases):
+            if not self.cache.renew_job_lease(lease, expiration):
+                self.warn('Lease %s expired while its job was running. Another worker may review it too.' % lease)
+                self.leases.discard(lease)
 
 
 def main():
@@ -78,6 +78,8 @@ Holmes is a service to investigate your website health.
             'holmes-worker=holmes.worker:main',
             'holmes-material=holmes.material:main',
             'holmes-search=holmes.search:main',
+            'holmes-indexer=holmes.indexer:main',
+            'holmes-recode=holmes.recode:main',
         ],
     },
 )
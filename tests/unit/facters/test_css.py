@@ -80,7 +80,8 @@ class TestCSSFacter(FacterTestCase):
 
         facter.async_get.assert_called_once_with(
             'http://my-site.com/a.css',
-            facter.handle_url_loaded
+            facter.handle_url_loaded,
+            streamed=True
         )
 
     def test_handle_url_loaded(self):
@@ -55,7 +55,7 @@ class TestImageFacter(FacterTestCase):
         expect(img.get('src')).to_equal('test.png')
 
         expect(facter.review.data).to_include('page.images')
-        expect(facter.review.data['page.images']).to_equal(set([]))
+        expect(facter.review.data['page.images']).to_equal({})
 
         expect(facter.review.data).to_include('total.size.img')
         expect(facter.review.data['total.size.img']).to_equal(0)
@@ -80,7 +80,8 @@ class TestImageFacter(FacterTestCase):
 
         facter.async_get.assert_called_once_with(
             'http://my-site.com/test.png',
-            facter.handle_url_loaded
+            facter.handle_url_loaded,
+            streamed=True
         )
 
     def test_handle_url_loaded(self):
@@ -122,7 +123,7 @@ class TestImageFacter(FacterTestCase):
         expect(img_src).to_equal('test.png')
 
         expect(facter.review.data).to_include('page.images')
-        data = set([(page.url, response)])
+        data = {facter.review.urls.get_id(page.url): response}
         expect(facter.review.data['page.images']).to_equal(data)
 
         expect(facter.review.data).to_include('total.size.img')
@@ -49,7 +49,7 @@ class TestLinksFacter(FacterTestCase):
         expect(facter.review.data).to_length(2)
 
         expect(facter.review.data).to_include('page.links')
-        expect(facter.review.data['page.links']).to_equal(set([]))
+        expect(facter.review.data['page.links']).to_equal({})
 
         expect(facter.review.data).to_include('page.all_links')
         link = facter.review.data['page.all_links'][1]
@@ -116,7 +116,7 @@ class TestLinksFacter(FacterTestCase):
         facter.handle_url_loaded(page.url, response)
 
         expect(facter.review.data).to_include('page.links')
-        data = set([(page.url, response)])
+        data = {facter.review.urls.get_id(page.url): response}
         expect(facter.review.data['page.links']).to_equal(data)
 
     def test_can_get_fact_definitions(self):
@@ -382,3 +382,13 @@ class TestLinksFacter(FacterTestCase):
                 key='page.invalid_links',
                 value=set([])
             )])
+
+    def test_gets_links_without_their_bodies(self):
+        reviewer = Mock()
+        facter = LinkFacter(reviewer)
+
+        facter.async_get('http://g.com/', facter.handle_url_loaded)
+
+        reviewer._async_get.assert_called_once_with(
+            'http://g.com/', facter.handle_url_loaded, 'GET', owner=facter, skip_body=True, need_size=False
+        )
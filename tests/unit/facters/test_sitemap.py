@@ -1,12 +1,15 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from mock import Mock, call
+from array import array
+
+from mock import Mock, ANY, call
 from preggy import expect
 
 from holmes.config import Config
 from holmes.reviewer import Reviewer
-from holmes.facters.sitemap import SitemapFacter
+from holmes.facters.sitemap import SitemapFacter, SitemapStream
+from holmes.validators.sitemap import SitemapValidator
 from tests.unit.base import FacterTestCase
 from tests.fixtures import PageFactory
 
@@ -60,7 +63,7 @@ class TestSitemapFacter(FacterTestCase):
         expect(facter.review.data['sitemap.urls']).to_equal({})
 
         expect(facter.review.data).to_include('sitemap.files')
-        expect(facter.review.data['sitemap.files']).to_equal(set())
+        expect(facter.review.data['sitemap.files']).to_equal(array('I'))
 
         expect(facter.review.data).to_include('sitemap.files.size')
         expect(facter.review.data['sitemap.files.size']).to_equal({})
@@ -180,17 +183,17 @@ class TestSitemapFacter(FacterTestCase):
         facter.handle_sitemap_loaded("http://g1.globo.com/sitemap.xml", response)
 
         expect(facter.review.data['sitemap.files.size']["http://g1.globo.com/sitemap.xml"]).to_equal(0.2607421875)
-        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(set())
+        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(array('I'))
         expect(facter.review.facts['total.size.sitemap']['value']).to_equal(0.2607421875)
         expect(facter.review.facts['total.size.sitemap.gzipped']['value']).to_equal(0.146484375)
         expect(facter.review.data['total.size.sitemap']).to_equal(0.2607421875)
         expect(facter.review.data['total.size.sitemap.gzipped']).to_equal(0.146484375)
         expect(facter.review.data['sitemap.files.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(2)
         expect(facter.async_get.call_args_list).to_include(
-            call('http://domain.com/1.xml', facter.handle_sitemap_loaded),
+            call('http://domain.com/1.xml', facter.handle_sitemap_loaded, streamed=True, chunk_callback=ANY),
         )
         expect(facter.async_get.call_args_list).to_include(
-            call('http://domain.com/2.xml', facter.handle_sitemap_loaded),
+            call('http://domain.com/2.xml', facter.handle_sitemap_loaded, streamed=True, chunk_callback=ANY),
         )
 
     def test_handle_sitemap_url_loaded(self):
@@ -202,7 +205,7 @@ class TestSitemapFacter(FacterTestCase):
             page_url=page.url,
             page_score=0.0,
             config=Config(),
-            validators=[]
+            validators=[SitemapValidator]
         )
         reviewer.enqueue = Mock()
 
@@ -217,7 +220,8 @@ class TestSitemapFacter(FacterTestCase):
         facter.handle_sitemap_loaded("http://g1.globo.com/sitemap.xml", response)
 
         expect(facter.review.data['sitemap.files.size']["http://g1.globo.com/sitemap.xml"]).to_equal(0.296875)
-        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(set(['http://domain.com/1.html', 'http://domain.com/2.html']))
+        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(array('I', [0, 1]))
+        expect(facter.review.urls.get_urls([0, 1])).to_equal({0: 'http://domain.com/1.html', 1: 'http://domain.com/2.html'})
         expect(facter.review.facts['total.size.sitemap']['value']).to_equal(0.296875)
         expect(facter.review.facts['total.size.sitemap.gzipped']['value']).to_equal(0.1494140625)
         expect(facter.review.data['total.size.sitemap']).to_equal(0.296875)
@@ -225,6 +229,74 @@ class TestSitemapFacter(FacterTestCase):
         expect(facter.review.data['sitemap.files.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(2)
         expect(facter.review.facts['total.sitemap.urls']['value']).to_equal(2)
 
+    def test_handle_sitemap_url_loaded_only_counts_urls_nobody_needs(self):
+        page = PageFactory.create(url="http://g1.globo.com/")
+
+        reviewer = Reviewer(
+            api_url='http://localhost:2368',
+            page_uuid=page.uuid,
+            page_url=page.url,
+            page_score=0.0,
+            config=Config(),
+            validators=[]
+        )
+
+        content = self.get_file('url_sitemap.xml')
+        response = Mock(status_code=200, text=content)
+
+        facter = SitemapFacter(reviewer)
+        facter.async_get = Mock()
+
+        facter.get_facts()
+
+        facter.handle_sitemap_loaded("http://g1.globo.com/sitemap.xml", response)
+
+        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(array('I'))
+        expect(facter.review.data['sitemap.files.urls']["http://g1.globo.com/sitemap.xml"]).to_equal(2)
+        expect(facter.review.facts['total.sitemap.urls']['value']).to_equal(2)
+
+    def test_does_not_follow_sitemaps_nested_too_deep(self):
+        page = PageFactory.create(url="http://g1.globo.com/")
+
+        config = Config()
+        config.MAX_SITEMAP_DEPTH = 1
+
+        reviewer = Reviewer(
+            api_url='http://localhost:2368',
+            page_uuid=page.uuid,
+            page_url=page.url,
+            page_score=0.0,
+            config=config,
+            validators=[]
+        )
+
+        content = self.get_file('index_sitemap.xml')
+
+        facter = SitemapFacter(reviewer)
+        facter.async_get = Mock()
+
+        facter.get_facts()
+        facter.sitemap_depths['http://g1.globo.com/sitemap.xml'] = 1
+        facter.async_get = Mock()
+
+        facter.handle_sitemap_loaded("http://g1.globo.com/sitemap.xml", Mock(status_code=200, text=content))
+
+        expect(facter.async_get.call_count).to_equal(0)
+        expect(facter.review.data['sitemap.files']).to_equal(set(['http://domain.com/1.xml', 'http://domain.com/2.xml']))
+
+    def test_sitemap_stream_parses_chunks(self):
+        content = self.get_file('index_sitemap.xml.gz')
+
+        stream = SitemapStream()
+        for index in range(0, len(content), 7):
+            stream.feed(content[index:index + 7])
+        stream.close()
+
+        expect(stream.gzipped).to_be_true()
+        expect(stream.size).to_equal(len(self.get_file('index_sitemap.xml')))
+        expect(stream.sitemaps).to_equal(['http://domain.com/1.xml', 'http://domain.com/2.xml'])
+        expect(stream.urls_count).to_equal(0)
+
     def test_handle_robots_loaded(self):
         page = PageFactory.create(url="http://g1.globo.com/")
 
@@ -244,7 +316,9 @@ class TestSitemapFacter(FacterTestCase):
 
         facter.async_get.assert_called_once_with(
             'http://g1.globo.com/sitemap.xml',
-            facter.handle_sitemap_loaded
+            facter.handle_sitemap_loaded,
+            streamed=True,
+            chunk_callback=ANY
         )
 
     def test_gzipeed_sitemap(self):
@@ -271,17 +345,17 @@ class TestSitemapFacter(FacterTestCase):
         facter.handle_sitemap_loaded("http://g1.globo.com/sitemap.xml.gz", response)
 
         expect(facter.review.data['sitemap.files.size']["http://g1.globo.com/sitemap.xml.gz"]).to_equal(0.2607421875)
-        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml.gz"]).to_equal(set())
+        expect(facter.review.data['sitemap.urls']["http://g1.globo.com/sitemap.xml.gz"]).to_equal(array('I'))
         expect(facter.review.facts['total.size.sitemap']['value']).to_equal(0.2607421875)
-        expect(facter.review.facts['total.size.sitemap.gzipped']['value']).to_equal(0.146484375)
+        expect(facter.review.facts['total.size.sitemap.gzipped']['value']).to_equal(0.17578125)
         expect(facter.review.data['total.size.sitemap']).to_equal(0.2607421875)
-        expect(facter.review.data['total.size.sitemap.gzipped']).to_equal(0.146484375)
+        expect(facter.review.data['total.size.sitemap.gzipped']).to_equal(0.17578125)
         expect(facter.review.data['sitemap.files.urls']["http://g1.globo.com/sitemap.xml.gz"]).to_equal(2)
         expect(facter.async_get.call_args_list).to_include(
-            call('http://domain.com/1.xml', facter.handle_sitemap_loaded),
+            call('http://domain.com/1.xml', facter.handle_sitemap_loaded, streamed=True, chunk_callback=ANY),
         )
         expect(facter.async_get.call_args_list).to_include(
-            call('http://domain.com/2.xml', facter.handle_sitemap_loaded),
+            call('http://domain.com/2.xml', facter.handle_sitemap_loaded, streamed=True, chunk_callback=ANY),
         )
 
     def test_can_get_fact_definitions(self):
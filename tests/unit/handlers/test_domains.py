@@ -11,6 +11,7 @@ from tornado.httpclient import HTTPError
 from mock import Mock
 
 from holmes.models import Domain, Key
+from holmes.utils import encode_cursor
 from tests.unit.base import ApiTestCase
 from tests.fixtures import DomainFactory, PageFactory, ReviewFactory, RequestFactory
 
@@ -265,6 +266,61 @@ class TestDomainReviewsHandler(ApiTestCase):
         expect(domain_details['pages'][0]['uuid']).to_equal(str(page.uuid))
         expect(domain_details['pages'][0]['completedAt']).to_equal(dt_timestamp)
 
+    @gen_test
+    def test_can_get_domain_reviews_after_cursor_using_no_external_search_provider(self):
+        self.use_no_external_search_provider()
+
+        dt = datetime(2010, 11, 12, 13, 14, 15)
+
+        domain = DomainFactory.create(url="http://www.domain-details.com", name="domain-details.com")
+
+        pages = [
+            PageFactory.create(domain=domain, last_review_date=dt, violations_count=count)
+            for count in (30, 20, 10)
+        ]
+
+        response = yield self.authenticated_fetch('/domains/%s/reviews/?page_size=2' % domain.name)
+
+        expect(response.code).to_equal(200)
+
+        domain_details = loads(response.body)
+
+        expect([page['url'] for page in domain_details['pages']]).to_equal([pages[0].url, pages[1].url])
+        expect(domain_details['nextCursor']).not_to_be_null()
+
+        response = yield self.authenticated_fetch(
+            '/domains/%s/reviews/?page_size=2&cursor=%s' % (domain.name, domain_details['nextCursor'])
+        )
+
+        expect(response.code).to_equal(200)
+
+        domain_details = loads(response.body)
+
+        expect([page['url'] for page in domain_details['pages']]).to_equal([pages[2].url])
+        expect(domain_details['nextCursor']).to_be_null()
+
+        try:
+            yield self.authenticated_fetch('/domains/%s/reviews/?cursor=invalid' % domain.name)
+        except HTTPError:
+            err = sys.exc_info()[1]
+            expect(err).not_to_be_null()
+            expect(err.code).to_equal(400)
+            expect(err.response.reason).to_equal('Invalid cursor')
+        else:
+            assert False, 'Should not have got this far'
+
+        try:
+            yield self.authenticated_fetch(
+                '/domains/%s/reviews/?cursor=%s' % (domain.name, encode_cursor(['30', {'id': 1}]))
+            )
+        except HTTPError:
+            err = sys.exc_info()[1]
+            expect(err).not_to_be_null()
+            expect(err.code).to_equal(400)
+            expect(err.response.reason).to_equal('Invalid cursor')
+        else:
+            assert False, 'Should not have got this far'
+
     @gen_test
     def test_can_get_domain_reviews_using_elastic_search_provider(self):
         self.use_elastic_search_provider()
@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+from ujson import loads, dumps
+
+from preggy import expect
+from tornado.testing import gen_test
+
+from holmes.material import MATERIAL_STATS_KEY
+from tests.unit.base import ApiTestCase
+
+
+class TestMaterialsStatusHandler(ApiTestCase):
+
+    @gen_test
+    def test_can_get_materials_status(self):
+        girl = self.server.application.girl
+        girl.storage.redis.delete(MATERIAL_STATS_KEY)
+        girl.storage.redis.hset(MATERIAL_STATS_KEY, 'domains_details', dumps({
+            'refreshedAt': time.time() - 5,
+            'durationInSeconds': 1.5
+        }))
+
+        response = yield self.authenticated_fetch('/materials/status')
+
+        expect(response.code).to_equal(200)
+
+        status = dict((item['key'], item) for item in loads(response.body))
+
+        expect(status).to_length(len(girl.materials))
+        expect(status['domains_details']['refreshDurationInSeconds']).to_equal(1.5)
+        expect(status['domains_details']['stalenessInSeconds']).to_be_greater_than(4)
+        expect(status['domains_details']['isStale']).to_be_false()
+        expect(status['most_common_violations']['refreshedAt']).to_be_null()
+
+        girl.storage.redis.delete(MATERIAL_STATS_KEY)
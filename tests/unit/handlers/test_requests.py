@@ -1,6 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import time
 import calendar
 from datetime import datetime, timedelta
 from preggy import expect
@@ -8,6 +9,7 @@ from ujson import loads
 from tests.unit.base import ApiTestCase
 from tests.fixtures import RequestFactory, DomainFactory
 from tornado.testing import gen_test
+from tornado.gen import Task
 
 from holmes.models import Request
 
@@ -192,3 +194,59 @@ class TestLastRequestsStatusCodeHandler(ApiTestCase):
                 u'statusCode': 500
             }
         ])
+
+
+class TestRequestCacheStatsHandler(ApiTestCase):
+
+    @gen_test
+    def test_can_get_request_cache_stats(self):
+        redis = self.server.application.redis
+        yield Task(redis.delete, 'request-cache-stats')
+        yield Task(redis.hincrby, 'request-cache-stats', 'lru_hits', 3)
+        yield Task(redis.hincrby, 'request-cache-stats', 'misses', 1)
+
+        response = yield self.authenticated_fetch('/requests/cache-stats/')
+
+        expect(response.code).to_equal(200)
+
+        obj = loads(response.body)
+        expect(obj['lruHits']).to_equal(3)
+        expect(obj['hitRate']).to_equal(0.75)
+        expect(obj['redisUsedMemoryInBytes']).to_be_greater_than(0)
+
+
+class TestTransportStatsHandler(ApiTestCase):
+
+    @gen_test
+    def test_can_get_transport_stats(self):
+        redis = self.server.application.redis
+        yield Task(redis.delete, 'transport-stats')
+        yield Task(redis.hincrbyfloat, 'transport-stats', 'globo.com:requests', 2)
+        yield Task(redis.hincrbyfloat, 'transport-stats', 'globo.com:reused_connections', 1)
+
+        response = yield self.authenticated_fetch('/requests/transport-stats/')
+
+        expect(response.code).to_equal(200)
+
+        obj = loads(response.body)
+        expect(obj).to_length(1)
+        expect(obj[0]['host']).to_equal('globo.com')
+        expect(obj[0]['reuseRate']).to_equal(0.5)
+
+
+class TestFetchStatsHandler(ApiTestCase):
+
+    @gen_test
+    def test_can_get_fetch_stats(self):
+        redis = self.server.application.redis
+        key = 'fetch-stats-%d' % (int(time.time()) // 60 * 60)
+        yield Task(redis.delete, key)
+        yield Task(redis.hincrby, key, 'duplicate_fetches', 2)
+
+        response = yield self.authenticated_fetch('/requests/fetch-stats/')
+
+        expect(response.code).to_equal(200)
+
+        obj = loads(response.body)
+        expect(obj).to_length(60)
+        expect(obj[0]['duplicateFetches']).to_equal(2)
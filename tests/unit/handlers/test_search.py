@@ -1,11 +1,13 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import time
 from datetime import datetime
 from ujson import loads
 
 from preggy import expect
 from tornado.testing import gen_test
+from tornado.gen import Task
 
 from tests.unit.base import ApiTestCase
 from tests.fixtures import PageFactory, ReviewFactory
@@ -43,3 +45,20 @@ class TestSearchHandler(ApiTestCase):
             u'uuid': str(page.uuid),
             u'domain': 'mypage.something.com'
         })
+
+
+class TestIndexingStatusHandler(ApiTestCase):
+
+    @gen_test
+    def test_can_get_indexing_status(self):
+        redis = self.server.application.redis
+        yield Task(redis.zadd, 'indexing-queue', {'1': time.time() - 10})
+
+        response = yield self.authenticated_fetch('/search/indexing-status')
+
+        expect(response.code).to_equal(200)
+
+        obj = loads(response.body)
+
+        expect(obj['queueSize']).to_equal(1)
+        expect(obj['lagInSeconds']).to_be_greater_than(9)
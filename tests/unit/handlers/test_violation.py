@@ -107,7 +107,7 @@ class TestViolationHandler(ApiTestCase):
         response = yield self.authenticated_fetch('/violation/key.1')
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(4)
         expect(violations['reviewsCount']).to_equal(4)
@@ -120,7 +120,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(2)
         expect(violations['reviewsCount']).to_equal(4)
@@ -130,7 +130,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(4)
         expect(violations['reviewsCount']).to_be_null()
@@ -140,7 +140,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(2)
         expect(violations['reviewsCount']).to_be_null()
@@ -150,7 +150,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(1)
         expect(violations['reviewsCount']).to_be_null()
@@ -222,7 +222,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(5)
         expect(violations['reviewsCount']).to_equal(5)
@@ -235,7 +235,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(2)
         expect(violations['reviewsCount']).to_equal(5)
@@ -245,7 +245,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(5)
         expect(violations['reviewsCount']).to_equal(5)
@@ -255,7 +255,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(2)
         expect(violations['reviewsCount']).to_equal(2)
@@ -265,7 +265,7 @@ class TestViolationHandler(ApiTestCase):
         )
         violations = loads(response.body)
         expect(response.code).to_equal(200)
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations['title']).to_equal('title.1')
         expect(violations['reviews']).to_length(1)
         expect(violations['reviewsCount']).to_equal(1)
@@ -423,5 +423,5 @@ class TestViolationsHandler(ApiTestCase):
 
         violations = loads(response.body)
 
-        expect(violations).to_length(3)
+        expect(violations).to_length(4)
         expect(violations).to_be_like(expected)
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from gzip import GzipFile
+from cStringIO import StringIO
+from unittest import TestCase
+
+from preggy import expect
+from ujson import dumps
+
+from holmes.models.codec import ColumnCodec
+
+
+def gzipped(value):
+    out = StringIO()
+    with GzipFile(fileobj=out, mode='w') as f:
+        f.write(dumps(value))
+    return out.getvalue()
+
+
+class TestColumnCodec(TestCase):
+
+    def test_can_encode_small_values_as_json(self):
+        data = ColumnCodec.encode({'a': 1}, serializer='json', compression_threshold=512)
+
+        expect(data).to_equal('j{"a":1}')
+        expect(ColumnCodec.decode(data)).to_equal({'a': 1})
+
+    def test_compresses_values_over_the_threshold(self):
+        value = {'url': 'http://globo.com/' * 100}
+
+        data = ColumnCodec.encode(value, serializer='json', compression_threshold=512)
+
+        expect(data[0]).to_equal('J')
+        expect(len(data)).to_be_lesser_than(len(dumps(value)))
+        expect(ColumnCodec.decode(data)).to_equal(value)
+
+    def test_can_encode_as_msgpack(self):
+        value = {'links': set(['http://globo.com/']), 'title': u'Globo é'}
+
+        data = ColumnCodec.encode(value, serializer='msgpack', compression_threshold=512)
+
+        expect(data[0]).to_equal('m')
+        expect(ColumnCodec.decode(data)).to_equal({'links': ['http://globo.com/'], 'title': u'Globo é'})
+
+        data = ColumnCodec.encode(['x' * 1000], serializer='msgpack', compression_threshold=512)
+
+        expect(data[0]).to_equal('M')
+        expect(ColumnCodec.decode(data)).to_equal(['x' * 1000])
+
+    def test_can_decode_legacy_gzipped_values(self):
+        data = gzipped({'a': [1, 2]})
+
+        expect(ColumnCodec.is_legacy(data)).to_be_true()
+        expect(ColumnCodec.is_legacy(ColumnCodec.encode({'a': [1, 2]}))).to_be_false()
+        expect(ColumnCodec.decode(data)).to_equal({'a': [1, 2]})
+
+    def test_decode_empty_value(self):
+        expect(ColumnCodec.decode(None)).to_equal('')
+        expect(ColumnCodec.is_legacy(None)).to_be_false()
+
+    def test_decode_unknown_header(self):
+        self.assertRaises(ValueError, ColumnCodec.decode, 'x{}')
@@ -6,7 +6,7 @@ from datetime import datetime
 from preggy import expect
 from tornado.testing import gen_test
 
-from holmes.models import Domain, Request
+from holmes.models import Domain, DomainStats, Request
 from tests.unit.base import ApiTestCase
 from tests.fixtures import DomainFactory, PageFactory, ReviewFactory, RequestFactory
 
@@ -159,6 +159,26 @@ class TestDomain(ApiTestCase):
 
         expect(reviews[0].last_review_uuid).to_equal(str(review.uuid))
 
+    def test_can_get_reviews_for_domain_after_cursor(self):
+        dt = datetime(2013, 10, 10, 10, 10, 10)
+
+        domain = DomainFactory.create()
+
+        pages = [
+            PageFactory.create(domain=domain, last_review_date=dt, violations_count=count)
+            for count in (30, 20, 20, 10)
+        ]
+
+        reviews = domain.get_active_reviews(self.db, page_size=2)
+
+        expect([item.id for item in reviews]).to_equal([pages[0].id, pages[2].id])
+
+        reviews = domain.get_active_reviews(
+            self.db, page_size=2, cursor=[reviews[-1].violations_count, reviews[-1].id]
+        )
+
+        expect([item.id for item in reviews]).to_equal([pages[1].id, pages[3].id])
+
     def test_invalid_domain_returns_None(self):
         domain_name = 'domain-details.com'
         domain = Domain.get_domain_by_name(domain_name, self.db)
@@ -273,6 +293,8 @@ class TestDomain(ApiTestCase):
         RequestFactory.create(status_code=403, domain_name=domain.name, response_time=0.35)
         RequestFactory.create(status_code=404, domain_name=domain.name, response_time=0.25)
 
+        DomainStats.reconcile(self.db)
+
         details = Domain.get_domains_details(self.db)
 
         expect(details).to_length(3)
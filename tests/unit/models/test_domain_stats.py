@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from preggy import expect
+
+from holmes.models import DomainStats
+from tests.unit.base import ApiTestCase
+from tests.fixtures import DomainFactory, PageFactory, ReviewFactory, RequestFactory
+
+
+class TestDomainStats(ApiTestCase):
+
+    def test_can_increment(self):
+        domain = DomainFactory.create()
+
+        DomainStats.increment(self.db, domain.id, page_count=2, violation_count=10)
+        DomainStats.increment(self.db, domain.id, page_count=1, violation_count=-3, review_count=0)
+
+        stats = self.db.query(DomainStats).get(domain.id)
+
+        expect(stats.page_count).to_equal(3)
+        expect(stats.violation_count).to_equal(7)
+        expect(stats.review_count).to_equal(0)
+
+    def test_increment_unknown_counter(self):
+        domain = DomainFactory.create()
+
+        self.assertRaises(ValueError, DomainStats.increment, self.db, domain.id, url=1)
+
+    def test_can_reconcile(self):
+        domain = DomainFactory.create()
+        other_domain = DomainFactory.create()
+
+        page = PageFactory.create(domain=domain)
+        PageFactory.create(domain=domain)
+
+        ReviewFactory.create(domain=domain, page=page, is_active=True, number_of_violations=5)
+
+        RequestFactory.create(status_code=200, domain_name=domain.name, response_time=0.25)
+        RequestFactory.create(status_code=404, domain_name=domain.name, response_time=0.5)
+
+        DomainStats.increment(self.db, domain.id, page_count=10, violation_count=-1)
+
+        DomainStats.reconcile(self.db)
+
+        expect(self.db.query(DomainStats).get(domain.id).to_dict()).to_equal({
+            'domain_id': domain.id,
+            'page_count': 2,
+            'review_count': 1,
+            'violation_count': 5,
+            'good_request_count': 1,
+            'bad_request_count': 1,
+            'response_time_sum': 0.25,
+        })
+
+        expect(self.db.query(DomainStats).get(other_domain.id).page_count).to_equal(0)
+
+    def test_reconcile_domain_keeps_the_row_of_the_domain(self):
+        domain = DomainFactory.create()
+        PageFactory.create(domain=domain)
+
+        DomainStats.reconcile_domain(self.db, domain.id, domain.name)
+        DomainStats.reconcile_domain(self.db, domain.id, domain.name)
+        DomainStats.increment(self.db, domain.id, page_count=1)
+
+        expect(self.db.query(DomainStats).filter(DomainStats.domain_id == domain.id).count()).to_equal(1)
+        expect(self.db.query(DomainStats).get(domain.id).page_count).to_equal(2)
+
+    def test_can_decrement_requests(self):
+        domain = DomainFactory.create()
+
+        requests = [
+            RequestFactory.create(status_code=200, domain_name=domain.name, response_time=0.25),
+            RequestFactory.create(status_code=500, domain_name=domain.name, response_time=0.5),
+        ]
+
+        DomainStats.reconcile(self.db)
+        DomainStats.decrement_requests(self.db, [requests[1].id])
+
+        stats = self.db.query(DomainStats).get(domain.id)
+
+        expect(stats.good_request_count).to_equal(1)
+        expect(stats.bad_request_count).to_equal(0)
+        expect(stats.response_time_sum).to_be_like(0.25)
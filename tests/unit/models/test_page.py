@@ -4,12 +4,13 @@
 from uuid import uuid4
 from datetime import datetime
 
+from mock import Mock, patch
 from preggy import expect
 
 from holmes.config import Config
-from holmes.models import Page
+from holmes.models import Page, DomainStats
 from tests.unit.base import ApiTestCase
-from tests.fixtures import PageFactory, ReviewFactory
+from tests.fixtures import DomainFactory, PageFactory, ReviewFactory
 
 
 class TestPage(ApiTestCase):
@@ -85,3 +86,27 @@ class TestPage(ApiTestCase):
 
         invalid_page = Page.by_uuid('123', self.db)
         expect(invalid_page).to_be_null()
+
+    def test_insert_or_update_page_counts_a_page_inserted_twice_once(self):
+        domain = DomainFactory.create()
+        url = 'http://%s/same-score' % domain.name
+
+        # both calls race past the existence check
+        with patch.object(Page, 'by_url_hash', return_value=None):
+            first_uuid = Page.insert_or_update_page(url, 1, domain, self.db, Mock(), Mock(), Config())
+            second_uuid = Page.insert_or_update_page(url, 1, domain, self.db, Mock(), Mock(), Config())
+
+        expect(str(second_uuid)).to_equal(str(first_uuid))
+        expect(self.db.query(Page).filter(Page.domain_id == domain.id).count()).to_equal(1)
+        expect(self.db.query(DomainStats).get(domain.id).page_count).to_equal(1)
+
+    def test_insert_or_update_page_updates_the_score_of_a_page_inserted_meanwhile(self):
+        domain = DomainFactory.create()
+        url = 'http://%s/new-score' % domain.name
+
+        with patch.object(Page, 'by_url_hash', return_value=None):
+            Page.insert_or_update_page(url, 1, domain, self.db, Mock(), Mock(), Config())
+            Page.insert_or_update_page(url, 2, domain, self.db, Mock(), Mock(), Config())
+
+        expect(self.db.query(Page.score).filter(Page.domain_id == domain.id).scalar()).to_equal(2)
+        expect(self.db.query(DomainStats).get(domain.id).page_count).to_equal(1)
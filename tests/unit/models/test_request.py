@@ -9,7 +9,7 @@ from ujson import dumps
 
 from tests.unit.base import ApiTestCase
 from tests.fixtures import RequestFactory, DomainFactory, PageFactory
-from holmes.models import Request
+from holmes.models import Request, DomainStats
 from holmes.config import Config
 
 
@@ -230,3 +230,8 @@ class TestRequest(ApiTestCase):
             dumps({'url': url, 'type': 'new-request'})
         )
 
+        stats = self.db.query(DomainStats).get(domain.id)
+        expect(stats.good_request_count).to_equal(3)
+        expect(stats.bad_request_count).to_equal(0)
+        expect(stats.response_time_sum).to_be_like(0.3)
+
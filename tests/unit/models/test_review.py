@@ -5,11 +5,12 @@ import sys
 from uuid import uuid4
 from datetime import datetime
 
+from mock import Mock
 from preggy import expect
 #from tornado.testing import gen_test
 
 from holmes.config import Config
-from holmes.models import Review, Violation, Key, Page, Fact
+from holmes.models import Review, Violation, ViolationCount, Key, Page, Fact
 from holmes.utils import _
 from tests.unit.base import ApiTestCase
 from tests.fixtures import (
@@ -235,6 +236,32 @@ class TestReview(ApiTestCase):
         reviews = Review.get_by_violation_key_name(self.db, key_id)
         expect(reviews).to_length(1)
 
+    def test_get_by_violation_key_name_after_cursor(self):
+        self.db.query(Review).delete()
+        self.db.query(Violation).delete()
+
+        dt = datetime(2014, 4, 15, 11, 44)
+        key = Key.get_or_create(self.db, 'violation.cursor')
+
+        reviews = []
+        for i in range(3):
+            review = ReviewFactory.create(is_active=True, completed_date=dt)
+            review.add_violation(key, 'value', 100, review.domain)
+            review.page.last_review_id = review.id
+            review.page.last_review_uuid = review.uuid
+            review.page.last_review_date = review.completed_date
+            reviews.append(review)
+
+        self.db.flush()
+
+        items = Review.get_by_violation_key_name(self.db, key.id, page_size=2)
+        expect([item.page_id for item in items]).to_equal([reviews[2].page_id, reviews[1].page_id])
+
+        items = Review.get_by_violation_key_name(
+            self.db, key.id, page_size=2, cursor=[items[-1].completed_date, items[-1].page_id]
+        )
+        expect([item.page_id for item in items]).to_equal([reviews[0].page_id])
+
     def test_remove_old_reviews(self):
         self.db.query(Violation).delete()
         self.db.query(Fact).delete()
@@ -286,3 +313,72 @@ class TestReview(ApiTestCase):
         expect(violations).to_length(9)
         facts = self.db.query(Fact).all()
         expect(facts).to_length(5)
+
+    def test_save_review(self):
+        config = Config()
+        config.NUMBER_OF_REVIEWS_TO_KEEP = 4
+
+        page = PageFactory.create()
+        fact_key = KeyFactory.create(name='some.fact')
+        violation_key = KeyFactory.create(name='some.violation')
+
+        fact_definitions = {'some.fact': {'key': fact_key}}
+        violation_definitions = {'some.violation': {'key': violation_key}}
+
+        review_data = {
+            'requests': [],
+            'facts': [{'key': 'some.fact', 'value': {'a': 1}}],
+            'violations': [
+                {'key': 'some.violation', 'value': 'b', 'points': '10.5'},
+                {'key': 'some.violation', 'value': 'c', 'points': 20}
+            ],
+            'expires': None,
+            'lastModified': None
+        }
+
+        search_provider = Mock()
+        cache = Mock()
+        publish = Mock()
+
+        Review.save_review(
+            page.uuid, review_data, self.db, search_provider, fact_definitions,
+            violation_definitions, cache, publish, config
+        )
+        first_review = search_provider.index_review.call_args[0][0]
+
+        Review.save_review(
+            page.uuid, review_data, self.db, search_provider, fact_definitions,
+            violation_definitions, cache, publish, config
+        )
+        second_review = search_provider.index_review.call_args[0][0]
+
+        expect(cache.increment_active_review_count.call_count).to_equal(1)
+
+        self.db.expire_all()
+
+        loaded_page = self.db.query(Page).get(page.id)
+        expect(loaded_page.last_review_id).to_equal(second_review.id)
+        expect(loaded_page.violations_count).to_equal(2)
+
+        loaded = self.db.query(Review).get(second_review.id)
+        expect(loaded.is_active).to_be_true()
+        expect(loaded.is_complete).to_be_true()
+        expect(loaded.facts).to_length(1)
+        expect(loaded.facts[0].value).to_equal({'a': 1})
+        expect(sorted(violation.points for violation in loaded.violations)).to_equal([10, 20])
+
+        old_review = self.db.query(Review).get(first_review.id)
+        expect(old_review.is_active).to_be_false()
+
+        active_violations = self.db.query(Violation) \
+            .filter(Violation.review_id == first_review.id) \
+            .filter(Violation.review_is_active == True) \
+            .count()
+        expect(active_violations).to_equal(0)
+
+        counts = self.db.query(ViolationCount).filter(ViolationCount.domain_id == page.domain_id).all()
+        expect([count.to_dict() for count in counts]).to_equal([{
+            'domain_id': page.domain_id,
+            'key_id': violation_key.id,
+            'count': 2
+        }])
@@ -3,7 +3,7 @@
 
 from preggy import expect
 
-from holmes.models import Violation, Key
+from holmes.models import Violation, ViolationCount, Key
 from holmes.utils import _
 from tests.unit.base import ApiTestCase
 from tests.fixtures import ViolationFactory, KeyFactory, DomainFactory
@@ -113,10 +113,38 @@ class TestViolations(ApiTestCase):
             for j in range(i):
                 ViolationFactory.create(key=key)
 
+        ViolationCount.reconcile(self.db)
+
         violations = Violation.get_most_common_violations_names(self.db)
 
         expect(violations).to_be_like([('some.random.fact.1', 1), ('some.random.fact.2', 2)])
 
+    def test_reconcile_writes_only_the_counts_that_drifted(self):
+        domain = DomainFactory.create(name='g0.com')
+        keys = [KeyFactory.create(name='random.fact.%s' % i) for i in range(3)]
+
+        for i in range(2):
+            for j in range(i + 1):
+                ViolationFactory.create(key=keys[i], domain=domain)
+
+        self.db.execute(ViolationCount.__table__.insert(), [
+            {'domain_id': domain.id, 'key_id': keys[0].id, 'count': 1},
+            {'domain_id': domain.id, 'key_id': keys[1].id, 'count': 5},
+            {'domain_id': domain.id, 'key_id': keys[2].id, 'count': 3},
+        ])
+
+        key_ids = [key.id for key in keys]
+        expect(ViolationCount.reconcile_domain(self.db, domain.id, key_ids)).to_equal(2)
+
+        counts = dict(
+            self.db.query(ViolationCount.key_id, ViolationCount.count)
+            .filter(ViolationCount.domain_id == domain.id)
+            .all()
+        )
+        expect(counts).to_equal({keys[0].id: 1, keys[1].id: 2})
+
+        expect(ViolationCount.reconcile_domain(self.db, domain.id, key_ids)).to_equal(0)
+
     def test_get_group_by_key_id_for_all_domains(self):
         domains = [DomainFactory.create(name='g%d.com' % i) for i in range(2)]
         keys = [KeyFactory.create(name='random.fact.%s' % i) for i in range(3)]
@@ -128,6 +156,8 @@ class TestViolations(ApiTestCase):
                     domain=domains[j % 2]
                 )
 
+        ViolationCount.reconcile(self.db)
+
         violations = Violation.get_group_by_key_id_for_all_domains(self.db)
 
         expect(violations).to_length(5)
@@ -164,8 +194,30 @@ class TestViolations(ApiTestCase):
                     key=keys[i],
                     domain=domains[j % 2]
                 )
+
+        ViolationCount.reconcile(self.db)
+
         violations = Violation.get_top_in_category_for_all_domains(self.db)
 
         expect(violations).to_length(5)
         top = ('g0.com', keys[2].category_id, str(keys[2]), 2)
         expect(violations[0]).to_be_like(top)
+
+    def test_can_get_group_by_category_id_for_all_domains(self):
+        domain = DomainFactory.create(name='g0.com')
+        keys = [KeyFactory.create(name='random.fact.%s' % i) for i in range(2)]
+
+        for i in range(2):
+            for j in range(i + 1):
+                ViolationFactory.create(key=keys[i], domain=domain)
+
+        ViolationCount.reconcile(self.db)
+
+        violations = Violation.get_group_by_category_id_for_all_domains(self.db)
+
+        expect(violations[domain.id]).to_length(2)
+        expect(violations[domain.id][0]).to_be_like({
+            'key_name': 'random.fact.1',
+            'category_id': keys[1].category_id,
+            'violation_count': 2
+        })
@@ -1,16 +1,20 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import sys
 
 from datetime import datetime
+from tempfile import mktemp
 from mock import Mock, patch, call
 from preggy import expect
 from pyelasticsearch.exceptions import ConnectionError, ElasticHttpNotFoundError, InvalidJsonResponseError
 from tornado.concurrent import Future
 from tornado.testing import gen_test
+from ujson import loads
 
 from holmes.search_providers.elastic import ElasticSearchProvider
+from holmes.utils import encode_cursor, decode_cursor
 
 from tests.unit.base import ApiTestCase
 from tests.fixtures import ReviewFactory
@@ -93,6 +97,29 @@ class TestElasticSearchProvider(ApiTestCase):
 
         expect(query).to_be_like(expected)
 
+    def test_can_assemble_outer_query_with_cursor_filter(self):
+        query = self.ES._assemble_outer_query('inner_query', ['term1'], 'cursor_filter')
+
+        expect(query['filtered']['filter']).to_be_like({
+            'and': [{'term': 'term1'}, 'cursor_filter']
+        })
+
+    def test_can_assemble_cursor_filter(self):
+        sort_ = [{'completed_date': {'order': 'desc'}}, {'page_id': {'order': 'desc'}}]
+
+        query = self.ES._assemble_cursor_filter(sort_, [1397562242000, 10])
+
+        expect(query).to_be_like({
+            'or': [{
+                'and': [{'range': {'completed_date': {'lt': 1397562242000}}}]
+            }, {
+                'and': [
+                    {'term': {'completed_date': 1397562242000}},
+                    {'range': {'page_id': {'lt': 10}}}
+                ]
+            }]
+        })
+
     def test_can_assemble_filter_terms(self):
         expected = [{'keys.id': 35}, {'domain_id': 359}]
 
@@ -218,25 +245,233 @@ class TestElasticSearchProvider(ApiTestCase):
         expect(logging_error_mock.call_count).to_equal(0)
         expect(time_sleep_mock.call_count).to_equal(0)
 
-    def test_can_index_reviews(self):
-        expected_body = '{"index":{"_type":"review","_id":0}}\n{"page_id":0}\n' * 5
+    def test_can_iter_review_docs(self):
+        reviews = [
+            ReviewFactory.create(is_active=True, number_of_violations=i, completed_date=datetime(2014, 04, 15, 11, 44))
+            for i in range(3)
+        ]
+        for review in reviews:
+            review.page.last_review = review
+        self.db.flush()
+
+        first_page_id = min(review.page_id for review in reviews)
+
+        batches = list(self.ES.iter_review_docs(first_page_id - 1, 2))
+
+        expect(batches).to_length(2)
+        expect([len(docs) for last_page_id, docs in batches]).to_equal([2, 1])
+        expect(batches[-1][0]).to_equal(reviews[-1].page_id)
+
+        docs = [doc for last_page_id, docs in batches for doc in docs]
+        for review, doc in zip(reviews, docs):
+            expected = self.ES.gen_doc(review)
+            expected['keys'] = sorted(expected['keys'])
+            doc['keys'] = sorted(doc['keys'])
+            expect(doc).to_be_like(expected)
+
+    def test_iter_review_docs_filters_keys(self):
+        review = ReviewFactory.create(is_active=True, number_of_violations=2)
+        other = ReviewFactory.create(is_active=True, number_of_violations=1)
+        for item in (review, other):
+            item.page.last_review = item
+        self.db.flush()
+
+        key_id = review.violations[1].key_id
+        first_page_id = min(review.page_id, other.page_id)
+
+        batches = list(self.ES.iter_review_docs(first_page_id - 1, 10, keys=[key_id]))
+
+        expect([doc['page_id'] for doc in batches[0][1]]).to_equal([review.page_id])
+
+    @patch('time.sleep')
+    def test_index_docs_with_retries(self, time_sleep_mock):
+        self.ES.index_docs = Mock(side_effect=[[{'page_id': 2}], []])
+
+        expect(self.ES.index_docs_with_retries([{'page_id': 1}, {'page_id': 2}])).to_be_empty()
+        expect(self.ES.index_docs.call_count).to_equal(2)
+        expect(time_sleep_mock.call_count).to_equal(1)
+
+    def test_index_review_batches_saves_checkpoint(self):
+        checkpoint = mktemp()
+        self.ES.index_docs_with_retries = Mock(side_effect=[[], [{'page_id': 3}], []])
+
+        batches = [(1, [{'page_id': 1}]), (3, [{'page_id': 3}]), (5, [{'page_id': 5}])]
+
+        with patch('logging.error'):
+            indexed, failed = self.ES.index_review_batches(batches, concurrency=2, checkpoint=checkpoint)
+
+        expect(indexed).to_equal(2)
+        expect(failed).to_equal([{'page_id': 3}])
+
+        # the checkpoint does not move past a failed batch
+        expect(self.ES.load_checkpoint(checkpoint)).to_equal(1)
+
+        os.remove(checkpoint)
+
+    def test_index_all_reviews_resumes_from_checkpoint(self):
+        checkpoint = mktemp()
+        self.ES.save_checkpoint(checkpoint, 10)
+        self.ES.connect_to_db = Mock()
+        self.ES.iter_review_docs = Mock(return_value=iter([]))
+        self.ES._get_max_page_id_from_index = Mock()
+
+        self.ES.index_all_reviews(batch_size=50, checkpoint=checkpoint)
+
+        self.ES.iter_review_docs.assert_called_once_with(10, 50, None)
+        expect(self.ES._get_max_page_id_from_index.called).to_be_false()
+
+        os.remove(checkpoint)
+
+    def test_index_review_pushes_to_indexing_queue(self):
+        review = ReviewFactory.create()
+        cache = Mock()
 
-        self.ES.gen_doc = Mock(return_value={'page_id': 0})
         self.ES.syncES = Mock(send_request=Mock())
+        self.ES.gen_doc = Mock(return_value={'page_id': review.page_id})
 
-        pages = [Mock(last_review=0) for _ in range(100)]
+        self.ES.index_review(review, cache)
 
-        self.ES.index_reviews(pages, len(pages), 5)
+        cache.push_review_to_index.assert_called_once_with(review.page_id, {'page_id': review.page_id})
+        expect(self.ES.syncES.send_request.called).to_be_false()
 
-        expect(self.ES.gen_doc.call_count).to_equal(100)
-        expect(self.ES.syncES.send_request.call_count).to_equal(20)
-        self.ES.syncES.send_request.assert_called_with(
+    def test_can_index_docs(self):
+        self.ES.syncES = Mock(send_request=Mock(return_value={'errors': False, 'items': []}))
+
+        failed = self.ES.index_docs([{'page_id': 1}, {'page_id': 2}])
+
+        expect(failed).to_be_empty()
+        self.ES.syncES.send_request.assert_called_once_with(
             method='POST',
             path_components=[self.index, '_bulk'],
-            body=expected_body,
+            body='{"index":{"_type":"review","_id":1}}\n{"page_id":1}\n'
+                 '{"index":{"_type":"review","_id":2}}\n{"page_id":2}\n',
             encode_body=False
         )
 
+    @patch('logging.error')
+    def test_index_docs_returns_failed_docs(self, logging_error_mock):
+        self.ES.syncES = Mock(send_request=Mock(return_value={
+            'errors': True,
+            'items': [
+                {'index': {'_id': '1', 'status': 201}},
+                {'index': {'_id': '2', 'status': 503, 'error': 'unavailable'}},
+            ]
+        }))
+
+        failed = self.ES.index_docs([{'page_id': 1}, {'page_id': 2}])
+
+        expect(failed).to_equal([{'page_id': 2}])
+        logging_error_mock.assert_called_once_with('Could not index review (page_id:2): unavailable')
+
+    @patch('logging.error')
+    def test_index_docs_returns_all_docs_on_connection_errors(self, logging_error_mock):
+        self.ES.syncES = Mock(send_request=Mock(side_effect=ConnectionError('ConnectionError')))
+
+        docs = [{'page_id': 1}, {'page_id': 2}]
+
+        expect(self.ES.index_docs(docs)).to_equal(docs)
+        expect(logging_error_mock.call_count).to_equal(1)
+
+    def test_get_write_indexes_includes_index_being_rebuilt(self):
+        self.ES.syncES = Mock(aliases=Mock(return_value={
+            'holmes-test-2': {'aliases': {'holmes-test-rebuild': {}}}
+        }))
+
+        expect(self.ES.get_write_indexes()).to_equal([self.index, 'holmes-test-2'])
+        expect(self.ES.get_write_indexes()).to_equal([self.index, 'holmes-test-2'])
+
+        self.ES.syncES.aliases.assert_called_once_with('holmes-test-rebuild')
+
+    def test_get_write_indexes_without_rebuild(self):
+        self.ES.syncES = Mock(aliases=Mock(side_effect=ElasticHttpNotFoundError(404, 'IndexMissingException')))
+
+        expect(self.ES.get_write_indexes()).to_equal([self.index])
+
+    @patch('logging.error')
+    def test_index_docs_writes_to_every_index(self, logging_error_mock):
+        self.ES.syncES = Mock(send_request=Mock(return_value={
+            'errors': True,
+            'items': [
+                {'index': {'_id': '1', 'status': 201}},
+                {'index': {'_id': '1', 'status': 201}},
+                {'index': {'_id': '2', 'status': 201}},
+                {'index': {'_id': '2', 'status': 503, 'error': 'unavailable'}},
+            ]
+        }))
+
+        failed = self.ES.index_docs([{'page_id': 1}, {'page_id': 2}], indexes=['old', 'new'])
+
+        expect(failed).to_equal([{'page_id': 2}])
+
+        kwargs = self.ES.syncES.send_request.call_args[1]
+        expect(kwargs['path_components']).to_equal(['_bulk'])
+        expect([loads(line) for line in kwargs['body'].splitlines()]).to_equal([
+            {'index': {'_type': 'review', '_id': 1, '_index': 'old'}}, {'page_id': 1},
+            {'index': {'_type': 'review', '_id': 1, '_index': 'new'}}, {'page_id': 1},
+            {'index': {'_type': 'review', '_id': 2, '_index': 'old'}}, {'page_id': 2},
+            {'index': {'_type': 'review', '_id': 2, '_index': 'new'}}, {'page_id': 2},
+        ])
+
+    def test_setup_index_creates_index_behind_alias(self):
+        def aliases(index=None):
+            if index is not None:
+                raise ElasticHttpNotFoundError(404, 'IndexMissingException')
+            return {}
+
+        self.ES.syncES = Mock(aliases=Mock(side_effect=aliases))
+        self.ES.get_new_index_name = Mock(return_value='holmes-test-1')
+
+        self.ES.setup_index()
+
+        self.ES.syncES.create_index.assert_called_once_with(index='holmes-test-1', settings=self.ES.get_index_settings())
+        self.ES.syncES.update_aliases.assert_called_once_with({
+            'actions': [{'add': {'index': 'holmes-test-1', 'alias': self.index}}]
+        })
+
+    @patch('time.sleep')
+    def test_rebuild_index_swaps_alias(self, time_sleep_mock):
+        aliases = {
+            self.index: {'holmes-test-1': {'aliases': {self.index: {}}}},
+            'holmes-test-rebuild': {'holmes-test-2': {'aliases': {'holmes-test-rebuild': {}}}},
+            None: {'holmes-test-1': {'aliases': {self.index: {}}}},
+        }
+
+        self.ES.syncES = Mock(aliases=Mock(side_effect=lambda index=None: aliases[index]))
+        self.ES.get_new_index_name = Mock(return_value='holmes-test-2')
+        self.ES.index_all_reviews = Mock()
+
+        self.ES.rebuild_index(batch_size=50, concurrency=4)
+
+        settings = self.ES.syncES.create_index.call_args[1]['settings']
+        expect(settings['index']['number_of_replicas']).to_equal(0)
+        expect(settings['index']['refresh_interval']).to_equal('-1')
+
+        self.ES.index_all_reviews.assert_called_once_with(
+            batch_size=50, replace=True, concurrency=4, index='holmes-test-2'
+        )
+
+        expect(self.ES.syncES.update_aliases.call_args_list).to_equal([
+            call({'actions': [{'add': {'index': 'holmes-test-2', 'alias': 'holmes-test-rebuild'}}]}),
+            call({'actions': [
+                {'remove': {'index': 'holmes-test-1', 'alias': self.index}},
+                {'add': {'index': 'holmes-test-2', 'alias': self.index}},
+                {'remove': {'index': 'holmes-test-2', 'alias': 'holmes-test-rebuild'}},
+            ]}),
+        ])
+        self.ES.syncES.delete_index.assert_called_once_with(index='holmes-test-1')
+
+    def test_main_refuses_rebuild_with_keys(self):
+        with patch.object(sys, 'argv', ['holmes-search', '--rebuild', '--keys', 'key.one']):
+            with patch.object(ElasticSearchProvider, 'rebuild_index') as rebuild_index_mock:
+                try:
+                    ElasticSearchProvider.main()
+                except SystemExit as e:
+                    expect(e.code).to_equal(1)
+                else:
+                    assert False, 'Should not have gotten this far'
+
+                expect(rebuild_index_mock.called).to_be_false()
+
     @gen_test
     def test_can_get_by_violation_key_name(self):
 
@@ -269,6 +504,57 @@ class TestElasticSearchProvider(ApiTestCase):
         expect(getitem_mock.__getitem__.call_count).to_equal(5 * len(hits))
         callback_mock.assert_called_once_with(response)
 
+    @gen_test
+    def test_can_get_by_violation_key_name_after_cursor(self):
+
+        def search_side_effect(*args, **kwargs):
+            kwargs['callback'](Mock(error=None))
+
+        self.ES.asyncES = Mock(
+            search=Mock(side_effect=search_side_effect)
+        )
+
+        hits = 2 * [{
+            '_source': {
+                'uuid': 'uuid', 'page_uuid': 'page_uuid', 'page_url': 'page_url',
+                'domain_name': 'domain_name', 'completed_date': 1397562242
+            },
+            'sort': [1397562242000, 6, 10]
+        }]
+        fake_body = {'hits': {'total': 20, 'hits': hits}}
+
+        callback_mock = Mock(side_effect=self.stop)
+
+        with patch('holmes.search_providers.elastic.loads', return_value=fake_body):
+            response = yield self.ES.get_by_violation_key_name(
+                key_id=1,
+                current_page=3,
+                page_size=2,
+                cursor=encode_cursor([1397562242000, 7, 12]),
+                callback=callback_mock
+            )
+
+        search_kwargs = self.ES.asyncES.search.call_args[1]
+        expect(search_kwargs['page']).to_equal(1)
+        expect(search_kwargs['source']['query']['filtered']['filter']['and']).to_length(2)
+
+        expect(response['reviews']).to_length(2)
+        expect(decode_cursor(response['nextCursor'])).to_equal([1397562242000, 6, 10])
+
+    @gen_test
+    def test_get_by_violation_key_name_with_invalid_cursor(self):
+        self.ES.asyncES = Mock()
+        callback_mock = Mock(side_effect=self.stop)
+
+        response = yield self.ES.get_by_violation_key_name(
+            key_id=1,
+            cursor='invalid',
+            callback=callback_mock
+        )
+
+        expect(self.ES.asyncES.search.called).to_be_false()
+        expect(response).to_equal({'error': {'status_code': 400, 'reason': 'Invalid cursor'}})
+
     @gen_test
     def test_can_get_by_violation_key_name_with_server_erroneous_response(self):
 
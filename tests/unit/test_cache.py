@@ -2,17 +2,21 @@
 # -*- coding: utf-8 -*-
 
 import time
+from hashlib import sha1
 from gzip import GzipFile
 from cStringIO import StringIO
 from ujson import dumps, loads
 
+from unittest import TestCase
+
 import msgpack
 from preggy import expect
 from tornado.testing import gen_test
 from tornado.gen import Task
 
-from holmes.cache import Cache
+from holmes.cache import Cache, LimiterBuckets, LRUCache, get_request_cache_stats, get_fetch_stats
 from holmes.models import Domain, Limiter, Page
+from holmes.streaming import StreamedBody
 from tests.unit.base import ApiTestCase
 from tests.fixtures import (
     DomainFactory, PageFactory, ReviewFactory, LimiterFactory,
@@ -233,6 +237,16 @@ class CacheTestCase(ApiTestCase):
             {"url":"http://g1.com","page":"1"}
         ])
 
+    @gen_test
+    def test_can_get_indexing_queue_status(self):
+        self.cache.redis.delete('indexing-queue')
+        yield Task(self.cache.redis.zadd, 'indexing-queue', {'1': time.time() - 10})
+
+        status = yield self.cache.get_indexing_queue_status()
+
+        expect(status['queueSize']).to_equal(1)
+        expect(status['lagInSeconds']).to_be_greater_than(9)
+
 
 class SyncCacheTestCase(ApiTestCase):
     def setUp(self):
@@ -510,6 +524,211 @@ class SyncCacheTestCase(ApiTestCase):
         expect(response.error).to_be_null()
         expect(response.request_time).to_equal(100)
 
+    def test_set_request_with_streamed_body(self):
+        test_url = 'http://g.com/test.png'
+        key = 'urls-%s' % test_url
+
+        self.sync_cache.redis.delete(key)
+
+        body = StreamedBody(head_size=4)
+        body.write('abcdefgh')
+        body.close()
+
+        self.sync_cache.set_request(
+            url=test_url,
+            status_code=200,
+            headers={},
+            cookies=None,
+            text=body.head,
+            effective_url=test_url,
+            error=None,
+            request_time=100,
+            expiration=5,
+            body=body
+        )
+
+        url, response = self.sync_cache.get_request(test_url)
+        expect(response).to_be_null()
+
+        url, response = self.sync_cache.get_request(test_url, streamed=True)
+        expect(response.text).to_equal('abcd')
+        expect(response.streamed_body.size).to_equal(8)
+        expect(response.streamed_body.gzipped_size).to_equal(body.gzipped_size)
+
+    def test_set_request_keeps_responses_with_validators(self):
+        test_url = 'http://g.com/validated.html'
+
+        self.sync_cache.redis.delete('urls-%s' % test_url)
+        self.sync_cache.redis.delete('validated-urls-%s' % test_url)
+
+        self.sync_cache.set_request(
+            url=test_url,
+            status_code=200,
+            headers={'Etag': '"abc"', 'Last-Modified': 'Mon, 01 Jun 2015 00:00:00 GMT'},
+            cookies=None,
+            text='body',
+            effective_url=test_url,
+            error=None,
+            request_time=1,
+            expiration=5,
+            validated_expiration=60
+        )
+
+        response, validators = self.sync_cache.get_validated_request(test_url)
+
+        expect(response.text).to_equal('body')
+        expect(validators).to_equal({
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 01 Jun 2015 00:00:00 GMT'
+        })
+
+    def test_set_request_without_validators_is_not_kept(self):
+        test_url = 'http://g.com/not-validated.html'
+
+        self.sync_cache.redis.delete('validated-urls-%s' % test_url)
+
+        self.sync_cache.set_request(
+            url=test_url,
+            status_code=200,
+            headers={'X-HEADER': 'test'},
+            cookies=None,
+            text='body',
+            effective_url=test_url,
+            error=None,
+            request_time=1,
+            expiration=5,
+            validated_expiration=60
+        )
+
+        expect(self.sync_cache.get_validated_request(test_url)).to_equal((None, None))
+
+    def test_set_request_keeps_only_what_revalidation_needs(self):
+        test_url = 'http://g.com/validated-record.html'
+
+        self.sync_cache.set_request(
+            url=test_url, status_code=200, headers={'Etag': '"abc"'}, cookies={'session': '1'}, text='body',
+            effective_url=test_url, error=None, request_time=1, expiration=5, validated_expiration=60
+        )
+
+        item = msgpack.unpackb(self.sync_cache.redis.get('validated-urls-%s' % test_url))
+
+        expect(item['validators']).to_equal({'If-None-Match': '"abc"'})
+        expect(item['body_hash']).to_equal(sha1('body').hexdigest())
+        expect(item).not_to_include('cookies')
+        expect(self.sync_cache.redis.ttl('validated-urls-%s' % test_url)).to_be_greater_than(5)
+
+    def test_set_request_does_not_keep_large_bodies_for_revalidation(self):
+        test_url = 'http://g.com/large-validated.html'
+
+        self.sync_cache.redis.delete('validated-urls-%s' % test_url)
+
+        self.sync_cache.set_request(
+            url=test_url, status_code=200, headers={'Etag': '"abc"'}, cookies=None, text='large body',
+            effective_url=test_url, error=None, request_time=1, expiration=5,
+            validated_expiration=60, validated_max_size=4
+        )
+
+        expect(self.sync_cache.get_validated_request(test_url)).to_equal((None, None))
+        expect(self.sync_cache.redis.ttl('bodies-%s' % sha1('large body').hexdigest())).to_be_lesser_or_equal_to(5)
+
+    def test_validated_request_without_its_body_is_not_revalidated(self):
+        test_url = 'http://g.com/validated-without-body.html'
+        text = 'body of %s' % test_url
+
+        self.sync_cache.set_request(
+            url=test_url, status_code=200, headers={'Etag': '"abc"'}, cookies=None, text=text,
+            effective_url=test_url, error=None, request_time=1, expiration=5, validated_expiration=60
+        )
+        self.sync_cache.redis.delete('bodies-%s' % sha1(text).hexdigest())
+
+        expect(self.sync_cache.get_validated_request(test_url)).to_equal((None, None))
+
+    def test_set_request_stores_identical_bodies_once(self):
+        urls = ['http://g.com/jquery.js', 'http://g.com/jquery.js?v=2']
+
+        for url in urls:
+            self.sync_cache.redis.delete('urls-%s' % url)
+
+        sync_cache = self.sync_cache
+
+        for url in urls:
+            sync_cache.set_request(
+                url=url, status_code=200, headers={}, cookies=None, text='var jQuery;',
+                effective_url=url, error=None, request_time=1, expiration=5
+            )
+
+        expect(sync_cache.request_cache_counters['bodies_stored']).to_equal(1)
+        expect(sync_cache.request_cache_counters['bodies_deduplicated']).to_equal(1)
+
+        for url in urls:
+            url, response = sync_cache.get_request(url)
+            expect(response.text).to_equal('var jQuery;')
+
+        expect(sync_cache.request_cache_counters['redis_hits']).to_equal(1)
+        expect(sync_cache.request_cache_counters['lru_hits']).to_equal(1)
+
+        sync_cache.flush_request_cache_stats()
+        expect(sync_cache.request_cache_counters).to_be_empty()
+
+    def test_set_request_keeps_bodies_as_long_as_their_longest_lived_record(self):
+        validated_url = 'http://g.com/validated.js'
+        other_url = 'http://g.com/other.js'
+        text = 'var body = "%s";' % validated_url
+        body_key = 'bodies-%s' % sha1(text).hexdigest()
+
+        self.sync_cache.redis.delete(body_key)
+
+        self.sync_cache.set_request(
+            url=other_url, status_code=200, headers={}, cookies=None, text=text,
+            effective_url=other_url, error=None, request_time=1, expiration=5, validated_expiration=60
+        )
+
+        # without validators no record outlives the url record
+        expect(self.sync_cache.redis.ttl(body_key)).to_be_lesser_or_equal_to(5)
+
+        self.sync_cache.set_request(
+            url=validated_url, status_code=200, headers={'Etag': '"abc"'}, cookies=None, text=text,
+            effective_url=validated_url, error=None, request_time=1, expiration=5, validated_expiration=60
+        )
+
+        expect(self.sync_cache.redis.ttl(body_key)).to_be_greater_than(5)
+
+        self.sync_cache.set_request(
+            url=other_url, status_code=200, headers={}, cookies=None, text=text,
+            effective_url=other_url, error=None, request_time=1, expiration=5
+        )
+
+        # a shorter lived record never shortens the body
+        expect(self.sync_cache.redis.ttl(body_key)).to_be_greater_than(5)
+
+    def test_acquire_fetch(self):
+        url = 'http://g.com/a.css'
+        self.sync_cache.redis.delete('fetching-%s' % url, 'fetched-%s' % url)
+
+        expect(self.sync_cache.acquire_fetch(url, 10, 60)).to_equal((True, False))
+        expect(self.sync_cache.acquire_fetch(url, 10, 60)).to_equal((False, True))
+        expect(self.sync_cache.is_fetching(url)).to_be_true()
+
+        expect(self.sync_cache.extend_fetch(url, 30)).to_be_true()
+        expect(self.sync_cache.redis.ttl('fetching-%s' % url)).to_be_greater_than(10)
+
+        self.sync_cache.release_fetch(url)
+        expect(self.sync_cache.extend_fetch(url, 30)).to_be_false()
+
+        expect(self.sync_cache.is_fetching(url)).to_be_false()
+        expect(self.sync_cache.acquire_fetch(url, 10, 60)).to_equal((True, True))
+
+    def test_failed_fetch(self):
+        url = 'http://g.com/broken.css'
+        self.sync_cache.redis.delete('failed-fetch-%s' % url)
+
+        expect(self.sync_cache.has_failed_fetch(url)).to_be_false()
+
+        self.sync_cache.set_failed_fetch(url, 10)
+
+        expect(self.sync_cache.has_failed_fetch(url)).to_be_true()
+        expect(self.sync_cache.redis.ttl('failed-fetch-%s' % url)).to_be_lesser_or_equal_to(10)
+
     def test_set_request_with_status_code_greater_than_399(self):
         test_url = 'http://g.com/test.html'
         key = 'urls-%s' % test_url
@@ -704,3 +923,321 @@ class SyncCacheTestCase(ApiTestCase):
 
         data = self.sync_cache.get_next_job_bucket()
         expect(data).to_be_null()
+
+    def test_add_next_jobs_to_bucket(self):
+        key = 'next-job-bucket'
+        self.sync_cache.redis.delete(key)
+
+        self.sync_cache.add_next_jobs_to_bucket([
+            ('0', 'http://g0.com'),
+            ('1', 'http://g1.com'),
+            ('2', 'http://g2.com'),
+        ], chunk_size=2)
+
+        data = self.sync_cache.redis.zrange(key, 0, -1)
+        expect([loads(item) for item in data]).to_equal([
+            {'url': 'http://g0.com', 'page': '0'},
+            {'url': 'http://g1.com', 'page': '1'},
+            {'url': 'http://g2.com', 'page': '2'},
+        ])
+
+    def test_fill_job_bucket(self):
+        key = 'next-job-bucket'
+        self.sync_cache.redis.delete(key)
+        self.db.query(Limiter).delete()
+
+        gcom = DomainFactory.create(url='http://g.com', name='g.com')
+        ucom = DomainFactory.create(url='http://u.com', name='u.com')
+
+        for x in range(3):
+            PageFactory.create(domain=gcom, url='http://g.com/%d' % x)
+            PageFactory.create(domain=ucom, url='http://u.com/%d' % x)
+
+        self.sync_cache.fill_job_bucket(expiration=3600, look_ahead_pages=4)
+
+        data = [loads(item)['url'] for item in self.sync_cache.redis.zrange(key, 0, -1)]
+        expect(data).to_equal([
+            'http://g.com/0', 'http://u.com/0', 'http://g.com/1', 'http://u.com/1'
+        ])
+
+    def test_fill_job_bucket_respects_limiters(self):
+        key = 'next-job-bucket'
+        self.sync_cache.redis.delete(key)
+        self.db.query(Limiter).delete()
+
+        gcom = DomainFactory.create(url='http://g.com', name='g.com')
+        LimiterFactory.create(url='http://g.com', value=1)
+
+        for x in range(3):
+            PageFactory.create(domain=gcom, url='http://g.com/%d' % x)
+
+        self.sync_cache.fill_job_bucket(expiration=3600, look_ahead_pages=10)
+
+        data = [loads(item)['url'] for item in self.sync_cache.redis.zrange(key, 0, -1)]
+        expect(data).to_equal(['http://g.com/0'])
+
+    def test_limiter_buckets(self):
+        globo = LimiterFactory.build(url='http://globo.com', value=2)
+        g1 = LimiterFactory.build(url='http://globo.com/g1', value=1)
+
+        buckets = LimiterBuckets([(globo, 2.0), (g1, 1.0)])
+
+        expect(list(buckets.matching('http://globo.com/g1/news'))).to_equal([
+            'http://globo.com', 'http://globo.com/g1'
+        ])
+        expect(list(buckets.matching('http://other.com'))).to_equal([])
+
+        expect(buckets.consume('http://globo.com/g1/news')).to_be_true()
+        expect(buckets.consume('http://globo.com/g1/sports')).to_be_false()
+        expect(buckets.consume('http://globo.com/esporte')).to_be_true()
+        expect(buckets.consume('http://globo.com/esporte')).to_be_false()
+        expect(buckets.consume('http://other.com')).to_be_true()
+
+    def test_claim_next_jobs(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases')
+
+        self.sync_cache.add_next_jobs_to_bucket([
+            ('0', 'http://g0.com'),
+            ('1', 'http://g1.com'),
+            ('2', 'http://g2.com'),
+        ])
+
+        remaining, items = self.sync_cache.claim_next_jobs(2, 60)
+        expect(remaining).to_equal(1)
+        expect([loads(item)['url'] for item in items]).to_equal([
+            'http://g0.com', 'http://g1.com'
+        ])
+
+        leases = self.sync_cache.redis.zrange('next-job-leases', 0, -1)
+        expect(leases).to_length(2)
+
+        remaining, items = self.sync_cache.claim_next_jobs(2, 60)
+        expect(remaining).to_equal(0)
+        expect([loads(item)['url'] for item in items]).to_equal(['http://g2.com'])
+
+    def test_claim_next_jobs_skips_leased_jobs(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases')
+
+        self.sync_cache.add_next_jobs_to_bucket([('0', 'http://g0.com')])
+        remaining, items = self.sync_cache.claim_next_jobs(1, 60)
+        expect(items).to_length(1)
+
+        self.sync_cache.add_next_jobs_to_bucket([('0', 'http://g0.com')])
+        remaining, items = self.sync_cache.claim_next_jobs(1, 60)
+        expect(remaining).to_equal(0)
+        expect(items).to_be_empty()
+
+    def test_claim_next_jobs_requeues_expired_leases(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases')
+
+        item = dumps({'page': '0', 'url': 'http://g0.com'})
+        self.sync_cache.redis.zadd('next-job-leases', time.time() - 1, item)
+
+        remaining, items = self.sync_cache.claim_next_jobs(1, 60)
+        expect(items).to_equal([item])
+
+    def test_claim_next_jobs_drops_jobs_failing_too_many_times(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases', 'next-job-attempts')
+
+        item = dumps({'page': '0', 'url': 'http://g0.com'})
+
+        for attempt in range(2):
+            self.sync_cache.redis.zadd('next-job-leases', time.time() - 1, item)
+            remaining, items = self.sync_cache.claim_next_jobs(1, 60, max_attempts=3)
+            expect(items).to_equal([item])
+            self.sync_cache.redis.zrem('next-job-leases', item)
+
+        self.sync_cache.redis.zadd('next-job-leases', time.time() - 1, item)
+        remaining, items = self.sync_cache.claim_next_jobs(1, 60, max_attempts=3)
+
+        expect(items).to_be_empty()
+        expect(self.sync_cache.redis.zcard('next-job-bucket')).to_equal(0)
+        expect(self.sync_cache.redis.hget('next-job-attempts', item)).to_be_null()
+
+    def test_jobs_dropped_for_failing_too_many_times_are_not_added_back(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases', 'next-job-attempts', 'next-job-exhausted')
+
+        item = dumps({'page': '0', 'url': 'http://g0.com'})
+        self.sync_cache.redis.zadd('next-job-leases', time.time() - 1, item)
+
+        remaining, items = self.sync_cache.claim_next_jobs(1, 60, max_attempts=1, exhausted_expiration=60)
+        expect(items).to_be_empty()
+
+        self.sync_cache.add_next_jobs_to_bucket([('0', 'http://g0.com'), ('1', 'http://g1.com')])
+
+        expect(self.sync_cache.redis.zrange('next-job-bucket', 0, -1)).to_equal([
+            dumps({'page': '1', 'url': 'http://g1.com'})
+        ])
+
+        # until they expire
+        self.sync_cache.redis.zadd('next-job-exhausted', time.time() - 1, item)
+        self.sync_cache.add_next_jobs_to_bucket([('0', 'http://g0.com')])
+
+        expect(self.sync_cache.redis.zcard('next-job-bucket')).to_equal(2)
+
+    def test_renew_and_release_job_lease(self):
+        self.sync_cache.redis.delete('next-job-bucket', 'next-job-leases')
+
+        self.sync_cache.add_next_jobs_to_bucket([('0', 'http://g0.com')])
+        jobs = self.sync_cache.get_next_jobs(3600, look_ahead_pages=0, count=1, lease_expiration=60)
+
+        expect(jobs).to_length(1)
+        expect(jobs[0]['url']).to_equal('http://g0.com')
+
+        lease = jobs[0]['lease']
+        expect(self.sync_cache.renew_job_lease(lease, 60)).to_be_true()
+
+        self.sync_cache.redis.hset('next-job-attempts', lease, 1)
+
+        self.sync_cache.release_job_lease(lease)
+        expect(self.sync_cache.redis.zcard('next-job-leases')).to_equal(0)
+        expect(self.sync_cache.redis.hget('next-job-attempts', lease)).to_be_null()
+        expect(self.sync_cache.renew_job_lease(lease, 60)).to_be_false()
+
+    def test_push_and_claim_reviews_to_index(self):
+        self.sync_cache.redis.delete(
+            'indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'
+        )
+
+        self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'a'})
+        self.sync_cache.push_review_to_index(2, {'page_id': 2, 'uuid': 'b'})
+        expect(self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'c'})).to_equal(2)
+
+        reviews = self.sync_cache.claim_reviews_to_index(10, 60)
+
+        expect([review['doc'] for review in reviews]).to_equal([
+            {'page_id': 1, 'uuid': 'c'},
+            {'page_id': 2, 'uuid': 'b'},
+        ])
+        expect(self.sync_cache.redis.zcard('indexing-leases')).to_equal(2)
+        expect(self.sync_cache.claim_reviews_to_index(10, 60)).to_be_empty()
+
+        self.sync_cache.release_reviews_to_index(reviews)
+        expect(self.sync_cache.redis.zcard('indexing-leases')).to_equal(0)
+
+    def test_claim_reviews_to_index_requeues_expired_leases(self):
+        self.sync_cache.redis.delete(
+            'indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'
+        )
+
+        self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'a'})
+        self.sync_cache.push_review_to_index(2, {'page_id': 2, 'uuid': 'b'})
+        self.sync_cache.claim_reviews_to_index(10, -1)
+
+        # a newer review of page 2 replaces the expired one
+        self.sync_cache.push_review_to_index(2, {'page_id': 2, 'uuid': 'c'})
+
+        reviews = self.sync_cache.claim_reviews_to_index(10, 60)
+
+        expect(sorted([review['doc']['uuid'] for review in reviews])).to_equal(['a', 'c'])
+
+    def test_claim_reviews_to_index_drops_expired_leases_of_indexed_pages(self):
+        self.sync_cache.redis.delete(
+            'indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'
+        )
+
+        self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'a'})
+        self.sync_cache.claim_reviews_to_index(10, 60)
+
+        # a newer review is queued, claimed and indexed meanwhile
+        self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'b'})
+        reviews = self.sync_cache.claim_reviews_to_index(10, 60)
+        self.sync_cache.release_reviews_to_index(reviews)
+
+        # the lease of the older review expires
+        stale_lease = self.sync_cache.redis.zrange('indexing-leases', 0, -1)[0]
+        self.sync_cache.redis.zadd('indexing-leases', time.time() - 1, stale_lease)
+
+        expect(self.sync_cache.claim_reviews_to_index(10, 60)).to_be_empty()
+        expect(self.sync_cache.redis.zcard('indexing-leases')).to_equal(0)
+
+    def test_claim_reviews_to_index_drops_reviews_failing_too_many_times(self):
+        self.sync_cache.redis.delete(
+            'indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'
+        )
+
+        self.sync_cache.push_review_to_index(1, {'page_id': 1, 'uuid': 'a'})
+        self.sync_cache.claim_reviews_to_index(10, -1, max_attempts=2)
+
+        reviews = self.sync_cache.claim_reviews_to_index(10, -1, max_attempts=2)
+        expect([review['doc']['uuid'] for review in reviews]).to_equal(['a'])
+
+        expect(self.sync_cache.claim_reviews_to_index(10, -1, max_attempts=2)).to_be_empty()
+        expect(self.sync_cache.redis.zcard('indexing-leases')).to_equal(0)
+        expect(self.sync_cache.redis.hget('indexing-attempts', 1)).to_be_null()
+
+    def test_get_indexing_queue_status(self):
+        self.sync_cache.redis.delete(
+            'indexing-queue', 'indexing-queue-docs', 'indexing-leases', 'indexing-versions', 'indexing-attempts'
+        )
+
+        expect(self.sync_cache.get_indexing_queue_status()).to_equal({
+            'queueSize': 0,
+            'lagInSeconds': 0.0
+        })
+
+        self.sync_cache.push_review_to_index(1, {'page_id': 1})
+        self.sync_cache.redis.zadd('indexing-queue', time.time() - 10, 1)
+
+        status = self.sync_cache.get_indexing_queue_status()
+        expect(status['queueSize']).to_equal(1)
+        expect(status['lagInSeconds']).to_be_greater_than(9)
+
+
+class LRUCacheTestCase(TestCase):
+    def test_drops_least_recently_used_items_over_max_size(self):
+        lru = LRUCache(max_size=10)
+
+        lru.put('a', 'aaaa')
+        lru.put('b', 'bbbb')
+        expect(lru.get('a')).to_equal('aaaa')
+
+        lru.put('c', 'cccc')
+
+        expect(lru.get('b')).to_be_null()
+        expect(lru.get('a')).to_equal('aaaa')
+        expect(lru.get('c')).to_equal('cccc')
+        expect(lru.size).to_equal(8)
+
+    def test_ignores_items_bigger_than_max_size(self):
+        lru = LRUCache(max_size=2)
+        lru.put('a', 'aaa')
+
+        expect(lru.get('a')).to_be_null()
+        expect(lru.size).to_equal(0)
+
+
+class GetRequestCacheStatsTestCase(TestCase):
+    def test_get_request_cache_stats(self):
+        stats = get_request_cache_stats(
+            {'lru_hits': '6', 'redis_hits': '2', 'misses': '2', 'bodies_stored': '1', 'bodies_deduplicated': '3'},
+            '# Memory\r\nused_memory:1024\r\nused_memory_human:1K\r\n'
+        )
+
+        expect(stats['hitRate']).to_equal(0.8)
+        expect(stats['dedupRate']).to_equal(0.75)
+        expect(stats['redisUsedMemoryInBytes']).to_equal(1024)
+
+    def test_get_request_cache_stats_without_lookups(self):
+        stats = get_request_cache_stats(None, None)
+
+        expect(stats['hitRate']).to_equal(0.0)
+        expect(stats['redisUsedMemoryInBytes']).to_be_null()
+
+
+class GetFetchStatsTestCase(TestCase):
+    def test_get_fetch_stats(self):
+        stats = get_fetch_stats([
+            (120, {'origin_fetches': '10', 'duplicate_fetches': '2', 'coalesced_in_process': '5'}),
+            (60, None),
+        ])
+
+        expect(stats).to_length(2)
+        expect(stats[0]).to_equal({
+            'minute': 120,
+            'originFetches': 10,
+            'duplicateFetches': 2,
+            'coalescedInProcess': 5,
+            'coalescedAcrossWorkers': 0,
+        })
+        expect(stats[1]['originFetches']).to_equal(0)
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import threading
+
+from mock import Mock
+from preggy import expect
+from tornado.httpserver import HTTPRequest
+from tornado.testing import AsyncTestCase, gen_test
+from tornado.web import Application
+
+from holmes.config import Config
+from holmes.executor import ThreadPoolExecutor
+from holmes.handlers import BaseHandler
+from holmes.utils import load_languages
+
+
+class TestThreadPoolExecutor(AsyncTestCase):
+
+    def setUp(self):
+        super(TestThreadPoolExecutor, self).setUp()
+        self.executor = ThreadPoolExecutor(2, self.io_loop)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(TestThreadPoolExecutor, self).tearDown()
+
+    @gen_test
+    def test_runs_function_outside_the_io_loop_thread(self):
+        result = yield self.executor.submit(lambda a, b=0: (a + b, threading.current_thread()), 1, b=2)
+
+        expect(result[0]).to_equal(3)
+        expect(result[1]).not_to_equal(threading.current_thread())
+
+    @gen_test
+    def test_raises_function_errors_in_the_coroutine(self):
+        def fail():
+            raise ValueError('boom')
+
+        try:
+            yield self.executor.submit(fail)
+        except ValueError as err:
+            expect(str(err)).to_equal('boom')
+        else:
+            assert False, 'ValueError expected'
+
+
+class TestRunOnDb(AsyncTestCase):
+
+    def setUp(self):
+        super(TestRunOnDb, self).setUp()
+        load_languages()
+
+    def get_handler(self, request_db_maker):
+        application = Application()
+        application.config = Config()
+        application.db = Mock()
+        application.request_db_maker = request_db_maker
+        application.db_executor = ThreadPoolExecutor(1, self.io_loop)
+        self.addCleanup(application.db_executor.shutdown)
+
+        return BaseHandler(application, HTTPRequest('GET', '/'))
+
+    @gen_test
+    def test_runs_on_the_executor_with_a_session_of_its_own(self):
+        sessions = []
+
+        def maker():
+            sessions.append(Mock())
+            return sessions[-1]
+
+        handler = self.get_handler(maker)
+
+        result = yield handler.run_on_db(lambda db, a, b=0: (db, a + b, threading.current_thread()), 1, b=2)
+
+        expect(sessions).to_length(1)
+        expect(result[0]).to_equal(sessions[0])
+        expect(result[1]).to_equal(3)
+        expect(result[2]).not_to_equal(threading.current_thread())
+        expect(sessions[0].close.call_count).to_equal(1)
+
+    @gen_test
+    def test_closes_the_session_when_the_method_fails(self):
+        session = Mock()
+        handler = self.get_handler(lambda: session)
+
+        def fail(db):
+            raise ValueError('boom')
+
+        try:
+            yield handler.run_on_db(fail)
+        except ValueError:
+            pass
+        else:
+            assert False, 'ValueError expected'
+
+        expect(session.close.call_count).to_equal(1)
+
+    @gen_test
+    def test_runs_inline_with_the_shared_session_without_a_maker(self):
+        handler = self.get_handler(None)
+
+        result = yield handler.run_on_db(lambda db: (db, threading.current_thread()))
+
+        expect(result).to_equal((handler.db, threading.current_thread()))
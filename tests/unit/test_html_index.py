@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from os.path import abspath, dirname, join
+from unittest import TestCase
+
+import lxml.html
+from preggy import expect
+
+from holmes.html_index import HtmlIndex
+
+
+class TestHtmlIndex(TestCase):
+
+    def get_index(self, html):
+        return HtmlIndex(lxml.html.fromstring(html))
+
+    def test_can_find_by_tag(self):
+        index = self.get_index(
+            '<html><head><title>t</title></head>'
+            '<body><a href="/a">a</a><!-- a --><a>b</a><a href="/c">c</a></body></html>'
+        )
+
+        expect([a.text for a in index.find('a')]).to_equal(['a', 'b', 'c'])
+        expect([a.text for a in index.find('a', 'href')]).to_equal(['a', 'c'])
+        expect(index.find('title')).to_length(1)
+        expect(index.find('img')).to_equal([])
+
+    def test_find_returns_copies(self):
+        index = self.get_index('<html><body><a href="/a">a</a></body></html>')
+
+        index.find('a').pop()
+
+        expect(index.find('a')).to_length(1)
+
+    def test_can_exclude_root(self):
+        index = self.get_index('<a href="/a">a</a>')
+
+        expect(index.find('a', 'href')).to_length(1)
+        expect(index.find('a', 'href', include_root=False)).to_equal([])
+
+    def test_find_all_keeps_document_order(self):
+        index = self.get_index('<html><body><h2>1</h2><h1>2</h1><h3>3</h3><h1>4</h1></body></html>')
+
+        headings = index.find_all(('h1', 'h2', 'h3'))
+
+        expect([heading.text for heading in headings]).to_equal(['1', '2', '3', '4'])
+
+    def test_empty_index(self):
+        index = HtmlIndex(None)
+
+        expect(index.find('a')).to_equal([])
+        expect(index.find_all(('h1', 'h2'))).to_equal([])
+
+    def test_matches_cssselect(self):
+        html = open(join(abspath(dirname(__file__)), 'files', 'globo.html')).read()
+        root = lxml.html.fromstring(html)
+        index = HtmlIndex(root)
+
+        expect(index.find('a', 'href', include_root=False)).to_equal(root.cssselect(':not(script) a[href]'))
+        expect(index.find('img', 'src', include_root=False)).to_equal(root.cssselect(':not(script) img[src]'))
+        expect(index.find('link', 'href')).to_equal(root.cssselect('link[href]'))
+        expect(index.find('script', 'src')).to_equal(root.cssselect('script[src]'))
+        expect(index.find('meta')).to_equal(root.cssselect('meta'))
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from os.path import abspath, dirname, join
+from unittest import TestCase
+
+from mock import Mock, patch, call
+from preggy import expect
+
+from holmes.indexer import IndexerWorker
+
+
+class IndexerTestCase(TestCase):
+    root_path = abspath(join(dirname(__file__), '..', '..'))
+
+    def get_indexer(self):
+        indexer = IndexerWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        indexer.cache = Mock()
+        indexer.search_provider = Mock()
+        return indexer
+
+    def get_reviews(self, *page_ids):
+        return [
+            {'page_id': page_id, 'queued_at': 0, 'doc': {'page_id': page_id}, 'lease': str(page_id)}
+            for page_id in page_ids
+        ]
+
+    def test_description(self):
+        indexer = self.get_indexer()
+
+        expect(indexer.get_description()).to_include('holmes-indexer-')
+
+    def test_claim_reviews_until_bulk_is_full(self):
+        indexer = self.get_indexer()
+        indexer.config.ELASTIC_SEARCH_BULK_SIZE = 3
+        indexer.cache.claim_reviews_to_index.side_effect = [self.get_reviews(1, 2), self.get_reviews(3)]
+
+        with patch('time.sleep'):
+            reviews = indexer.claim_reviews()
+
+        expect([review['page_id'] for review in reviews]).to_equal([1, 2, 3])
+        expect(indexer.cache.claim_reviews_to_index.call_args_list).to_equal([call(3, 300, 5), call(1, 300, 5)])
+
+    def test_claim_reviews_until_flush_interval(self):
+        indexer = self.get_indexer()
+        indexer.config.ELASTIC_SEARCH_BULK_FLUSH_INTERVAL_IN_SECONDS = 0
+        indexer.cache.claim_reviews_to_index.return_value = self.get_reviews(1)
+
+        reviews = indexer.claim_reviews()
+
+        expect(reviews).to_length(1)
+        expect(indexer.cache.claim_reviews_to_index.call_count).to_equal(1)
+
+    @patch('time.sleep')
+    def test_index_reviews(self, sleep_mock):
+        indexer = self.get_indexer()
+        indexer.search_provider.index_docs.return_value = []
+        reviews = self.get_reviews(1, 2)
+
+        expect(indexer.index_reviews(reviews)).to_equal(2)
+
+        indexer.search_provider.index_docs.assert_called_once_with([{'page_id': 1}, {'page_id': 2}])
+        indexer.cache.release_reviews_to_index.assert_called_once_with(reviews)
+        expect(sleep_mock.called).to_be_false()
+
+    @patch('time.sleep')
+    def test_index_reviews_retries_failed_docs_with_backoff(self, sleep_mock):
+        indexer = self.get_indexer()
+        indexer.search_provider.index_docs.side_effect = [[{'page_id': 2}], [{'page_id': 2}], [{'page_id': 2}]]
+        reviews = self.get_reviews(1, 2)
+
+        expect(indexer.index_reviews(reviews)).to_equal(1)
+
+        expect(indexer.search_provider.index_docs.call_args_list).to_equal([
+            call([{'page_id': 1}, {'page_id': 2}]),
+            call([{'page_id': 2}]),
+            call([{'page_id': 2}]),
+        ])
+        expect(sleep_mock.call_args_list).to_equal([call(1), call(2)])
+
+        # the failed review stays leased
+        indexer.cache.release_reviews_to_index.assert_called_once_with(reviews[:1])
@@ -0,0 +1,268 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+from os.path import abspath, dirname, join
+from multiprocessing.pool import ThreadPool
+from threading import Event
+from unittest import TestCase
+
+from materialgirl import Materializer
+from mock import Mock, patch
+from preggy import expect
+from ujson import dumps, loads
+
+from holmes.config import Config
+from holmes.executor import resolved_future
+from holmes.material import (
+    MaterialWorker, MaterialCache, MATERIAL_STATS_KEY, get_materials_status, configure_material_cache,
+    configure_materials, get_material_dependents
+)
+
+
+class MaterialWorkerTestCase(TestCase):
+    root_path = abspath(join(dirname(__file__), '..', '..'))
+
+    def get_worker(self, expired=None):
+        worker = MaterialWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.db = Mock()
+        worker.redis_material = Mock(ttl=Mock(return_value=None), exists=Mock(return_value=False))
+        worker.girl = Materializer(storage=Mock())
+        worker.girl.storage.is_expired.side_effect = lambda key, expiration: expired is None or key in expired
+        worker.pool = ThreadPool(2)
+
+        if expired is not None:
+            # stored materials stay fresh
+            worker.girl.storage.store.side_effect = lambda key, value, **kw: key in expired and expired.remove(key)
+
+        return worker
+
+    def test_refresh_materials_after_their_dependencies(self):
+        worker = self.get_worker(expired=['domain_stats_reconciliation', 'other'])
+        calls = []
+
+        def get_method(key):
+            def get():
+                calls.append(key)
+                return key
+            return get
+
+        for key in ('domains_details', 'domain_stats_reconciliation', 'other'):
+            worker.girl.add_material(key, get_method(key), 10, 20)
+            worker.girl.materials[key].current_value = key
+
+        refreshed = worker.refresh_materials()
+
+        expect(sorted(refreshed)).to_equal(['domain_stats_reconciliation', 'domains_details', 'other'])
+        expect(calls.index('domains_details')).to_be_greater_than(calls.index('domain_stats_reconciliation'))
+        expect(worker.girl.storage.store.call_count).to_equal(3)
+        expect(worker.girl.storage.release_lock.call_count).to_equal(3)
+        expect(worker.db.remove.call_count).to_equal(3)
+
+        stats = dict(
+            (args[1], loads(args[2]))
+            for args, kwargs in worker.redis_material.hset.call_args_list
+        )
+        expect(stats).to_length(3)
+        expect(stats['other']['durationInSeconds']).to_be_greater_or_equal_to(0)
+
+    def test_refresh_materials_does_not_wait_for_slow_materials(self):
+        worker = self.get_worker(expired=['slow', 'fast'])
+        fast_refreshes = []
+        fast_refreshed_again = Event()
+
+        def slow():
+            # the pool must keep refreshing the fast material meanwhile
+            fast_refreshed_again.wait(5)
+            return 'slow'
+
+        def fast():
+            fast_refreshes.append(time.time())
+
+            if len(fast_refreshes) == 1:
+                # expires again while the slow material is refreshing
+                worker.girl.storage.is_expired.side_effect = lambda key, expiration: key == 'fast'
+            else:
+                worker.girl.storage.is_expired.side_effect = lambda key, expiration: False
+                fast_refreshed_again.set()
+
+            return 'fast'
+
+        worker.girl.add_material('slow', slow, 10, 20)
+        worker.girl.add_material('fast', fast, 10, 20)
+
+        refreshed = worker.refresh_materials()
+
+        expect(fast_refreshed_again.is_set()).to_be_true()
+        # the second fast refresh and the slow one finish together
+        expect(refreshed[0]).to_equal('fast')
+        expect(sorted(refreshed[1:])).to_equal(['fast', 'slow'])
+
+    def test_refresh_materials_skips_locked_and_failed_materials(self):
+        worker = self.get_worker()
+        worker.girl.add_material('locked', Mock(return_value=1), 10, 20)
+        worker.girl.add_material('failed', Mock(side_effect=ValueError('boom')), 10, 20)
+        worker.girl.storage.acquire_lock.side_effect = lambda key, timeout: None if key == 'locked' else Mock()
+
+        with patch.object(worker, 'error') as error_mock:
+            refreshed = worker.refresh_materials()
+
+        expect(refreshed).to_equal([])
+        expect(worker.girl.storage.store.called).to_be_false()
+        expect(error_mock.call_args[0][0]).to_equal('Could not refresh failed: boom')
+
+    @patch('holmes.material.ViolationCount.reconcile')
+    def test_violation_counts_are_reconciled_as_an_opt_in_material(self, reconcile_mock):
+        reconcile_mock.return_value = 12
+        worker = self.get_worker()
+
+        configure_materials(worker.girl, worker.db, Config())
+        expect(worker.girl.materials).not_to_include('violation_count_reconciliation')
+
+        configure_materials(worker.girl, worker.db, Config(VIOLATION_COUNT_RECONCILIATION_ENABLED=True))
+        expect(worker.girl.materials).to_include('violation_count_reconciliation')
+        expect(get_material_dependents('violation_count_reconciliation')).to_include('most_common_violations')
+
+        expect(worker.girl.materials['violation_count_reconciliation'].get()).to_equal(12)
+        reconcile_mock.assert_called_once_with(worker.db, commit=worker.db.commit)
+
+    @patch('holmes.material.DomainStats.reconcile')
+    def test_domain_stats_are_reconciled_in_a_transaction_per_domain(self, reconcile_mock):
+        reconcile_mock.return_value = 3
+        worker = self.get_worker()
+
+        configure_materials(worker.girl, worker.db, Config())
+
+        expect(worker.girl.materials['domain_stats_reconciliation'].get()).to_equal(3)
+        reconcile_mock.assert_called_once_with(worker.db, commit=worker.db.commit)
+
+    def test_get_deadline(self):
+        worker = self.get_worker()
+        worker.girl.add_material('material', Mock(), 10, 20)
+
+        worker.redis_material.ttl.return_value = 15
+        expect(worker.get_deadline('material')).to_equal(5)
+
+        worker.redis_material.ttl.return_value = None
+        expect(worker.get_deadline('material')).to_equal(float('-inf'))
+
+    def test_get_materials_status(self):
+        girl = Materializer(storage=Mock())
+        girl.add_material('fresh', Mock(), 10, 20)
+        girl.add_material('stale', Mock(), 10, 20)
+        girl.add_material('missing', Mock(), 10, 20)
+
+        redis = Mock()
+        redis.hgetall.return_value = {
+            'fresh': dumps({'refreshedAt': time.time() - 1, 'durationInSeconds': 0.5}),
+            'stale': dumps({'refreshedAt': time.time() - 60, 'durationInSeconds': 2.0}),
+        }
+
+        status = dict((item['key'], item) for item in get_materials_status(girl, redis))
+
+        redis.hgetall.assert_called_once_with(MATERIAL_STATS_KEY)
+        expect(status['fresh']['isStale']).to_be_false()
+        expect(status['fresh']['refreshDurationInSeconds']).to_equal(0.5)
+        expect(status['stale']['isStale']).to_be_true()
+        expect(status['stale']['stalenessInSeconds']).to_be_greater_than(59)
+        expect(status['missing']['isStale']).to_be_true()
+        expect(status['missing']['refreshedAt']).to_be_null()
+
+
+class MaterialCacheTestCase(TestCase):
+
+    def get_cache(self, check_interval=60):
+        girl = Mock(storage=Mock(redis=Mock()))
+        girl.storage.redis.hget.return_value = dumps({'refreshedAt': 1, 'durationInSeconds': 1})
+        girl.get.return_value = [{'name': 'globo.com'}, {'name': 'g1.globo.com'}]
+
+        cache = MaterialCache(girl, check_interval)
+        configure_material_cache(cache)
+        return cache
+
+    def test_serves_decoded_material_until_check_interval(self):
+        cache = self.get_cache()
+
+        expect(cache.get('domains_details')).to_length(2)
+        expect(cache.get('domains_details')).to_length(2)
+
+        expect(cache.girl.get.call_count).to_equal(1)
+        expect(cache.redis.hget.call_count).to_equal(1)
+
+    def test_reloads_material_when_version_changes(self):
+        cache = self.get_cache(check_interval=0)
+
+        cache.get('domains_details')
+        cache.get('domains_details')
+        expect(cache.girl.get.call_count).to_equal(1)
+
+        cache.redis.hget.return_value = dumps({'refreshedAt': 2, 'durationInSeconds': 1})
+        cache.get('domains_details')
+        expect(cache.girl.get.call_count).to_equal(2)
+
+    def test_does_not_cache_materials_without_version(self):
+        cache = self.get_cache()
+        cache.redis.hget.return_value = None
+
+        cache.get('domains_details')
+        cache.get('domains_details')
+
+        expect(cache.girl.get.call_count).to_equal(2)
+
+    def test_get_indexed(self):
+        cache = self.get_cache()
+
+        expect(cache.get_indexed('domains_details', 'name', 'g1.globo.com')).to_equal({'name': 'g1.globo.com'})
+        expect(cache.get_indexed('domains_details', 'name', 'other.com')).to_be_null()
+        expect(cache.girl.get.call_count).to_equal(1)
+
+    def test_refresh_reloads_changed_materials(self):
+        cache = self.get_cache()
+        cache.get('domains_details')
+
+        cache.redis.hgetall.return_value = {'domains_details': dumps({'refreshedAt': 1})}
+        cache.refresh()
+        expect(cache.girl.get.call_count).to_equal(1)
+
+        cache.redis.hgetall.return_value = {'domains_details': dumps({'refreshedAt': 3})}
+        cache.refresh()
+        expect(cache.girl.get.call_count).to_equal(2)
+        expect(cache.entries['domains_details']['version']).to_equal(3)
+
+    def test_fetch_runs_on_the_executor_until_the_material_is_fresh(self):
+        cache = self.get_cache()
+        cache.executor = Mock()
+        cache.executor.submit.side_effect = lambda method: resolved_future(method())
+
+        future = cache.fetch_indexed('domains_details', 'name', 'globo.com')
+        expect(future.result()).to_equal({'name': 'globo.com'})
+        expect(cache.executor.submit.call_count).to_equal(1)
+
+        future = cache.fetch('domains_details')
+        expect(future.result()).to_length(2)
+        expect(cache.executor.submit.call_count).to_equal(1)
+
+    def test_removes_the_thread_session_after_each_executor_call(self):
+        cache = self.get_cache()
+        cache.db = Mock()
+        cache.executor = Mock()
+        cache.executor.submit.side_effect = lambda method: resolved_future(method())
+        cache.girl.get.side_effect = lambda key: cache.db.query(key)
+
+        future = cache.fetch('domains_details')
+
+        expect(future.result()).not_to_be_null()
+        expect([name for name, args, kw in cache.db.method_calls]).to_equal(['query', 'remove'])
+
+        cache.redis.hgetall.return_value = {}
+        cache.refresh_in_background()
+        expect(cache.db.remove.call_count).to_equal(2)
+
+    def test_refresh_in_background_skips_while_refreshing(self):
+        cache = self.get_cache()
+        cache.executor = Mock()
+
+        cache.refresh_in_background()
+        cache.refresh_in_background()
+
+        expect(cache.executor.submit.call_count).to_equal(1)
@@ -11,6 +11,7 @@ from mock import patch, Mock, call
 from holmes.reviewer import Reviewer, ReviewDAO
 from holmes.models import Page, Domain, Key, DomainsViolationsPrefs
 from holmes.config import Config
+from holmes.facters import Facter
 from holmes.validators.base import Validator
 from tests.unit.base import ApiTestCase
 from tests.fixtures import (
@@ -192,6 +193,195 @@ class TestReview(ApiTestCase):
         reviewer._wait_for_async_requests.assert_called_once_with(1)
         expect(test_class['has_validated']).to_be_true()
 
+    def test_review_async_calls_callback_after_all_requests(self):
+        test_class = {'validated': 0, 'saved': 0}
+        pending = []
+
+        class MockValidator(Validator):
+            def validate(self):
+                test_class['validated'] += 1
+
+        def async_get(url, handler, method='GET', **kw):
+            pending.append((url, handler))
+
+        reviewer = self.get_reviewer(validators=[MockValidator], db=Mock())
+        reviewer.async_get_func = async_get
+        reviewer.save_review = lambda: test_class.update(saved=test_class['saved'] + 1)
+
+        callback = Mock()
+        reviewer.review_async(callback)
+
+        expect(callback.called).to_be_false()
+        expect(reviewer.pending_requests).to_equal(1)
+
+        url, handler = pending.pop()
+        handler(url, Mock(
+            status_code=200,
+            text='<html><head></head><body></body></html>',
+            headers={},
+            from_cache=True
+        ))
+
+        expect(reviewer.pending_requests).to_equal(0)
+        expect(test_class['validated']).to_equal(1)
+        expect(test_class['saved']).to_equal(1)
+        callback.assert_called_once_with()
+
+    def test_review_async_calls_callback_when_page_fails(self):
+        pending = []
+
+        def async_get(url, handler, method='GET', **kw):
+            pending.append((url, handler))
+
+        reviewer = self.get_reviewer()
+        reviewer.async_get_func = async_get
+        reviewer.save_review = Mock()
+
+        callback = Mock()
+        reviewer.review_async(callback)
+
+        url, handler = pending.pop()
+        handler(url, Mock(status_code=404, text=None, headers={}, from_cache=True))
+
+        expect(reviewer.save_review.called).to_be_false()
+        callback.assert_called_once_with()
+
+    def test_validators_run_as_soon_as_their_data_is_ready(self):
+        pending = []
+        ran = []
+
+        class SlowFacter(Facter):
+            provides = async_provides = ('slow.data',)
+
+            def get_facts(self):
+                self.async_get('http://page.url/slow.png', self.handle_loaded)
+
+            def handle_loaded(self, url, response):
+                self.review.data['slow.data'] = True
+
+        class FastFacter(Facter):
+            provides = ('fast.data',)
+
+            def get_facts(self):
+                self.review.data['fast.data'] = True
+
+        class FastValidator(Validator):
+            requires = ('fast.data',)
+
+            def validate(self):
+                ran.append('fast')
+
+        class SlowValidator(Validator):
+            requires = ('slow.data',)
+
+            def validate(self):
+                ran.append('slow')
+
+        class EverythingValidator(Validator):
+            def validate(self):
+                ran.append('everything')
+
+        def async_get(url, handler, method='GET', **kw):
+            pending.append((url, handler))
+
+        reviewer = self.get_reviewer(
+            validators=[EverythingValidator, SlowValidator, FastValidator], db=Mock()
+        )
+        reviewer.facters = [SlowFacter, FastFacter]
+        reviewer.async_get_func = async_get
+        reviewer.save_review = Mock()
+
+        callback = Mock()
+        reviewer.review_async(callback)
+
+        url, handler = pending.pop()
+        handler(url, Mock(
+            status_code=200,
+            text='<html><head></head><body></body></html>',
+            headers={},
+            from_cache=True
+        ))
+
+        expect(ran).to_equal(['fast'])
+        expect(callback.called).to_be_false()
+
+        url, handler = pending.pop()
+        handler(url, Mock(status_code=200, text='', headers={}, from_cache=True))
+
+        expect(ran).to_equal(['fast', 'everything', 'slow'])
+        expect(reviewer.save_review.called).to_be_true()
+        callback.assert_called_once_with()
+
+    def test_review_async_completes_when_a_response_handler_fails(self):
+        pending = []
+        ran = []
+
+        class FailingFacter(Facter):
+            provides = async_provides = ('failing.data',)
+
+            def get_facts(self):
+                self.async_get('http://page.url/failing.png', self.handle_loaded)
+
+            def handle_loaded(self, url, response):
+                raise ValueError('failed to handle %s' % url)
+
+        class EverythingValidator(Validator):
+            def validate(self):
+                ran.append('everything')
+
+        def async_get(url, handler, method='GET', **kw):
+            pending.append((url, handler))
+
+        reviewer = self.get_reviewer(validators=[EverythingValidator], db=Mock())
+        reviewer.facters = [FailingFacter]
+        reviewer.async_get_func = async_get
+        reviewer.save_review = Mock()
+
+        callback = Mock()
+        reviewer.review_async(callback)
+
+        url, handler = pending.pop()
+        handler(url, Mock(
+            status_code=200,
+            text='<html><head></head><body></body></html>',
+            headers={},
+            from_cache=True
+        ))
+
+        url, handler = pending.pop()
+        handler(url, Mock(status_code=200, text='', headers={}, from_cache=True))
+
+        expect(reviewer.pending_requests).to_equal(0)
+        expect(ran).to_equal(['everything'])
+        callback.assert_called_once_with()
+
+    def test_review_async_saves_in_a_savepoint(self):
+        pending = []
+
+        def async_get(url, handler, method='GET', **kw):
+            pending.append((url, handler))
+
+        reviewer = self.get_reviewer(validators=[], db=Mock())
+        reviewer.async_get_func = async_get
+        reviewer.save_review = Mock(side_effect=ValueError('could not save'))
+
+        callback = Mock()
+        reviewer.review_async(callback)
+
+        url, handler = pending.pop()
+        handler(url, Mock(
+            status_code=200,
+            text='<html><head></head><body></body></html>',
+            headers={},
+            from_cache=True
+        ))
+
+        savepoint = reviewer.db.begin_nested.return_value
+        expect(reviewer.save_review.called).to_be_true()
+        expect(savepoint.commit.called).to_be_false()
+        savepoint.rollback.assert_called_once_with()
+        callback.assert_called_once_with()
+
     @patch.object(ReviewDAO, 'add_fact')
     def test_reviewer_add_fact(self, fact_dao):
         with patch.object(requests, 'post') as post_mock:
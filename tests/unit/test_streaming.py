@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from os.path import abspath, dirname, join
+from unittest import TestCase
+
+from mock import Mock
+from preggy import expect
+
+from holmes.streaming import (
+    StreamedBody, GzippedSizeEstimator, get_body_size, get_gzipped_body_size, get_served_gzipped_size,
+    get_content_length
+)
+
+
+class TestStreaming(TestCase):
+
+    def get_file(self, name):
+        with open(join(abspath(dirname(__file__)), 'files', name), 'r') as f:
+            return f.read()
+
+    def test_keeps_sizes_and_head_only(self):
+        content = self.get_file('globo.html')
+
+        body = StreamedBody(head_size=100)
+        for index in range(0, len(content), 1000):
+            body.write(content[index:index + 1000])
+        body.close()
+
+        expect(body.head).to_equal(content[:100])
+        expect(body.size).to_equal(len(content))
+        expect(body.gzipped_size).to_equal(len(content.encode('zip')))
+        expect(body.truncated).to_be_true()
+
+    def test_empty_body(self):
+        body = StreamedBody(head_size=100)
+        body.close()
+
+        expect(body.head).to_equal('')
+        expect(body.size).to_equal(0)
+        expect(body.gzipped_size).to_equal(0)
+        expect(body.truncated).to_be_false()
+
+    def test_response_sizes(self):
+        response = Mock(text='abcd')
+        expect(get_body_size(response)).to_equal(4)
+        expect(get_gzipped_body_size(response)).to_equal(len('abcd'.encode('zip')))
+
+        response = Mock(text=None)
+        expect(get_body_size(response)).to_equal(0)
+        expect(get_gzipped_body_size(response)).to_equal(0)
+
+        response = Mock(text='ab', streamed_body=StreamedBody.from_sizes('ab', 10, 5))
+        expect(get_body_size(response)).to_equal(10)
+        expect(get_gzipped_body_size(response)).to_equal(5)
+
+    def test_reuses_served_gzipped_size(self):
+        body = StreamedBody(head_size=100)
+        body.header('HTTP/1.1 301 Moved Permanently\r\n')
+        body.header('Content-Length: 10\r\n')
+        body.header('HTTP/1.1 200 OK\r\n')
+        body.header('Content-Encoding: gzip\r\n')
+        body.header('Content-Length: 1234\r\n')
+        body.header('\r\n')
+        body.write('a' * 5000)
+        body.close()
+
+        expect(body.size).to_equal(5000)
+        expect(body.gzipped_size).to_equal(1234)
+        expect(body.headers.get('Content-Encoding')).to_equal('gzip')
+
+    def test_served_gzipped_size(self):
+        expect(get_served_gzipped_size({'content-encoding': 'gzip', 'content-length': '10'})).to_equal(10)
+        expect(get_served_gzipped_size({'Content-Length': '10'})).to_be_null()
+        expect(get_served_gzipped_size({'Content-Encoding': 'gzip'})).to_be_null()
+        expect(get_served_gzipped_size(None)).to_be_null()
+
+    def test_content_length(self):
+        expect(get_content_length({'Content-Length': '1024'})).to_equal(1024)
+        expect(get_content_length({'content-range': 'bytes 0-0/2048', 'Content-Length': '1'})).to_equal(2048)
+        expect(get_content_length({'Content-Range': 'bytes 0-0/*'})).to_be_null()
+        expect(get_content_length({'Content-Length': 'x'})).to_be_null()
+        expect(get_content_length(None)).to_be_null()
+
+    def test_estimate_gzipped_size(self):
+        content = self.get_file('globo.html')
+
+        expect(GzippedSizeEstimator.estimate(content)).to_equal(len(content.encode('zip')))
+        expect(GzippedSizeEstimator.estimate('')).to_equal(0)
+        expect(GzippedSizeEstimator.estimate(content, {'Content-Encoding': 'gzip', 'Content-Length': '42'})).to_equal(42)
+
+        response = Mock(text=content, headers={'Content-Encoding': 'gzip', 'Content-Length': '42'})
+        expect(get_gzipped_body_size(response)).to_equal(42)
+
+    def test_chunk_callback(self):
+        chunks = []
+
+        body = StreamedBody(head_size=2, chunk_callback=chunks.append)
+        body.write('abc')
+        body.write('def')
+        body.close()
+
+        expect(chunks).to_equal(['abc', 'def'])
+        expect(body.head).to_equal('ab')
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase, skipIf
+
+from mock import Mock, ANY, patch
+from preggy import expect
+from tornado.ioloop import IOLoop
+
+from holmes.transport import FetchTransport, HostStats, get_host_stats, get_pool_limits, pycurl, CurlAsyncHTTPClient
+
+
+class TestPoolLimits(TestCase):
+
+    def test_host_pool_follows_largest_limiter(self):
+        expect(get_pool_limits([{'http://g1.globo.com': 4}, {'http://globo.com': 2}], 10)).to_equal((10, 4))
+
+    def test_host_pool_is_bounded_by_concurrency(self):
+        expect(get_pool_limits([{'http://globo.com': 40}], 10)).to_equal((10, 10))
+
+    def test_without_limiters(self):
+        expect(get_pool_limits(None, 10)).to_equal((10, 10))
+
+
+class TestHostStats(TestCase):
+
+    def test_records_new_and_reused_connections(self):
+        stats = HostStats()
+
+        stats.record('https://globo.com/a.png', {'num_connects': 1, 'connect': 0.02, 'appconnect': 0.1, 'pretransfer': 0.11})
+        # reused connections still report a small connect time
+        stats.record('https://globo.com/b.png', {'num_connects': 0, 'connect': 0.0001, 'appconnect': 0, 'pretransfer': 0.001})
+        stats.record('http://globo.com/c.png', {'num_connects': 1, 'connect': 0.02, 'appconnect': 0, 'pretransfer': 0.021})
+        stats.record('https://globo.com/d.png', {})
+        stats.record('https://globo.com/e.png', {'connect': 0.02})
+
+        hosts = stats.pop()
+
+        expect(hosts['globo.com']['requests']).to_equal(3)
+        expect(hosts['globo.com']['new_connections']).to_equal(2)
+        expect(hosts['globo.com']['reused_connections']).to_equal(1)
+        expect(round(hosts['globo.com']['connect_time'], 2)).to_equal(0.04)
+        expect(round(hosts['globo.com']['handshake_time'], 2)).to_equal(0.08)
+        expect(stats.pop()).to_be_empty()
+
+    def test_get_host_stats(self):
+        stats = get_host_stats({
+            'globo.com:requests': '4', 'globo.com:reused_connections': '3',
+            'globo.com:new_connections': '1', 'globo.com:handshake_time': '0.1',
+            'g1.globo.com:requests': '1', 'g1.globo.com:new_connections': '1',
+        })
+
+        expect(stats).to_length(2)
+        expect(stats[0]['host']).to_equal('globo.com')
+        expect(stats[0]['reuseRate']).to_equal(0.75)
+        expect(stats[0]['averageHandshakeTime']).to_equal(0.1)
+        expect(stats[1]['reuseRate']).to_equal(0.0)
+
+
+class TestConnectionInfoCurlAsyncHTTPClient(TestCase):
+
+    @skipIf(pycurl is None, 'pycurl is not installed')
+    def test_adds_connection_info_to_the_time_info(self):
+        from holmes.transport import ConnectionInfoCurlAsyncHTTPClient
+
+        client = ConnectionInfoCurlAsyncHTTPClient(io_loop=IOLoop(), force_instance=True)
+        response = Mock(time_info={'connect': 0.0001})
+        callback = Mock()
+
+        curl = Mock(info={'callback': callback})
+        curl.getinfo.side_effect = lambda option: {pycurl.NUM_CONNECTS: 0, pycurl.APPCONNECT_TIME: 0.0}[option]
+
+        def finish(self, curl, curl_error=None, curl_message=None):
+            curl.info['callback'](response)
+
+        with patch.object(CurlAsyncHTTPClient, '_finish', finish):
+            client._finish(curl)
+
+        callback.assert_called_once_with(response)
+        expect(response.time_info).to_equal({'connect': 0.0001, 'num_connects': 0, 'appconnect': 0.0})
+
+
+class TestFetchTransport(TestCase):
+
+    def test_records_host_stats_of_responses(self):
+        transport = FetchTransport(concurrency=2, ignore_pycurl=True)
+        transport.running_urls = 2
+
+        callback = Mock()
+        response = Mock(
+            code=200, headers={}, body='', effective_url='http://globo.com/', error=None,
+            request_time=0.1, time_info={'num_connects': 0, 'connect': 0.0001, 'pretransfer': 0.01}
+        )
+        response.request.headers = {}
+
+        transport.handle_request('http://globo.com/', callback)(response)
+
+        expect(callback.called).to_be_true()
+        expect(transport.host_stats.hosts['globo.com']['reused_connections']).to_equal(1)
+
+    def test_calls_dispatch_callback_when_the_request_is_sent(self):
+        transport = FetchTransport(concurrency=2, ignore_pycurl=True)
+        transport.http_client = Mock()
+        dispatch_callback = Mock()
+
+        transport.fetch('http://globo.com/', Mock(), 'GET', dispatch_callback=dispatch_callback)
+
+        dispatch_callback.assert_called_once_with('http://globo.com/')
+        request = transport.http_client.fetch.call_args[0][0]
+        expect(request.url).to_equal('http://globo.com/')
+
+    def test_poll_until_check_returns_a_result(self):
+        transport = FetchTransport(concurrency=2, ignore_pycurl=True)
+        transport.ioloop = Mock()
+        transport.stop = Mock()
+
+        results = [None, 'response']
+        handler = Mock()
+
+        transport.poll(lambda: results.pop(0), handler, 0.1, 10)
+        expect(transport.running_polls).to_equal(1)
+        expect(transport.running_urls).to_equal(0)
+
+        transport.ioloop.add_timeout.call_args[0][1]()
+        expect(handler.called).to_be_false()
+
+        transport.ioloop.add_timeout.call_args[0][1]()
+        handler.assert_called_once_with('response')
+        expect(transport.running_polls).to_equal(0)
+        expect(transport.stop.called).to_be_true()
+
+    def test_polls_take_no_concurrency_slot(self):
+        transport = FetchTransport(concurrency=1, ignore_pycurl=True)
+        transport.ioloop = Mock()
+        transport.get_next_url = Mock()
+
+        transport.poll(lambda: None, Mock(), 0.1, 10)
+        transport.enqueue('http://globo.com/', Mock())
+
+        transport.get_next_url.assert_called_once_with('http://globo.com/', ANY, 'GET')
+        expect(transport.url_queue).to_be_empty()
+
+    def test_waits_for_polls_left_after_the_last_request(self):
+        transport = FetchTransport(concurrency=2, ignore_pycurl=True)
+        transport.ioloop = Mock()
+
+        transport.poll(lambda: None, Mock(), 0.1, 10)
+
+        transport.stop()
+        expect(transport.ioloop.stop.called).to_be_false()
+
+        transport.wait(0)
+        expect(transport.ioloop.start.called).to_be_true()
+
+        transport.stop(force=True)
+        expect(transport.ioloop.stop.called).to_be_true()
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from array import array
+from unittest import TestCase
+
+from preggy import expect
+
+from holmes.url_table import UrlTable
+
+
+class TestUrlTable(TestCase):
+
+    def test_gives_each_url_a_sequential_id(self):
+        urls = UrlTable()
+
+        expect(urls.get_id('http://globo.com/1')).to_equal(0)
+        expect(urls.get_id('http://globo.com/2')).to_equal(1)
+        expect(urls.get_id('http://globo.com/1')).to_equal(0)
+        expect(urls).to_length(2)
+
+    def test_keeps_a_single_copy_of_each_url(self):
+        urls = UrlTable()
+        url = 'http://globo.com/1'
+
+        urls.get_id(url)
+        urls.get_id(''.join(['http://globo.com/', '1']))
+
+        expect(urls.ids.keys()[0] is url).to_be_true()
+
+    def test_can_iterate_urls_of_ids(self):
+        urls = UrlTable()
+        first = urls.get_id('http://globo.com/1')
+        urls.get_id('http://globo.com/2')
+        third = urls.get_id('http://globo.com/3')
+
+        result = sorted(urls.iter_urls(array('I', [third, first, third])))
+
+        expect(result).to_equal([
+            (first, 'http://globo.com/1'),
+            (third, 'http://globo.com/3'),
+        ])
+
+    def test_can_get_urls_of_ids(self):
+        urls = UrlTable()
+        url_id = urls.get_id('http://globo.com/1')
+        urls.get_id('http://globo.com/2')
+
+        expect(urls.get_urls(set([url_id]))).to_equal({url_id: 'http://globo.com/1'})
+        expect(urls.get_urls({url_id: 'response'})).to_equal({url_id: 'http://globo.com/1'})
+        expect(urls.get_urls([])).to_equal({})
@@ -1,12 +1,14 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from datetime import datetime
 from unittest import TestCase
 
 from preggy import expect
 
 from holmes.utils import (
-    get_domain_from_url, get_class, load_classes, get_status_code_title
+    get_domain_from_url, get_class, load_classes, get_status_code_title,
+    encode_cursor, decode_cursor, parse_cursor_date
 )
 
 
@@ -124,3 +126,30 @@ class TestUtils(TestCase):
 
         title = get_status_code_title(120)
         expect(title).to_equal('Unknown')
+
+    def test_can_encode_and_decode_cursor(self):
+        dt = datetime(2014, 4, 15, 11, 44, 2, 123)
+
+        cursor = encode_cursor([dt, 10])
+        values = decode_cursor(cursor, size=2)
+
+        expect(values).to_length(2)
+        expect(parse_cursor_date(values[0])).to_equal(dt)
+        expect(values[1]).to_equal(10)
+
+    def test_decode_invalid_cursor(self):
+        expect(decode_cursor(None)).to_be_null()
+        expect(decode_cursor('not-a-cursor')).to_be_null()
+        expect(decode_cursor(encode_cursor([1, 2]), size=3)).to_be_null()
+        expect(parse_cursor_date(10)).to_be_null()
+
+    def test_decode_cursor_with_wrong_types(self):
+        cursor = encode_cursor([10, 20])
+
+        expect(decode_cursor(cursor, types=(int, int))).to_equal([10, 20])
+        expect(decode_cursor(cursor, types=(int,))).to_be_null()
+        expect(decode_cursor(encode_cursor(['10', 20]), types=(int, int))).to_be_null()
+        expect(decode_cursor(encode_cursor([10, None]), types=(int, int))).to_be_null()
+        expect(decode_cursor(encode_cursor([[10], {}]), types=(int, int))).to_be_null()
+        expect(decode_cursor(encode_cursor([True, 20]), types=(int, int))).to_be_null()
+        expect(decode_cursor(encode_cursor([1.5, 20]), types=((int, float), int))).to_equal([1.5, 20])
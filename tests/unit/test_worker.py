@@ -1,15 +1,17 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from collections import deque
+from datetime import datetime
 from os.path import abspath, dirname, join
 
 from preggy import expect
 from mock import patch, Mock, call
-from octopus import TornadoOctopus
 from materialgirl import Materializer
 
 from colorama import Fore, Style
 from holmes.worker import HolmesWorker
+from holmes.transport import FetchTransport
 from holmes.config import Config
 from tests.unit.base import ApiTestCase
 from tests.fixtures import (
@@ -37,7 +39,7 @@ class WorkerTestCase(ApiTestCase):
         expect(worker.facters).to_length(1)
         expect(worker.validators).to_length(1)
 
-        expect(worker.otto).to_be_instance_of(TornadoOctopus)
+        expect(worker.otto).to_be_instance_of(FetchTransport)
 
         expect(worker.girl).to_be_instance_of(Materializer)
 
@@ -66,6 +68,15 @@ class WorkerTestCase(ApiTestCase):
                 help='Whether http requests should be cached by Octopus.'
             ))
 
+        expect(parser_mock.add_argument.call_args_list).to_include(
+            call(
+                '--reviews',
+                '-r',
+                type=int,
+                default=1,
+                help='Number of pages to review concurrently using the same Octopus'
+            ))
+
     def test_description(self):
         worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
 
@@ -120,3 +131,294 @@ class WorkerTestCase(ApiTestCase):
         # Back to the wonderland
         worker.db = bkp_db
         worker.cache.db = bkp_db
+
+    def test_load_next_job_claims_a_batch(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.jobs = deque()
+        worker.cache = Mock()
+        worker.cache.get_next_jobs.return_value = [
+            {'url': 'http://g0.com', 'page': '0', 'lease': 'lease-0'},
+            {'url': 'http://g1.com', 'page': '1', 'lease': 'lease-1'},
+        ]
+
+        job = worker._load_next_job()
+        expect(job['url']).to_equal('http://g0.com')
+
+        job = worker._load_next_job()
+        expect(job['url']).to_equal('http://g1.com')
+
+        expect(worker.cache.get_next_jobs.call_count).to_equal(1)
+
+        worker.cache.get_next_jobs.return_value = []
+        expect(worker._load_next_job()).to_be_null()
+
+    def test_start_job_with_expired_lease(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.cache = Mock()
+        worker.cache.renew_job_lease.return_value = False
+
+        job = {'url': 'http://g0.com', 'page': '0', 'lease': 'lease-0'}
+        expect(worker._start_job(job)).to_be_false()
+
+    def test_renews_the_leases_of_running_jobs(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.cache = Mock()
+        worker.otto = Mock()
+        worker._ping_api = Mock()
+        worker.cache.renew_job_lease.return_value = True
+
+        jobs = [{'url': 'http://g%d.com' % x, 'page': '%d' % x, 'lease': 'lease-%d' % x} for x in range(2)]
+        for job in jobs:
+            expect(worker._start_job(job)).to_be_true()
+
+        expect(worker.leases).to_equal(set(['lease-0', 'lease-1']))
+
+        worker.cache.renew_job_lease.reset_mock()
+        worker.cache.renew_job_lease.side_effect = lambda lease, expiration: lease == 'lease-0'
+        worker._renew_leases()
+
+        expect(worker.cache.renew_job_lease.call_count).to_equal(2)
+        # a lost lease is not renewed anymore
+        expect(worker.leases).to_equal(set(['lease-0']))
+
+        worker._release_lease(jobs[0])
+        expect(worker.leases).to_be_empty()
+
+    @patch('holmes.worker.Request.delete_old_requests')
+    def test_reports_the_urls_of_every_running_review(self, delete_mock):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf'), '--reviews=2'])
+        worker.cache = Mock()
+        worker.otto = Mock()
+        worker._ping_api = Mock()
+        worker.db = Mock()
+        worker.flush_fetch_stats = Mock()
+        worker.last_ping = datetime.utcnow()
+
+        jobs = [{'url': 'http://g%d.com' % x, 'page': '%d' % x} for x in range(2)]
+
+        worker._start_job(jobs[0])
+        expect(worker.working_url).to_equal('http://g0.com')
+        expect(worker.domain_name).to_equal('g0.com')
+
+        worker._start_job(jobs[1])
+        expect(worker.working_urls).to_equal(['http://g0.com', 'http://g1.com'])
+        expect(worker.working_url).to_be_null()
+        expect(worker.domain_name).to_be_null()
+
+        worker.handle_limiter_miss('http://g0.com/image.png')
+        expect(worker.working_url).to_be_null()
+
+        worker._complete_job(jobs[0])
+        expect(worker.working_urls).to_equal(['http://g1.com'])
+        expect(worker.working_url).to_equal('http://g1.com')
+
+        worker._complete_job(jobs[1])
+        expect(worker.working_urls).to_be_empty()
+        expect(worker.working_url).to_be_null()
+
+    def test_fill_reviews_keeps_reviews_in_flight(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf'), '--reviews=2'])
+        worker.jobs = deque([
+            {'url': 'http://g%d.com' % x, 'page': '%d' % x} for x in range(3)
+        ])
+        worker.active_reviews = set()
+        worker.filling_reviews = False
+        worker.cache = Mock()
+        worker.cache.get_next_jobs.return_value = []
+        worker._ping_api = Mock()
+        worker._create_reviewer = Mock(side_effect=lambda job: Mock(job=job))
+
+        worker._fill_reviews()
+
+        expect(worker.active_reviews).to_length(2)
+        expect(worker.jobs).to_length(1)
+
+    def test_async_get_sends_conditional_request_for_validated_response(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.cache = Mock()
+        worker.otto = Mock()
+        worker.cache.get_request.return_value = ('http://g.com/', None)
+        worker.cache.acquire_fetch.return_value = (True, False)
+        validated = Mock(status_code=200, text='<html></html>', streamed_body=None)
+        worker.cache.get_validated_request.return_value = (validated, {'If-None-Match': '"abc"'})
+
+        handler = Mock()
+        worker.async_get('http://g.com/', handler)
+
+        args, kw = worker.otto.enqueue.call_args
+        expect(kw['headers']).to_equal({'If-None-Match': '"abc"'})
+
+        callback = args[1]
+        callback('http://g.com/', Mock(status_code=304, request_time=0.1, headers={}))
+
+        handler.assert_called_once_with('http://g.com/', validated)
+        expect(validated.request_time).to_equal(0.1)
+        expect(worker.cache.set_request.call_args[0][1]).to_equal(200)
+
+    def test_async_get_uses_modified_response(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.cache = Mock()
+        worker.otto = Mock()
+        worker.cache.get_request.return_value = ('http://g.com/', None)
+        worker.cache.acquire_fetch.return_value = (True, False)
+        worker.cache.get_validated_request.return_value = (Mock(), {'If-None-Match': '"abc"'})
+
+        handler = Mock()
+        worker.async_get('http://g.com/', handler)
+
+        response = Mock(status_code=200, text='new', headers={'Etag': '"def"'})
+        worker.otto.enqueue.call_args[0][1]('http://g.com/', response)
+
+        handler.assert_called_once_with('http://g.com/', response)
+
+    def test_validated_responses_are_kept_until_the_next_review(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.config.REVIEW_EXPIRATION_IN_SECONDS = 100
+        worker.config.VALIDATED_REQUEST_CACHE_MARGIN_IN_SECONDS = 10
+
+        expect(worker.get_validated_request_expiration()).to_equal(110)
+
+        worker.config.VALIDATED_REQUEST_MAX_BODY_SIZE_IN_BYTES = 0
+        expect(worker.get_validated_request_expiration()).to_be_null()
+
+    def get_worker_with_empty_cache(self):
+        worker = HolmesWorker(['-c', join(self.root_path, 'tests/unit/test_worker.conf')])
+        worker.cache = Mock()
+        worker.otto = Mock()
+        worker.cache.get_request.side_effect = lambda url, **kw: (url, None)
+        worker.cache.acquire_fetch.return_value = (True, False)
+        worker.cache.has_failed_fetch.return_value = False
+        worker.cache.get_validated_request.return_value = (None, None)
+        return worker
+
+    def test_async_get_without_body_sends_head(self):
+        worker = self.get_worker_with_empty_cache()
+
+        handler = Mock()
+        worker.async_get('http://g.com/a.png', handler, streamed=True, skip_body=True, need_size=True)
+
+        args, kw = worker.otto.enqueue.call_args
+        expect(args[2]).to_equal('HEAD')
+
+        args[1]('http://g.com/a.png', Mock(status_code=200, headers={'Content-Length': '2048'}))
+
+        response = handler.call_args[0][1]
+        expect(response.streamed_body.size).to_equal(2048)
+        expect(worker.cache.set_request.call_args[1]['head']).to_be_true()
+
+    def test_async_get_without_body_falls_back_to_ranged_get(self):
+        worker = self.get_worker_with_empty_cache()
+
+        handler = Mock()
+        worker.async_get('http://g.com/a.png', handler, skip_body=True, need_size=True)
+
+        head_callback = worker.otto.enqueue.call_args[0][1]
+        head_callback('http://g.com/a.png', Mock(status_code=405, headers={}))
+
+        args, kw = worker.otto.enqueue.call_args
+        expect(args[2]).to_equal('GET')
+        expect(kw['headers']).to_equal({'Range': 'bytes=0-0'})
+        expect(handler.called).to_be_false()
+
+        args[1]('http://g.com/a.png', Mock(status_code=206, headers={'Content-Range': 'bytes 0-0/4096'}))
+
+        response = handler.call_args[0][1]
+        expect(response.status_code).to_equal(200)
+        expect(response.streamed_body.size).to_equal(4096)
+
+    def test_async_get_without_body_does_not_need_size_for_links(self):
+        worker = self.get_worker_with_empty_cache()
+
+        handler = Mock()
+        worker.async_get('http://g.com/page', handler, skip_body=True)
+
+        worker.otto.enqueue.call_args[0][1]('http://g.com/page', Mock(status_code=200, headers={}))
+
+        expect(worker.otto.enqueue.call_count).to_equal(1)
+        expect(handler.call_args[0][1].status_code).to_equal(200)
+
+    def test_async_get_coalesces_requests_in_flight(self):
+        worker = self.get_worker_with_empty_cache()
+
+        first, second = Mock(), Mock()
+        worker.async_get('http://g.com/a.css', first, streamed=True)
+        worker.async_get('http://g.com/a.css', second, streamed=True)
+
+        expect(worker.otto.enqueue.call_count).to_equal(1)
+        expect(worker.fetch_counters['coalesced_in_process']).to_equal(1)
+
+        # the lock covers the request timeout from its dispatch on
+        worker.otto.enqueue.call_args[1]['dispatch_callback']('http://g.com/a.css')
+        worker.cache.extend_fetch.assert_called_once_with('http://g.com/a.css', worker.config.REQUEST_TIMEOUT_IN_SECONDS)
+
+        response = Mock(status_code=200, headers={}, from_cache=False)
+        worker.otto.enqueue.call_args[0][1]('http://g.com/a.css', response)
+
+        worker.cache.release_fetch.assert_called_once_with('http://g.com/a.css')
+        expect(first.call_args[0][1]).to_equal(response)
+        expect(second.call_args[0][1].from_cache).to_be_true()
+        expect(worker.in_flight).to_be_empty()
+
+    def test_async_get_waits_for_url_fetched_by_other_worker(self):
+        worker = self.get_worker_with_empty_cache()
+        worker.cache.acquire_fetch.return_value = (False, False)
+        worker.otto.poll = Mock()
+
+        handler = Mock()
+        worker.async_get('http://g.com/a.css', handler)
+
+        expect(worker.otto.enqueue.called).to_be_false()
+        check, handle = worker.otto.poll.call_args[0][:2]
+
+        worker.cache.is_fetching.return_value = True
+        expect(check()).to_be_null()
+
+        response = Mock()
+        worker.cache.get_request.side_effect = lambda url, **kw: (url, response)
+        expect(check()).to_equal(response)
+
+        handle(response)
+        handler.assert_called_once_with('http://g.com/a.css', response)
+        expect(worker.fetch_counters['coalesced_across_workers']).to_equal(1)
+
+    def test_async_get_does_not_wait_for_url_that_failed_before(self):
+        worker = self.get_worker_with_empty_cache()
+        worker.cache.acquire_fetch.return_value = (False, True)
+        worker.cache.has_failed_fetch.return_value = True
+        worker.otto.poll = Mock()
+
+        handler = Mock()
+        worker.async_get('http://g.com/broken.css', handler)
+
+        expect(worker.otto.poll.called).to_be_false()
+        expect(worker.otto.enqueue.call_count).to_equal(1)
+        expect(worker.fetch_counters['duplicate_fetches']).to_equal(1)
+
+    def test_async_get_records_failed_fetches(self):
+        worker = self.get_worker_with_empty_cache()
+
+        worker.async_get('http://g.com/broken.css', Mock())
+
+        response = Mock(status_code=404, headers={}, from_cache=False)
+        worker.otto.enqueue.call_args[0][1]('http://g.com/broken.css', response)
+
+        worker.cache.set_failed_fetch.assert_called_once_with(
+            'http://g.com/broken.css', worker.config.REQUEST_CACHE_EXPIRATION_IN_SECONDS
+        )
+        worker.cache.release_fetch.assert_called_once_with('http://g.com/broken.css')
+
+    def test_async_get_fetches_when_other_worker_did_not_cache_response(self):
+        worker = self.get_worker_with_empty_cache()
+        worker.cache.acquire_fetch.return_value = (False, False)
+        worker.cache.is_fetching.return_value = False
+        worker.otto.poll = Mock()
+
+        worker.async_get('http://g.com/missing.css', Mock())
+
+        check, handle = worker.otto.poll.call_args[0][:2]
+        expect(check()).to_be_false()
+
+        handle(False)
+
+        expect(worker.otto.enqueue.call_count).to_equal(1)
+        expect(worker.fetch_counters['duplicate_fetches']).to_equal(1)
@@ -66,10 +66,14 @@ class TestDomainCanonicalizationValidator(ValidatorTestCase):
             call('http://www.globo.com', validator.handle_www_url_res,
                  follow_redirects=False)
         )
+        # the fetcher is never waited on
+        expect(validator.reviewer.wait_for_async_requests.called).to_be_false()
+        expect(validator.has_same_effective_urls.called).to_be_false()
 
     def test_handle_async_get_response(self):
         url = 'http://globo.com'
         validator = self.get_validator_for_url(url)
+        validator.validate_canonical_urls = Mock()
         expected_response = Mock(
             status_code=200,
             effective_url='http://globo.com/'
@@ -87,6 +91,11 @@ class TestDomainCanonicalizationValidator(ValidatorTestCase):
         expected = ('http://www.globo.com', expected_response)
         validator.handle_www_url_res(*expected)
         expect(validator.www_url_res).to_equal(expected_response)
+        # validates once both responses are in
+        validator.validate_canonical_urls.assert_called_once_with({
+            'www_url': 'http://www.globo.com',
+            'no_www_url': 'http://globo.com',
+        })
 
     def test_has_same_effective_urls(self):
         validator = self.get_validator_for_url()
@@ -144,27 +153,25 @@ class TestDomainCanonicalizationValidator(ValidatorTestCase):
     def test_call_add_violation(self):
         url = 'http://globo.com/'
         validator = self.get_validator_for_url(url)
-        validator.www_url_res = Mock(
-            headers={},
-            status_code=200, effective_url='http://www.globo.com/')
-        validator.no_www_url_res = Mock(
-            status_code=301, effective_url='http://globo.com/',
-            headers={'Location': 'http://www.globo.com/'})
         validator.async_get = Mock()
-        validator.reviewer.wait_for_async_requests = Mock()
-        validator.add_violation = Mock()
-        validator.validate()
+
+        def validate(www_url_res, no_www_url_res):
+            validator.add_violation = Mock()
+            validator.validate()
+            validator.handle_www_url_res('http://www.globo.com', www_url_res)
+            expect(validator.add_violation.called).to_be_false()
+            validator.handle_no_www_url_res('http://globo.com', no_www_url_res)
+
+        validate(
+            Mock(headers={}, status_code=200, effective_url='http://www.globo.com/'),
+            Mock(status_code=301, effective_url='http://globo.com/', headers={'Location': 'http://www.globo.com/'})
+        )
         expect(validator.add_violation.called).to_be_false()
 
-        validator.www_url_res = Mock(
-            headers={},
-            status_code=200, effective_url='http://www.globo.com/')
-        validator.no_www_url_res = Mock(
-            headers={},
-            status_code=200, effective_url='http://globo.com/')
-        validator.add_violation = Mock()
-        validator.validate()
-        expect(validator.add_violation.called).to_be_true()
+        validate(
+            Mock(headers={}, status_code=200, effective_url='http://www.globo.com/'),
+            Mock(headers={}, status_code=200, effective_url='http://globo.com/')
+        )
         validator.add_violation.assert_called_once_with(
             key='page.canonicalization.different_endpoints',
             value={
@@ -174,18 +181,16 @@ class TestDomainCanonicalizationValidator(ValidatorTestCase):
             points=50
         )
 
-        validator.www_url_res = Mock(
-            headers={},
-            status_code=200, effective_url='http://www.globo.com/')
-        validator.no_www_url_res = Mock(
+        no_www_url_res = Mock(
             headers={'Location': 'http://www.globo.com/'},
             status_code=302, effective_url='http://globo.com/')
-        validator.add_violation = Mock()
-        validator.validate()
-        expect(validator.add_violation.called).to_be_true()
+        validate(
+            Mock(headers={}, status_code=200, effective_url='http://www.globo.com/'),
+            no_www_url_res
+        )
         validator.add_violation.assert_called_once_with(
             key='page.canonicalization.no_301_redirect',
-            value=validator.no_www_url_res,
+            value=no_www_url_res,
             points=50
         )
 
@@ -47,12 +47,12 @@ class TestImageRequestsValidator(ValidatorTestCase):
         validator = ImageRequestsValidator(reviewer)
         validator.add_violation = Mock()
         validator.review.data = {
-            'page.images': [
+            'page.images': dict(
                 (
-                    'some_image.jpg',
+                    validator.review.urls.get_id('some_image_%d.jpg' % i),
                     Mock(status_code=200, text=self.get_file('2x2.png'))
                 ) for i in range(60)
-            ],
+            ),
             'total.size.img': 106,
         }
 
@@ -70,9 +70,9 @@ class TestImageRequestsValidator(ValidatorTestCase):
                 key='single.size.img',
                 value={
                     'limit': 6,
-                    'over_max_size': set([('some_image.jpg', 6.57421875)])
+                    'over_max_size': set([('some_image_%d.jpg' % i, 6.57421875) for i in range(60)])
                 },
-                points=0.57421875
+                points=60 * 0.57421875
             ))
 
     def test_can_validate_image_404(self):
@@ -99,9 +99,9 @@ class TestImageRequestsValidator(ValidatorTestCase):
 
         img_url = 'http://globo.com/some_image.jpg'
         validator.review.data = {
-            'page.images': [
-                (img_url, Mock(status_code=404, text=None))
-            ],
+            'page.images': {
+                validator.review.urls.get_id(img_url): Mock(status_code=404, text=None)
+            },
             'total.size.img': 60,
         }
 
@@ -147,9 +147,9 @@ class TestImageRequestsValidator(ValidatorTestCase):
         validator = ImageRequestsValidator(reviewer)
         validator.add_violation = Mock()
         validator.review.data = {
-            'page.images': [
-                ('http://globo.com/some_image.jpg', Mock(status_code=200, text='bla'))
-            ],
+            'page.images': {
+                validator.review.urls.get_id('http://globo.com/some_image.jpg'): Mock(status_code=200, text='bla')
+            },
             'total.size.img': 60,
         }
 
@@ -191,7 +191,7 @@ class TestImageRequestsValidator(ValidatorTestCase):
 
         validator.add_violation = Mock()
         validator.review.data = {
-            'page.images': [],
+            'page.images': {},
             'total.size.img': 60,
         }
 
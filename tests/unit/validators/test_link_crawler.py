@@ -31,15 +31,16 @@ class TestLinkCrawlerValidator(ValidatorTestCase):
 
         validator = LinkCrawlerValidator(reviewer)
         validator.add_violation = Mock()
+        urls = validator.review.urls
         validator.review.data = {
-            'page.links': [
-                ('http://g1.com/', Mock(status_code=404,
-                                        effective_url='http://g1.com/')),
-                ('http://g2.com/', Mock(status_code=302,
-                                        effective_url='http://g2.com/')),
-                ('http://g3.com/', Mock(status_code=307,
-                                        effective_url='http://g3.com/'))
-            ]
+            'page.links': {
+                urls.get_id('http://g1.com/'): Mock(status_code=404,
+                                                    effective_url='http://g1.com/'),
+                urls.get_id('http://g2.com/'): Mock(status_code=302,
+                                                    effective_url='http://g2.com/'),
+                urls.get_id('http://g3.com/'): Mock(status_code=307,
+                                                    effective_url='http://g3.com/')
+            }
         }
 
         validator.validate()
@@ -75,7 +76,7 @@ class TestLinkCrawlerValidator(ValidatorTestCase):
         validator = LinkCrawlerValidator(reviewer)
         validator.add_violation = Mock()
         validator.review.data = {
-            'page.links': []
+            'page.links': {}
         }
 
         validator.validate()
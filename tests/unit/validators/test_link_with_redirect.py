@@ -54,10 +54,10 @@ class TestLinkWithRedirectValidator(ApiTestCase):
         status_302 = Mock(status_code=302, text='Found')
 
         validator.review.data = {
-            'page.links': [
-                (url1, status_307),
-                (url2, status_302)
-            ]
+            'page.links': {
+                validator.review.urls.get_id(url1): status_307,
+                validator.review.urls.get_id(url2): status_302
+            }
         }
 
         validator.validate()
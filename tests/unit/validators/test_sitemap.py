@@ -1,6 +1,8 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+from array import array
+
 from mock import Mock
 from preggy import expect
 
@@ -13,6 +15,9 @@ from tests.fixtures import PageFactory
 
 class TestSitemapValidator(ValidatorTestCase):
 
+    def get_url_ids(self, validator, urls):
+        return array('I', [validator.review.urls.get_id(url) for url in urls])
+
     def test_return_if_page_url_is_not_root_of_domain(self):
         page = PageFactory.create(url='http://globo.com/1')
 
@@ -100,7 +105,7 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10241}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 10}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': []}
+        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': array('I')}
         validator.add_violation = Mock()
 
         validator.validate()
@@ -130,7 +135,7 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 50001}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': []}
+        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': array('I')}
         validator.add_violation = Mock()
 
         validator.validate()
@@ -157,7 +162,9 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 20}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': ['http://g1.globo.com/']}
+        validator.review.data['sitemap.urls'] = {
+            'http://g1.globo.com/sitemap.xml': self.get_url_ids(validator, ['http://g1.globo.com/'])
+        }
         validator.add_violation = Mock()
 
         validator.validate()
@@ -180,7 +187,9 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 20}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': ['http://g1.globo.com/1.html']}
+        validator.review.data['sitemap.urls'] = {
+            'http://g1.globo.com/sitemap.xml': self.get_url_ids(validator, ['http://g1.globo.com/1.html'])
+        }
         validator.add_violation = Mock()
 
         validator.validate()
@@ -203,7 +212,9 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 20}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': ['http://g1.globo.com/ümlat.php', u'http://g1.globo.com/ümlat.php']}
+        validator.review.data['sitemap.urls'] = {
+            'http://g1.globo.com/sitemap.xml': self.get_url_ids(validator, ['http://g1.globo.com/ümlat.php', u'http://g1.globo.com/ümlat.php'])
+        }
         validator.add_violation = Mock()
         # validator.send_url = Mock()
 
@@ -230,7 +241,9 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 20}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': ['http://g1.globo.com/%C3%BCmlat.php&q=name']}
+        validator.review.data['sitemap.urls'] = {
+            'http://g1.globo.com/sitemap.xml': self.get_url_ids(validator, ['http://g1.globo.com/%C3%BCmlat.php&q=name'])
+        }
         validator.add_violation = Mock()
 
         validator.validate()
@@ -257,7 +270,9 @@ class TestSitemapValidator(ValidatorTestCase):
         validator.review.data['sitemap.files.size'] = {'http://g1.globo.com/sitemap.xml': 10}
         validator.review.data['sitemap.data'] = {'http://g1.globo.com/sitemap.xml': Mock(status_code=200, text='data', url='http://g1.globo.com/%C3%BCmlat.php&amp;q=name')}
         validator.review.data['sitemap.files.urls'] = {'http://g1.globo.com/sitemap.xml': 20}
-        validator.review.data['sitemap.urls'] = {'http://g1.globo.com/sitemap.xml': ['http://g1.globo.com/%C3%BCmlat.php&amp;q=name']}
+        validator.review.data['sitemap.urls'] = {
+            'http://g1.globo.com/sitemap.xml': self.get_url_ids(validator, ['http://g1.globo.com/%C3%BCmlat.php&amp;q=name'])
+        }
         validator.add_violation = Mock()
         validator.flush = Mock()
 